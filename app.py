@@ -1,8 +1,21 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, has_request_context, request, jsonify, send_file, send_from_directory, stream_with_context
 import pandas as pd
 import joblib
+import json
 import os
-from utils.neo4j_ingest import fetch_graph_data
+import time
+from itertools import islice
+from types import SimpleNamespace
+from utils.artifact_store import ArtifactStore
+from utils.compiled_model import CompiledForest
+from utils.data_store import dataset_file, read_dataset
+from utils.feature_store import SUSPECT_MODEL_FEATURES
+from utils.graph_analytics import load_analytics
+from utils.graph_cache import GraphCache, read_generation
+from utils.graph_snapshot import GRAPH_BINARY_MIMETYPE, GraphSnapshot, SnapshotReplica
+from utils.metrics import SIZE_BUCKETS, MetricsRegistry
+from utils.neo4j_ingest import Neo4jGraphManager, fetch_graph_data, fetch_graph_links, iter_graph_data, iter_graph_items
+from utils.prediction_index import PredictionIndex
 
 # === Setup paths ===
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -11,16 +24,166 @@ FRONTEND_PUBLIC_PATH = os.path.join(BASE_DIR, "../frontend/public")
 # === Init Flask app ===
 app = Flask(__name__, static_folder=FRONTEND_PUBLIC_PATH, static_url_path='')
 
-# === Load ML model ===
-model = joblib.load("models/trained_model.pkl")
+# === Metrics ===
+metrics = MetricsRegistry()
+REQUEST_LATENCY = metrics.histogram(
+    "crimetryx_request_duration_seconds", "Time to build the response, per route.", ["method", "route"])
+PHASE_LATENCY = metrics.histogram(
+    "crimetryx_phase_duration_seconds", "Time spent in an internal phase (filter, serialize, db, inference).",
+    ["phase", "route"])
+REQUEST_SIZE = metrics.histogram(
+    "crimetryx_request_size_bytes", "Request body size, per route.", ["route"], buckets=SIZE_BUCKETS)
+RESPONSE_SIZE = metrics.histogram(
+    "crimetryx_response_size_bytes", "Response body size (non-streamed), per route.", ["route"], buckets=SIZE_BUCKETS)
+REQUESTS = metrics.counter("crimetryx_requests_total", "Requests handled.", ["method", "route", "status"])
+ERRORS = metrics.counter("crimetryx_errors_total", "Responses with a 5xx status.", ["route"])
 
-# === Load rule-based + risk data ===
+def current_route():
+    if not has_request_context():
+        return "background"
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+def phase(name):
+    """Context manager timing one internal phase of the current request."""
+    return PHASE_LATENCY.time(name, current_route())
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+    route = current_route()
+    method = request.method
+    if response.is_streamed:
+        # The body is generated after this hook returns; time the request once it is sent
+        response.call_on_close(lambda: REQUEST_LATENCY.observe(time.perf_counter() - started, method, route))
+    else:
+        REQUEST_LATENCY.observe(time.perf_counter() - started, method, route)
+    REQUESTS.inc(request.method, route, str(response.status_code))
+    if response.status_code >= 500:
+        ERRORS.inc(route)
+    if request.content_length:
+        REQUEST_SIZE.observe(request.content_length, route)
+    if not response.is_streamed and response.content_length is not None:
+        RESPONSE_SIZE.observe(response.content_length, route)
+    return response
+
+@app.teardown_request
+def record_request_error(error):
+    # An exception that escaped the view skips after_request when it propagates (debug
+    # mode); otherwise after_request already counted its 500 and took the timer
+    if error is None:
+        return
+    started = g.pop("request_started", None)
+    if started is None:
+        return
+    route = current_route()
+    REQUEST_LATENCY.observe(time.perf_counter() - started, request.method, route)
+    REQUESTS.inc(request.method, route, "500")
+    ERRORS.inc(route)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
+# === ML model ===
+MODEL_PATH = "models/trained_model.pkl"
+
+# Feature schema the model was trained on (see train_model.py)
+MODEL_FEATURES = {
+    "CrimeType": str,
+    "WeaponUsed_x": str,
+    "SeverityScore": (int, float),
+    "IsGangRelated": bool,
+}
+PREDICT_BATCH_SIZE = 1000
+# Up to this many rows the compiled forest beats sklearn's per-call overhead
+COMPILED_MAX_ROWS = 256
+PREDICT_MAX_BATCH_SIZE = 10000
+
+# Rows per chunk written by the NDJSON streaming responses
+STREAM_CHUNK_SIZE = 500
+
+# === Rule-based + risk data, and per-suspect features for models that use them ===
 PREDICTIONS_PATH = os.path.join(BASE_DIR, "data", "rule_based_predictions.csv")
 RISK_SCORES_PATH = os.path.join(BASE_DIR, "data", "risk_scores.csv")
+SUSPECT_FEATURES_PATH = os.path.join(BASE_DIR, "data", "suspect_features.csv")
+
+# Where graph reads are served from:
+#   neo4j    - query Neo4j on every request (full graph cached by GraphCache)
+#   replica  - in-memory GraphSnapshot loaded from Neo4j, reloaded after each ingest
+#   snapshot - in-memory GraphSnapshot built from the predictions CSV; no Neo4j needed
+GRAPH_BACKEND = os.environ.get("GRAPH_BACKEND", "neo4j")
+
+# === Versioned, hot-reloadable artifacts ===
+def load_artifacts():
+    """Load the model and build the merged prediction table and its index."""
+    model = joblib.load(MODEL_PATH)
+    # Model inputs looked up in the feature store by SuspectID (train_model.py --suspect-features)
+    stored = [f for f in getattr(model, "feature_names_in_", []) if f in SUSPECT_MODEL_FEATURES]
+    # Plain object columns: the tables are filled, merged and served as they are
+    pred_df = read_dataset(PREDICTIONS_PATH, categorical=False)
+    risk_df = read_dataset(RISK_SCORES_PATH, categorical=False)
+    df = pd.merge(pred_df, risk_df, on="SuspectID", how="left")
+    try:
+        compiled = CompiledForest.from_pipeline(model)
+    except (ValueError, KeyError, AttributeError) as e:
+        print(f"Model cannot be compiled, using the sklearn pipeline: {e}")
+        compiled = None
+    graph = GraphSnapshot.from_predictions(pred_df) if GRAPH_BACKEND == "snapshot" else None
+    return SimpleNamespace(model=model, compiled=compiled, df=df, prediction_index=PredictionIndex(df), graph=graph,
+                           features=list(MODEL_FEATURES) + stored, stored=stored,
+                           suspect_features=load_stored_features(stored))
+
+def load_stored_features(stored):
+    """The stored suspect features a model uses, indexed by SuspectID, or None."""
+    if not stored:
+        return None
+    return read_dataset(SUSPECT_FEATURES_PATH, categorical=False, columns=["SuspectID"] + stored).set_index("SuspectID")
+
+def with_stored_features(bundle, records):
+    """Add the model's stored suspect features to each record, by its SuspectID (0 if unknown)."""
+    ids = [record.get("SuspectID") for record in records]
+    values = bundle.suspect_features.reindex(ids).fillna(0).to_dict(orient="records")
+    return [{**record, **stored} for record, stored in zip(records, values)]
+
+def predict_records(bundle, records):
+    """Predict a list of feature dicts, using the compiled forest for small inputs."""
+    if bundle.stored:
+        records = with_stored_features(bundle, records)
+    with phase("inference"):
+        if bundle.compiled is not None and len(records) <= COMPILED_MAX_ROWS:
+            return bundle.compiled.predict(records)
+        return bundle.model.predict(pd.DataFrame(records, columns=bundle.features))
 
-pred_df = pd.read_csv(PREDICTIONS_PATH)
-risk_df = pd.read_csv(RISK_SCORES_PATH)
-df = pd.merge(pred_df, risk_df, on="SuspectID", how="left")
+artifacts = ArtifactStore(
+    [MODEL_PATH, PREDICTIONS_PATH, RISK_SCORES_PATH, SUSPECT_FEATURES_PATH],
+    load_artifacts,
+    poll_interval=int(os.environ.get("ARTIFACT_POLL_SECONDS", 30)),
+    # Resolved on every poll, as the Parquet copy may appear (or go away) after startup
+    resolve=dataset_file,
+)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+@app.after_request
+def add_artifact_version(response):
+    version = artifacts.version
+    if version is not None:
+        response.headers["X-Artifact-Version"] = version
+    return response
+
+def wants_stream():
+    """True if the client asked for NDJSON via ?stream=1 or the Accept header."""
+    if request.args.get("stream", "").lower() in ("1", "true"):
+        return True
+    return request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"]) == "application/x-ndjson"
+
+def ndjson_lines(items):
+    return "".join(json.dumps(item) + "\n" for item in items)
 
 # === Static Pages ===
 @app.route('/')
@@ -36,14 +199,196 @@ def predictions_page():
     return send_from_directory(FRONTEND_PUBLIC_PATH, "predictions.html")
 
 # === API: Neo4j Graph ===
+GRAPH_GENERATION_PATH = os.path.join(BASE_DIR, "data", "graph_generation.txt")
+# Binary (CSR) export written by neo4j_ingest.py after each ingest
+GRAPH_EXPORT_PATH = os.path.join(BASE_DIR, "data", "graph.ctxg")
+
+def load_graph_payload():
+    with phase("db"):
+        graph_data = fetch_graph_data()
+    with phase("serialize"):
+        return json.dumps(graph_data)
+
+graph_cache = GraphCache(
+    load_graph_payload,
+    GRAPH_GENERATION_PATH,
+    ttl=int(os.environ.get("GRAPH_CACHE_TTL", 300)),
+    db_path=os.environ.get("GRAPH_CACHE_DB"),
+)
+
+graph_replica = SnapshotReplica(
+    lambda: GraphSnapshot.from_links(fetch_graph_links()),
+    lambda: read_generation(GRAPH_GENERATION_PATH),
+)
+
+def graph_snapshot():
+    """The in-memory graph for the configured backend, or None when reads go to Neo4j."""
+    if GRAPH_BACKEND == "snapshot":
+        return artifacts.current().graph
+    if GRAPH_BACKEND == "replica":
+        with phase("db"):
+            return graph_replica.get()
+    return None
+
+def graph_items(query):
+    snapshot = graph_snapshot()
+    if snapshot is None:
+        return iter_graph_data(**query)
+    return iter_graph_items(snapshot, **query)
+
+def wants_binary_graph():
+    """True if the client asked for the binary graph via ?format=binary or the Accept header."""
+    if request.args.get("format") == "binary":
+        return True
+    return request.accept_mimetypes.best_match(["application/json", GRAPH_BINARY_MIMETYPE]) == GRAPH_BINARY_MIMETYPE
+
+def graph_binary_response():
+    snapshot = graph_snapshot()
+    if snapshot is None and os.path.exists(GRAPH_EXPORT_PATH):
+        return send_file(GRAPH_EXPORT_PATH, mimetype=GRAPH_BINARY_MIMETYPE)
+    if snapshot is None:
+        with phase("db"):
+            snapshot = graph_replica.get()
+    with phase("serialize"):
+        return Response(snapshot.to_bytes(), mimetype=GRAPH_BINARY_MIMETYPE)
+
+GRAPH_PAGE_SIZE = 500  # suspects per page when only `after` is given
+
+def graph_query_args():
+    """Parse the neighbourhood/filter/pagination parameters of /api/graph-data."""
+    args = {}
+    if request.args.get("node"):
+        args["node"] = request.args["node"]
+        args["kind"] = request.args.get("kind", "suspect")
+        args["hops"] = int(request.args.get("hops", 1))
+    if request.args.get("crime"):
+        args["crime"] = request.args["crime"]
+    if request.args.get("risk"):
+        args["suspect_ids"] = artifacts.current().prediction_index.band_suspects(request.args["risk"])
+    if request.args.get("after"):
+        args["after"] = request.args["after"]
+    if request.args.get("limit"):
+        args["limit"] = int(request.args["limit"])
+    elif "after" in args:
+        args["limit"] = GRAPH_PAGE_SIZE
+    return args
+
 @app.route('/api/graph-data', methods=['GET'])
 def api_graph_data():
     try:
-        graph_data = fetch_graph_data()
-        return jsonify(graph_data), 200
+        query = graph_query_args()
+    except ValueError:
+        return jsonify({"error": "hops and limit must be integers."}), 400
+    if not 1 <= query.get("hops", 1) <= Neo4jGraphManager.MAX_HOPS or query.get("limit", 1) < 1:
+        return jsonify({"error": f"hops must be between 1 and {Neo4jGraphManager.MAX_HOPS} and limit positive."}), 400
+    if query.get("kind", "suspect") not in Neo4jGraphManager.NODE_KINDS:
+        return jsonify({"error": f"Unknown node kind: {query['kind']}"}), 400
+    # Keyset cursor for the next page: the last suspect of a full page
+    paged = "limit" in query and "node" not in query
+
+    if wants_stream():
+        def generate():
+            chunk = []
+            sources = set()
+            last_source = None
+            try:
+                for kind, item in graph_items(query):
+                    chunk.append({"type": kind, **item})
+                    if kind == "link":
+                        sources.add(item["source"])
+                        last_source = item["source"]
+                    if len(chunk) >= STREAM_CHUNK_SIZE:
+                        yield ndjson_lines(chunk)
+                        chunk = []
+            except Exception as e:
+                # The 200 status is already sent: end with an error record so the client
+                # can tell a failed stream from a complete graph
+                chunk.append({"type": "error", "error": str(e)})
+                yield ndjson_lines(chunk)
+                return
+            if paged:
+                chunk.append({"type": "page", "next": last_source if len(sources) >= query["limit"] else None})
+            if chunk:
+                yield ndjson_lines(chunk)
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    if query:
+        try:
+            with phase("db"):
+                items = list(graph_items(query))
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        with phase("serialize"):
+            links = [item for kind, item in items if kind == "link"]
+            graph_data = {"nodes": [item for kind, item in items if kind == "node"], "links": links}
+            if paged:
+                sources = {link["source"] for link in links}
+                graph_data["next"] = links[-1]["source"] if len(sources) >= query["limit"] else None
+            return jsonify(graph_data), 200
+
+    try:
+        if wants_binary_graph():
+            response = graph_binary_response()
+        else:
+            snapshot = graph_snapshot()
+            payload = snapshot.payload() if snapshot is not None else graph_cache.get()
+            response = Response(payload, mimetype="application/json")
+        response.vary.add("Accept")
+        return response, 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# === API: Graph analytics ===
+GRAPH_ANALYTICS_PATH = os.path.join(BASE_DIR, "data", "graph_analytics.csv")
+ANALYTICS_SORT_COLUMNS = {
+    "degree": "Degree",
+    "co_offenders": "CoOffenders",
+    "betweenness": "Betweenness",
+    "pagerank": "PageRank",
+}
+
+def analytics_version():
+    try:
+        return os.stat(GRAPH_ANALYTICS_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+# Table written by the ingest (or graph_analytics.py), reloaded when the file changes
+graph_analytics = SnapshotReplica(
+    lambda: load_analytics(GRAPH_ANALYTICS_PATH) if analytics_version() is not None else None,
+    analytics_version,
+)
+
+@app.route('/api/graph-analytics', methods=['GET'])
+def api_graph_analytics():
+    table = graph_analytics.get()
+    if table is None:
+        return jsonify({"error": "Graph analytics have not been computed yet."}), 503
+
+    sort = request.args.get("sort", "pagerank")
+    if sort not in ANALYTICS_SORT_COLUMNS:
+        return jsonify({"error": f"sort must be one of {', '.join(ANALYTICS_SORT_COLUMNS)}."}), 400
+    try:
+        limit = int(request.args["limit"]) if request.args.get("limit") else None
+    except ValueError:
+        return jsonify({"error": "limit must be an integer."}), 400
+
+    with phase("filter"):
+        rows = table
+        if request.args.get("kind"):
+            rows = rows[rows["Kind"] == request.args["kind"]]
+        if request.args.get("community"):
+            rows = rows[rows["Community"] == request.args["community"]]
+        rows = rows.sort_values([ANALYTICS_SORT_COLUMNS[sort], "Node"], ascending=[False, True])
+        if limit is not None:
+            rows = rows.head(limit)
+    with phase("serialize"):
+        communities = table.groupby("Community").size()
+        return jsonify({
+            "nodes": rows.to_dict(orient="records"),
+            "communities": [{"id": c, "size": int(n)} for c, n in communities.sort_values(ascending=False).items()],
+        }), 200
+
 # === API: Suspect Predictions ===
 @app.route('/api/predictions', methods=['GET'])
 def api_predictions():
@@ -51,36 +396,58 @@ def api_predictions():
     filter_crime = request.args.get("crime", "")
     filter_risk = request.args.get("risk", "")
 
-    filtered_df = df.copy()
-    if search:
-        filtered_df = filtered_df[filtered_df["SuspectID"].str.contains(search, case=False)]
-    if filter_crime:
-        filtered_df = filtered_df[filtered_df["PredictedCrimeType"] == filter_crime]
-    if filter_risk:
-        if filter_risk == "High":
-            filtered_df = filtered_df[filtered_df["RiskScore"] >= 8]
-        elif filter_risk == "Medium":
-            filtered_df = filtered_df[(filtered_df["RiskScore"] >= 4) & (filtered_df["RiskScore"] < 8)]
-        else:
-            filtered_df = filtered_df[filtered_df["RiskScore"] < 4]
+    try:
+        offset = int(request.args.get("offset", 0))
+        limit = request.args.get("limit")
+        limit = int(limit) if limit is not None else None
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers."}), 400
+    if offset < 0 or (limit is not None and limit < 0):
+        return jsonify({"error": "offset and limit must be non-negative."}), 400
+
+    prediction_index = artifacts.current().prediction_index
+    fields = [f for f in request.args.get("fields", "").split(",") if f]
+    unknown = [f for f in fields if f not in prediction_index.columns]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
 
-    return jsonify(filtered_df.to_dict(orient="records")), 200
+    with phase("filter"):
+        rows = prediction_index.query(search=search, crime=filter_crime, risk=filter_risk)
+    if wants_stream():
+        chunks = prediction_index.iter_records(rows, offset=offset, limit=limit, fields=fields,
+                                               chunk_size=STREAM_CHUNK_SIZE)
+        response = Response((ndjson_lines(chunk) for chunk in chunks), mimetype="application/x-ndjson")
+        response.headers["X-Total-Count"] = str(len(rows))
+        return response, 200
+
+    with phase("serialize"):
+        records = prediction_index.records(rows, offset=offset, limit=limit, fields=fields)
+        response = jsonify(records)
+    response.headers["X-Total-Count"] = str(len(rows))
+    return response, 200
 
 @app.route('/api/suspect/<sid>', methods=['GET'])
 def api_suspect_view(sid):
-    record = df[df['SuspectID'] == sid]
-    if record.empty:
+    with phase("filter"):
+        record, etag = artifacts.current().prediction_index.lookup(sid)
+    if record is None:
         return jsonify({"error": f"Suspect {sid} not found."}), 404
-    return jsonify(record.iloc[0].to_dict()), 200
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    with phase("serialize"):
+        response = jsonify(record.to_dict())
+    response.set_etag(etag)
+    return response, 200
 
 # === API: ML Prediction ===
 @app.route("/api/predict", methods=["POST"])
 def predict():
     try:
         input_data = request.get_json()
-        df_input = pd.DataFrame([input_data])
-        prediction = model.predict(df_input)
-        predicted_class = int(prediction[0])
+        prediction = predict_records(artifacts.current(), [input_data])
+        predicted_class = prediction.tolist()[0]
 
         return jsonify({
             "success": True,
@@ -89,6 +456,92 @@ def predict():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+def validate_features(record):
+    """Return an error message if record does not match MODEL_FEATURES, else None."""
+    if not isinstance(record, dict):
+        return "record must be a JSON object"
+    for name, kind in MODEL_FEATURES.items():
+        if name not in record:
+            return f"missing feature '{name}'"
+        value = record[name]
+        if not isinstance(value, kind) or (kind is not bool and isinstance(value, bool)):
+            return f"feature '{name}' has invalid type {type(value).__name__}"
+    return None
+
+def iter_batch_records(payload):
+    """Yield (record, error) pairs from a JSON array or a streamed NDJSON body."""
+    if payload is not None:
+        for record in payload:
+            yield record, validate_features(record)
+        return
+    for line in request.stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield None, "malformed JSON line"
+            continue
+        yield record, validate_features(record)
+
+@app.route("/api/predict/batch", methods=["POST"])
+def predict_batch():
+    try:
+        batch_size = min(int(request.args.get("batch_size", PREDICT_BATCH_SIZE)), PREDICT_MAX_BATCH_SIZE)
+    except ValueError:
+        return jsonify({"success": False, "error": "batch_size must be an integer."}), 400
+    if batch_size < 1:
+        return jsonify({"success": False, "error": "batch_size must be positive."}), 400
+
+    payload = None
+    if request.mimetype != "application/x-ndjson":
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, list):
+            return jsonify({"success": False, "error": "Expected a JSON array or an application/x-ndjson body."}), 400
+
+    bundle = artifacts.current()
+
+    def generate():
+        records = iter_batch_records(payload)
+        offset = 0
+        try:
+            for batch_no, chunk in enumerate(iter(lambda: list(islice(records, batch_size)), [])):
+                started = time.perf_counter()
+                valid = [i for i, (_, error) in enumerate(chunk) if error is None]
+                predictions = [None] * len(chunk)
+                if valid:
+                    features = [chunk[i][0] for i in valid]
+                    for i, value in zip(valid, predict_records(bundle, features).tolist()):
+                        predictions[i] = value
+                yield json.dumps({
+                    "batch": batch_no,
+                    "offset": offset,
+                    "rows": len(chunk),
+                    "predictions": predictions,
+                    "errors": [{"index": offset + i, "error": error} for i, (_, error) in enumerate(chunk) if error],
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+                }) + "\n"
+                offset += len(chunk)
+        except Exception as e:
+            # The 200 status is already sent: end with an error record, so the client can
+            # tell a failed batch from a complete one (rows from offset on were not scored)
+            yield json.dumps({"error": str(e), "offset": offset}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+# === API: Admin ===
+@app.route("/api/admin/reload", methods=["POST"])
+def admin_reload():
+    # No ADMIN_TOKEN configured means reloads over HTTP are disabled
+    if not ADMIN_TOKEN or request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        current = artifacts.reload(force=True)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e), "version": artifacts.version}), 500
+    return jsonify({"success": True, "version": current.version}), 200
+
 # === Run the server ===
 if __name__ == "__main__":
     app.run(debug=True, port=5001)
@@ -0,0 +1,80 @@
+import hashlib
+import os
+import threading
+import time
+
+
+class ArtifactStore:
+    """Lazily built, hot-swappable bundle of serving artifacts (model, tables, indexes).
+
+    The bundle is built by `builder` on first use and rebuilt whenever the watched files
+    change (polled from a daemon thread) or `reload()` is called. A rebuild happens off
+    to the side and replaces the published bundle with a single reference assignment,
+    so in-flight requests keep the bundle they started with. `resolve` maps a watched
+    path to the file actually read (e.g. its Parquet copy) and is applied on every poll.
+    """
+
+    def __init__(self, paths, builder, poll_interval=30, resolve=None):
+        self.paths = list(paths)
+        self.builder = builder
+        self.resolve = resolve or (lambda path: path)
+        self.poll_interval = poll_interval
+        self._current = None
+        self._build_lock = threading.Lock()
+        self._watcher = None
+
+    @property
+    def version(self):
+        """Version of the published bundle, or None if nothing is loaded yet."""
+        current = self._current
+        return current.version if current is not None else None
+
+    def file_version(self):
+        """Short fingerprint of the watched files' size and modification time (None if missing)."""
+        digest = hashlib.sha1()
+        for path in self.paths:
+            path = self.resolve(path)
+            try:
+                stat = os.stat(path)
+                version = f"{stat.st_size}:{stat.st_mtime_ns}"
+            except FileNotFoundError:
+                # Missing or being replaced: a version of its own, picked up once it is back
+                version = None
+            digest.update(f"{path}:{version};".encode("utf-8"))
+        return digest.hexdigest()[:12]
+
+    def current(self):
+        """Return the published bundle, building it on first use."""
+        current = self._current
+        if current is None:
+            current = self.reload(force=False)
+        return current
+
+    def reload(self, force=True):
+        """Rebuild the bundle if the files changed (or always, with force) and publish it."""
+        with self._build_lock:
+            version = self.file_version()
+            current = self._current
+            if current is not None and not force and current.version == version:
+                return current
+            bundle = self.builder()
+            bundle.version = version
+            self._current = bundle
+            self._start_watcher()
+        return bundle
+
+    def _start_watcher(self):
+        if self.poll_interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name="artifact-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                if self.file_version() != self.version:
+                    self.reload(force=False)
+            except Exception as e:
+                # Files mid-write or a bad artifact: keep serving the current bundle
+                print(f"Artifact reload failed: {e}")
@@ -0,0 +1,251 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+
+# === Compiled RandomForest pipeline ===
+class CompiledForest:
+    """Array-backed evaluator for the OneHotEncoder + RandomForestClassifier pipeline.
+
+    The encoder is reduced to one category -> column lookup table per categorical
+    feature, and all trees are concatenated into flat node arrays (feature, threshold,
+    left, right, normalized leaf value). Prediction walks every tree of every row at
+    once, one tree level per step, and reproduces pipeline.predict exactly.
+    """
+
+    def __init__(self, features, categorical, categories, passthrough, feature, threshold,
+                 left, right, value, roots, depth, classes):
+        self.features = list(features)
+        self.categorical = list(categorical)
+        self.categories = [np.asarray(c, dtype=object) for c in categories]
+        self.passthrough = list(passthrough)
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.classes = classes
+
+        # Output column of every category of every categorical feature
+        self.lookups = []
+        offset = 0
+        for cats in self.categories:
+            self.lookups.append({cat: offset + i for i, cat in enumerate(cats.tolist())})
+            offset += len(cats)
+        self.passthrough_offset = offset
+        self.width = offset + len(self.passthrough)
+        # Interleaved (left, right) children so one gather picks the next node
+        self.children = np.stack([self.left, self.right], axis=1).ravel()
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Compile a fitted Pipeline(ColumnTransformer(OneHotEncoder), RandomForestClassifier)."""
+        transformer = pipeline.named_steps["preprocessor"]
+        forest = pipeline.named_steps["classifier"]
+        input_names = list(transformer.feature_names_in_)
+
+        categorical, categories, passthrough = [], [], []
+        for name, step, columns in transformer.transformers_:
+            columns = [input_names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+            if step == "drop" or not columns:
+                continue
+            if name == "remainder":
+                if step != "passthrough" and getattr(step, "func", None) is not None:
+                    raise ValueError("Only a passthrough remainder can be compiled.")
+                passthrough.extend(columns)
+            elif getattr(step, "drop_idx_", None) is None and hasattr(step, "categories_"):
+                if passthrough:
+                    raise ValueError("Encoded columns must precede the passthrough remainder.")
+                if getattr(step, "infrequent_categories_", None) and any(
+                        c is not None for c in step.infrequent_categories_):
+                    raise ValueError("Infrequent-category grouping cannot be compiled.")
+                categorical.extend(columns)
+                categories.extend(step.categories_)
+            else:
+                raise ValueError(f"Cannot compile transformer '{name}'.")
+
+        if forest.n_outputs_ != 1:
+            raise ValueError("Only single-output forests can be compiled.")
+
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            nodes = np.arange(tree.node_count)
+            roots.append(offset)
+            # Leaves loop back onto themselves so every row can step a fixed number of levels
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            proba = tree.value[:, 0, :].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value.append(proba / normalizer)
+            offset += tree.node_count
+
+        return cls(
+            features=input_names,
+            categorical=categorical,
+            categories=categories,
+            passthrough=passthrough,
+            feature=np.concatenate(feature).astype(np.int64),
+            threshold=np.concatenate(threshold),
+            left=np.concatenate(left).astype(np.int64),
+            right=np.concatenate(right).astype(np.int64),
+            value=np.concatenate(value),
+            roots=np.array(roots, dtype=np.int64),
+            depth=max(e.tree_.max_depth for e in forest.estimators_),
+            classes=forest.classes_,
+        )
+
+    # === Persistence ===
+    def save(self, path):
+        """Write the compiled arrays to a single .npz file."""
+        np.savez(
+            path,
+            features=np.array(self.features, dtype=object),
+            categorical=np.array(self.categorical, dtype=object),
+            categories=np.array(self.categories + [None], dtype=object)[:-1],
+            passthrough=np.array(self.passthrough, dtype=object),
+            feature=self.feature, threshold=self.threshold,
+            left=self.left, right=self.right, value=self.value,
+            roots=self.roots, depth=self.depth, classes=self.classes,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=True) as data:
+            return cls(
+                features=data["features"].tolist(),
+                categorical=data["categorical"].tolist(),
+                categories=list(data["categories"]),
+                passthrough=data["passthrough"].tolist(),
+                feature=data["feature"], threshold=data["threshold"],
+                left=data["left"], right=data["right"], value=data["value"],
+                roots=data["roots"], depth=data["depth"], classes=data["classes"],
+            )
+
+    # === Inference ===
+    def transform(self, records):
+        """Encode a list of feature dicts (or a DataFrame) into the model's input matrix."""
+        if hasattr(records, "columns"):
+            return self._transform_frame(records)
+        X = np.zeros((len(records), self.width), dtype=np.float64)
+        for row, record in enumerate(records):
+            for name, lookup in zip(self.categorical, self.lookups):
+                col = lookup.get(record[name])
+                if col is not None:  # unknown categories encode to all zeros
+                    X[row, col] = 1.0
+            for i, name in enumerate(self.passthrough):
+                X[row, self.passthrough_offset + i] = record[name]
+        # Trees compare float32 features against float64 thresholds, as sklearn does
+        return X.astype(np.float32).astype(np.float64)
+
+    def _transform_frame(self, df):
+        """Vectorized transform() for DataFrame input."""
+        X = np.zeros((len(df), self.width), dtype=np.float64)
+        rows = np.arange(len(df))
+        offset = 0
+        for name, cats in zip(self.categorical, self.categories):
+            codes = pd.Categorical(df[name], categories=cats).codes
+            known = codes >= 0
+            X[rows[known], offset + codes[known]] = 1.0
+            offset += len(cats)
+        for i, name in enumerate(self.passthrough):
+            X[:, self.passthrough_offset + i] = df[name].to_numpy(dtype=np.float64)
+        return X.astype(np.float32).astype(np.float64)
+
+    def predict_proba(self, records):
+        X = self.transform(records)
+        n_trees = len(self.roots)
+        flat_X = X.ravel()
+        # One (row, tree) cursor per entry; only cursors not yet at a leaf are advanced
+        nodes = np.tile(self.roots, len(X))
+        row_base = np.repeat(np.arange(len(X)) * self.width, n_trees)
+        active = np.arange(len(nodes))
+        for _ in range(self.depth):
+            current = nodes[active]
+            go_right = flat_X[row_base[active] + self.feature.take(current)] > self.threshold.take(current)
+            nxt = self.children.take(2 * current + go_right)
+            nodes[active] = nxt
+            active = active[self.left.take(nxt) != nxt]
+            if not len(active):
+                break
+        # Accumulate trees in order, matching the forest's running sum
+        leaves = nodes.reshape(len(X), n_trees)
+        proba = np.cumsum(self.value.take(leaves, axis=0), axis=1)[:, -1]
+        proba /= n_trees
+        return proba
+
+    def predict(self, records):
+        return self.classes.take(np.argmax(self.predict_proba(records), axis=1), axis=0)
+
+
+# === Equivalence check and benchmark ===
+def check_equivalence(pipeline, compiled, X):
+    """Assert compiled.predict equals pipeline.predict on X, as a frame and as feature dicts."""
+    expected = pipeline.predict(X)
+    actual = compiled.predict(X)
+    mismatches = int((expected != actual).sum())
+    print(f"Equivalence: {len(X) - mismatches}/{len(X)} predictions identical")
+    assert np.array_equal(expected, actual), "Compiled model disagrees with pipeline.predict"
+    assert np.array_equal(expected, compiled.predict(X.to_dict(orient="records"))), \
+        "Compiled model disagrees with pipeline.predict on feature dicts"
+
+
+def benchmark(pipeline, compiled, X, repeat=200):
+    """Print single-record and whole-batch latency of the pipeline and the compiled model."""
+    single = X.head(1)
+    single_record = single.to_dict(orient="records")
+    for name, fn in [("pipeline", lambda: pipeline.predict(single)), ("compiled", lambda: compiled.predict(single_record))]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        print(f"{name:>9} single-record: {(time.perf_counter() - start) / repeat * 1000:.3f} ms/call")
+
+    for name, fn in [("pipeline", lambda: pipeline.predict(X)), ("compiled", lambda: compiled.predict(X))]:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>9} batch of {len(X)}: {elapsed * 1000:.1f} ms ({len(X) / elapsed:,.0f} rows/s)")
+
+
+# === Export, equivalence check and benchmark on the trained model ===
+if __name__ == "__main__":
+    import joblib
+    from data_store import read_dataset
+    from feature_store import SUSPECT_FEATURES_PATH, SUSPECT_MODEL_FEATURES, join_suspect_features
+
+    parser = argparse.ArgumentParser(description="Compile the trained pipeline into flat NumPy arrays")
+    parser.add_argument("--model", default="../models/trained_model.pkl")
+    parser.add_argument("--out", default="../models/trained_model.npz")
+    parser.add_argument("--data", default="../data/processed_data.pkl",
+                        help="dataset used to check equivalence and benchmark")
+    parser.add_argument("--repeat", type=int, default=200, help="single-record calls to time")
+    args = parser.parse_args()
+
+    pipeline = joblib.load(args.model)
+    compiled = CompiledForest.from_pipeline(pipeline)
+    compiled.save(args.out)
+    compiled = CompiledForest.load(args.out)
+    print(f"✅ Compiled {len(compiled.roots)} trees ({len(compiled.feature)} nodes) to {args.out}")
+
+    # Suspect features of a --suspect-features model come from the feature store
+    stored = [f for f in compiled.features if f in SUSPECT_MODEL_FEATURES]
+    columns = [f for f in compiled.features if f not in stored] + (["SuspectID"] if stored else [])
+    df = read_dataset(args.data, columns=columns)
+    if stored:
+        df = join_suspect_features(df, read_dataset(SUSPECT_FEATURES_PATH, columns=["SuspectID"] + stored), stored)
+    df = df.dropna(subset=compiled.features)
+    X = df[compiled.features]
+
+    try:
+        check_equivalence(pipeline, compiled, X)
+    except AssertionError as e:
+        raise SystemExit(f"❌ {e}")
+    benchmark(pipeline, compiled, X, args.repeat)
@@ -0,0 +1,272 @@
+import argparse
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Low-cardinality text columns stored dictionary-encoded (read back as pandas categoricals)
+CATEGORICAL_COLUMNS = [
+    "SuspectID", "LocationID", "CrimeType", "CrimeType_x", "CrimeType_y",
+    "WeaponUsed", "WeaponUsed_x", "WeaponUsed_y", "MODescription", "MODescription_x",
+    "MODescription_y", "MOCategory", "PredictedMOCategory", "PredictedCrimeType",
+    "LikelyWeapon", "MatchedMOExamples", "City", "Area",
+]
+
+# Write the legacy CSV/pickle next to every Parquet dataset (DATA_STORE_EXPORT=0 to skip)
+EXPORT_LEGACY = os.environ.get("DATA_STORE_EXPORT", "1") != "0"
+COMPRESSION = "zstd"
+# Rows per Parquet row group: the unit batch jobs read and score independently
+ROW_GROUP_SIZE = 100_000
+
+
+# === Paths ===
+def parquet_path(path):
+    """Parquet location of a dataset known by its CSV/pickle path."""
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def dataset_file(path):
+    """The file a reader of `path` actually loads: the Parquet copy when there is one."""
+    columnar = parquet_path(path)
+    return columnar if os.path.exists(columnar) else path
+
+
+# === Writing ===
+def to_table(df, keep_order=False, first_row=0):
+    """Arrow table with dictionary-encoded categorical columns.
+
+    keep_order stores the row number (counted from first_row, or df's own index when
+    first_row is None) as the pandas index, so a dataset split into partitions reads
+    back in its original row order.
+    """
+    if first_row is None:
+        df = df.copy()
+    else:
+        df = df.set_axis(pd.RangeIndex(first_row, first_row + len(df)), axis=0)
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) not in ("string", "empty", "boolean"):
+            # fillna("Unknown") leaves numbers and text in one column; keep it as text
+            df[column] = values.where(values.isna(), values.astype(str))
+        if column in CATEGORICAL_COLUMNS and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    return pa.Table.from_pandas(df, preserve_index=keep_order)
+
+
+def partition_keys(df, partition_by):
+    """Partition key per row: the year of a date column (CrimeDate...), or the column's value."""
+    values = df[partition_by]
+    if partition_by.endswith("Date") or pd.api.types.is_datetime64_any_dtype(values):
+        years = pd.to_datetime(values, errors="coerce").dt.year.astype("Int64")
+        return years.astype(str).replace("<NA>", "unknown")
+    return values.astype(str).str.replace(r"[^\w.-]+", "_", regex=True)
+
+
+def write_dataset(df, path, partition_by=None, export=EXPORT_LEGACY):
+    """Write df as Parquet next to `path` (e.g. data/x.csv -> data/x.parquet).
+
+    With partition_by the dataset becomes a directory holding one file per year (date
+    columns) or per value (e.g. City), so readers filtering on it skip whole files. The
+    replacement is swapped in atomically. With export, the CSV/pickle at `path` is
+    written too, for tools that still read it.
+    """
+    target = parquet_path(path)
+    tmp = target + ".tmp"
+    remove_path(tmp)
+    table = to_table(df, keep_order=partition_by is not None)
+    if partition_by is None:
+        pq.write_table(table, tmp, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+    else:
+        # Slices of one table, so every file has the same schema and dictionaries
+        os.makedirs(tmp)
+        keys = partition_keys(df, partition_by)
+        for key, rows in sorted(keys.groupby(keys.to_numpy()).indices.items()):
+            pq.write_table(table.take(rows), os.path.join(tmp, f"{key}.parquet"), compression=COMPRESSION,
+                           row_group_size=ROW_GROUP_SIZE)
+
+    replace_path(tmp, target)
+
+    if export:
+        export_legacy(df, path)
+    return target
+
+
+class DatasetWriter:
+    """Append DataFrame chunks to a Parquet dataset, holding one chunk at a time.
+
+    Same layout as write_dataset() (partition files, row order, categoricals): every
+    partition file is an open ParquetWriter taking one row group per chunk, and the
+    dataset replaces the old one when the writer is closed. The CSV export is appended
+    chunk by chunk; a pickle cannot be, so it is not written.
+    """
+
+    def __init__(self, path, partition_by=None, export=EXPORT_LEGACY):
+        self.path = path
+        self.partition_by = partition_by
+        self.export = export and not path.endswith(".pkl")
+        self.target = parquet_path(path)
+        self.tmp = self.target + ".tmp"
+        self.schema = None
+        self.writers = {}
+        self.rows = 0
+        remove_path(self.tmp)
+        if partition_by is not None:
+            os.makedirs(self.tmp)
+        if self.export:
+            remove_path(self.path + ".tmp")
+
+    def write(self, df):
+        table = to_table(df, keep_order=self.partition_by is not None, first_row=self.rows)
+        if self.schema is None:
+            # Chunks encode their own dictionaries; fix one index width for all of them
+            self.schema = pa.schema([
+                field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                if pa.types.is_dictionary(field.type) else field
+                for field in table.schema
+            ], metadata=table.schema.metadata)
+        table = table.cast(self.schema)
+
+        if self.partition_by is None:
+            self._writer(self.tmp).write_table(table, row_group_size=ROW_GROUP_SIZE)
+        else:
+            keys = partition_keys(df, self.partition_by)
+            for key, rows in sorted(keys.groupby(keys.to_numpy()).indices.items()):
+                self._writer(os.path.join(self.tmp, f"{key}.parquet")).write_table(
+                    table.take(rows), row_group_size=ROW_GROUP_SIZE)
+
+        if self.export:
+            df.to_csv(self.path + ".tmp", mode="a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def _writer(self, file):
+        writer = self.writers.get(file)
+        if writer is None:
+            writer = self.writers[file] = pq.ParquetWriter(file, self.schema, compression=COMPRESSION)
+        return writer
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+        if self.schema is None:
+            raise ValueError(f"No rows written to {self.target}")
+        replace_path(self.tmp, self.target)
+        if self.export:
+            os.replace(self.path + ".tmp", self.path)
+        return self.target
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            for writer in self.writers.values():
+                writer.close()
+            remove_path(self.tmp)
+
+
+def replace_path(tmp, target):
+    """Move a freshly written file or directory over target."""
+    # A file replaces a file in one step; a directory has to move the old one aside first
+    old = target + ".old"
+    remove_path(old)
+    if os.path.isdir(target) or (os.path.isdir(tmp) and os.path.exists(target)):
+        os.replace(target, old)
+    os.replace(tmp, target)
+    remove_path(old)
+
+
+def remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def export_legacy(df, path):
+    if path.endswith(".pkl"):
+        df.to_pickle(path)
+    else:
+        df.to_csv(path, index=False)
+
+
+# === Reading ===
+def read_dataset(path, columns=None, filters=None, categorical=True):
+    """Load a dataset by its CSV/pickle path, only the given columns.
+
+    Prefers the Parquet copy; falls back to the CSV or pickle itself, so stages keep
+    working on data written before the columnar store existed. filters (pyarrow
+    syntax, e.g. [("CrimeType", "in", ["theft"])]) are only applied to Parquet reads.
+    Encoded columns come back as categoricals unless categorical=False, for callers
+    that write new values into them (fillna, cleaning).
+    """
+    columnar = parquet_path(path)
+    if os.path.exists(columnar):
+        df = pq.read_table(columnar, columns=columns, filters=filters, use_pandas_metadata=True).to_pandas()
+        if not isinstance(df.index, pd.RangeIndex):
+            # Partitioned: restore the row order the dataset was written in
+            df = df.sort_index().reset_index(drop=True)
+        if not categorical:
+            for column in df.columns:
+                if isinstance(df[column].dtype, pd.CategoricalDtype):
+                    df[column] = df[column].astype(object)
+        return df
+    if path.endswith(".pkl"):
+        df = pd.read_pickle(path)
+        return df[columns] if columns is not None else df
+    return pd.read_csv(path, usecols=columns)
+
+
+def dataset_files(path):
+    """Parquet files of a dataset, in partition order (hidden and temporary files skipped)."""
+    columnar = parquet_path(path)
+    if not os.path.isdir(columnar):
+        return [columnar] if os.path.exists(columnar) else []
+    return [os.path.join(columnar, name) for name in sorted(os.listdir(columnar))
+            if name.endswith(".parquet") and not name.startswith((".", "_"))]
+
+
+def row_groups(path):
+    """(file, row group, first row in the file, rows) for every row group of a dataset."""
+    for file in dataset_files(path):
+        metadata = pq.ParquetFile(file).metadata
+        first_row = 0
+        for group in range(metadata.num_row_groups):
+            rows = metadata.row_group(group).num_rows
+            yield file, group, first_row, rows
+            first_row += rows
+
+
+def read_row_group(file, group, columns=None, first_row=0):
+    """One row group as a DataFrame, indexed by row number (stored one, else counted from first_row)."""
+    df = pq.ParquetFile(file).read_row_group(group, columns=columns, use_pandas_metadata=True).to_pandas()
+    if isinstance(df.index, pd.RangeIndex):
+        df.index = pd.RangeIndex(first_row, first_row + len(df))
+    return df
+
+
+def convert(path, partition_by=None):
+    """Build the Parquet copy of an existing CSV or pickle, with the dtypes pandas reads."""
+    df = pd.read_pickle(path) if path.endswith(".pkl") else pd.read_csv(path)
+    return write_dataset(df, path, partition_by=partition_by, export=False)
+
+
+# === Standalone conversion / export ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert datasets to Parquet or export them back to CSV")
+    parser.add_argument("command", choices=["convert", "export"])
+    parser.add_argument("path", help="dataset path as the pipeline knows it (.csv or .pkl)")
+    parser.add_argument("--partition-by", help="date column (partitioned by year) or column such as City")
+    parser.add_argument("--out", help="CSV file to export to (default: next to the dataset)")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        target = convert(args.path, partition_by=args.partition_by)
+        print(f"✅ {args.path} converted to {target}")
+    else:
+        out = args.out or os.path.splitext(args.path)[0] + ".csv"
+        read_dataset(args.path).to_csv(out, index=False)
+        print(f"✅ {dataset_file(args.path)} exported to {out}")
@@ -0,0 +1,231 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+try:
+    # Imported as utils.feature_store by app.py and train_model.py
+    from .data_store import dataset_file, parquet_path, read_dataset, remove_path, write_dataset
+except ImportError:
+    # Run or imported as a script from utils/, like the other stages
+    from data_store import dataset_file, parquet_path, read_dataset, remove_path, write_dataset
+
+DATA_PATH = "../data/processed_data.pkl"
+RISK_SCORES_PATH = "../data/risk_scores.csv"
+CRIME_FEATURES_PATH = "../data/crime_features.csv"
+SUSPECT_FEATURES_PATH = "../data/suspect_features.csv"
+
+# Processed-data columns the features are derived from (the ones the rule predictor reads)
+SOURCE_COLUMNS = ["CrimeID", "SuspectID", "CrimeDate", "CrimeType", "SeverityScore", "LocationID"]
+# Columns of risk_scores.csv carried in the suspect table, as the API serves them
+RISK_COLUMNS = ["RiskScore", "CalculationDate", "SeverityComponent", "RecencyComponent", "CrimeCount",
+                "ViolentCrimeCount", "GangAffiliated", "CommunityInfluence"]
+# Numeric suspect features train_model.py --suspect-features adds to the model inputs
+SUSPECT_MODEL_FEATURES = ["Crimes", "SeverityMean", "LocationCount"]
+
+TIMES_OF_DAY = ["Morning", "Afternoon", "Evening", "Night", "Unknown"]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday", "Unknown"]
+# IMD seasons, by month
+SEASONS = ["Winter", "Summer", "Monsoon", "Post-monsoon", "Unknown"]
+MONTH_SEASONS = np.array(["Unknown", "Winter", "Winter", "Summer", "Summer", "Summer", "Monsoon", "Monsoon",
+                          "Monsoon", "Monsoon", "Post-monsoon", "Post-monsoon", "Post-monsoon"], dtype=object)
+# Per-suspect count columns: crime column -> (column prefix, fixed categories or None)
+COUNT_COLUMNS = {
+    "CrimeType": ("Crimes", None),
+    "TimeOfDay": ("TimeOfDay", TIMES_OF_DAY),
+    "Weekday": ("Weekday", WEEKDAYS),
+    "Season": ("Season", SEASONS),
+}
+
+
+# === Per-crime features ===
+def parse_dates(values):
+    """Dates of a column in one vectorized pass; values in another format get a second, mixed pass."""
+    values = pd.Series(values).astype(object)
+    dates = pd.to_datetime(values, errors="coerce")
+    retry = dates.isna() & values.notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(values[retry], errors="coerce", format="mixed")
+    return dates
+
+
+def time_of_day(dates):
+    """Morning 6-12, Afternoon 12-18, Evening 18-21, Night otherwise; Unknown without a date."""
+    hour = dates.dt.hour
+    bins = np.select([hour.between(6, 11), hour.between(12, 17), hour.between(18, 20), hour.notna()],
+                     TIMES_OF_DAY[:4], "Unknown")
+    return pd.Series(bins, index=dates.index)
+
+
+def weekday(dates):
+    return dates.dt.day_name().fillna("Unknown")
+
+
+def season(dates):
+    return pd.Series(MONTH_SEASONS[dates.dt.month.fillna(0).astype(int).to_numpy()], index=dates.index)
+
+
+def source_rows(df):
+    """One row per crime with its source columns and a hash of them, to spot new or changed crimes."""
+    crimes = df[SOURCE_COLUMNS].drop_duplicates("CrimeID").reset_index(drop=True)
+    for column in crimes.columns:
+        if isinstance(crimes[column].dtype, pd.CategoricalDtype):
+            crimes[column] = crimes[column].astype(object)
+    crimes["RowHash"] = pd.util.hash_pandas_object(crimes.astype(str), index=False).to_numpy()
+    return crimes
+
+
+def crime_features(crimes):
+    """Time-of-day, weekday and season bins of source rows, plus numeric severity and parsed dates."""
+    crimes = crimes.copy()
+    dates = parse_dates(crimes["CrimeDate"])
+    crimes["CrimeDate"] = dates
+    crimes["SeverityScore"] = pd.to_numeric(crimes["SeverityScore"], errors="coerce")
+    crimes["TimeOfDay"] = time_of_day(dates)
+    crimes["Weekday"] = weekday(dates)
+    crimes["Season"] = season(dates)
+    return crimes
+
+
+# === Per-suspect features ===
+def suspect_features(crimes):
+    """Aggregate crime features per suspect: counts by crime type and time bins, severity stats,
+    locations and first/last crime dates.
+    """
+    groups = crimes.groupby("SuspectID", sort=True)
+    table = groups.agg(
+        Crimes=("CrimeID", "size"),
+        SeverityMean=("SeverityScore", "mean"),
+        SeverityMin=("SeverityScore", "min"),
+        SeverityMax=("SeverityScore", "max"),
+        LocationCount=("LocationID", "nunique"),
+        FirstCrimeDate=("CrimeDate", "min"),
+        LastCrimeDate=("CrimeDate", "max"),
+    )
+    located = crimes.dropna(subset=["LocationID"]).astype({"LocationID": str})
+    located = located.drop_duplicates(["SuspectID", "LocationID"]).sort_values(["SuspectID", "LocationID"])
+    table["Locations"] = located.groupby("SuspectID")["LocationID"].agg("|".join).reindex(table.index).fillna("")
+
+    for column, (prefix, categories) in COUNT_COLUMNS.items():
+        values = crimes[column].astype(str) if categories is None else pd.Categorical(crimes[column], categories)
+        counts = pd.get_dummies(values, prefix=prefix, prefix_sep="_", dtype=np.int64)
+        counts.index = crimes.index
+        table = table.join(counts.groupby(crimes["SuspectID"]).sum())
+    return table.reset_index()
+
+
+def count_columns(columns):
+    prefixes = tuple(f"{prefix}_" for prefix, _ in COUNT_COLUMNS.values())
+    return [c for c in columns if c.startswith(prefixes)]
+
+
+def locations(suspects):
+    """Location set of every suspect, as a Series of lists indexed by SuspectID."""
+    values = suspects.set_index("SuspectID")["Locations"].fillna("")
+    return values.map(lambda joined: joined.split("|") if joined else [])
+
+
+def join_suspect_features(df, suspects, columns):
+    """df with per-suspect feature columns added by SuspectID; suspects not in the store get 0."""
+    values = suspects.set_index("SuspectID")[columns].reindex(df["SuspectID"].astype(object)).fillna(0)
+    return df.assign(**{column: values[column].to_numpy() for column in columns})
+
+
+# === Store ===
+class FeatureStore:
+    """Materialized per-crime and per-suspect features, updated incrementally.
+
+    The crime table has one row per CrimeID with its bins and a hash of its source
+    columns; the suspect table is keyed by SuspectID and carries the risk_scores.csv
+    columns too. An update featurizes only crimes whose hash is new and re-aggregates
+    only the suspects whose crimes were added, changed or removed; the result is the
+    same as a rebuild from scratch.
+    """
+
+    def __init__(self, crimes=None, suspects=None):
+        if crimes is None:
+            empty = pd.DataFrame({column: pd.Series(dtype=object) for column in SOURCE_COLUMNS})
+            crimes = crime_features(empty.assign(RowHash=pd.Series(dtype=np.uint64)))
+        self.crimes = crimes
+        self.suspects = suspects if suspects is not None else suspect_features(self.crimes)
+
+    @classmethod
+    def load(cls, crime_path=CRIME_FEATURES_PATH, suspect_path=SUSPECT_FEATURES_PATH):
+        """The saved store, or an empty one."""
+        if not (os.path.exists(dataset_file(crime_path)) and os.path.exists(dataset_file(suspect_path))):
+            return cls()
+        crimes = read_dataset(crime_path, categorical=False)
+        crimes["CrimeDate"] = pd.to_datetime(crimes["CrimeDate"])
+        return cls(crimes, read_dataset(suspect_path, categorical=False))
+
+    def save(self, crime_path=CRIME_FEATURES_PATH, suspect_path=SUSPECT_FEATURES_PATH):
+        # The crime table is the store's own state; only the suspect table gets a CSV export
+        write_dataset(self.crimes, crime_path, export=False)
+        write_dataset(self.suspects, suspect_path)
+
+    def matches(self, df):
+        """True if the store holds exactly the crimes of the processed dataset df, unchanged."""
+        rows = source_rows(df)
+        return len(rows) == len(self.crimes) and bool(rows["RowHash"].isin(self.crimes["RowHash"]).all())
+
+    def update(self, df, complete=True):
+        """Take in processed records; returns the IDs of suspects whose features changed.
+
+        With complete, df is the whole dataset and crimes missing from it are dropped;
+        otherwise df holds newly arrived or corrected records, upserted by CrimeID.
+        """
+        rows = source_rows(df)
+        new = rows[~rows["RowHash"].isin(self.crimes["RowHash"])]
+        if complete:
+            gone = ~self.crimes["RowHash"].isin(rows["RowHash"])
+        else:
+            gone = self.crimes["CrimeID"].isin(new["CrimeID"])
+        changed = pd.Index(new["SuspectID"]).union(pd.Index(self.crimes.loc[gone, "SuspectID"])).unique()
+        if not len(changed):
+            return changed
+
+        self.crimes = pd.concat([self.crimes[~gone], crime_features(new)], ignore_index=True)
+        # Fixed row order, so every suspect's sums come out as in a rebuild
+        self.crimes = self.crimes.sort_values("CrimeID", ignore_index=True)
+
+        fresh = suspect_features(self.crimes[self.crimes["SuspectID"].isin(changed)])
+        kept = self.suspects[~self.suspects["SuspectID"].isin(changed)].drop(columns=RISK_COLUMNS, errors="ignore")
+        suspects = pd.concat([kept, fresh], ignore_index=True).sort_values("SuspectID", ignore_index=True)
+        counts = count_columns(suspects.columns)
+        suspects[counts] = suspects[counts].fillna(0).astype(np.int64)
+        # Crime types no suspect has any more
+        empty = [c for c in counts if c.startswith("Crimes_") and not suspects[c].any()]
+        self.suspects = suspects.drop(columns=empty)
+        return changed
+
+    def attach_risk(self, risk):
+        """Replace the risk_scores.csv columns of the suspect table with risk's."""
+        columns = [c for c in RISK_COLUMNS if c in risk]
+        suspects = self.suspects.drop(columns=RISK_COLUMNS, errors="ignore")
+        self.suspects = pd.merge(suspects, risk[["SuspectID"] + columns], on="SuspectID", how="left")
+
+
+def refresh_store(df, risk_path=RISK_SCORES_PATH):
+    """Bring the saved store up to date with the processed dataset df; returns the store."""
+    store = FeatureStore.load()
+    before = store.suspects.copy()
+    changed = store.update(df)
+    if os.path.exists(dataset_file(risk_path)):
+        store.attach_risk(read_dataset(risk_path, categorical=False))
+    if len(changed) or not before.equals(store.suspects):
+        store.save()
+        print(f"Feature store: {len(changed)} suspects updated, {len(store.suspects)} in total.")
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or update the per-suspect feature store")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every suspect from scratch")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        for path in (CRIME_FEATURES_PATH, SUSPECT_FEATURES_PATH):
+            remove_path(parquet_path(path))
+            remove_path(path)
+    refresh_store(read_dataset(DATA_PATH, columns=SOURCE_COLUMNS))
+    print(f"✅ Features saved to {SUSPECT_FEATURES_PATH}")
@@ -3,8 +3,16 @@ import random
 import numpy as np
 from datetime import datetime, timedelta
 from faker import Faker
+from faker.providers.person.en_IN import Provider as PersonProvider
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import math  # For exponential decay in risk calculation
+import os
+import shutil
+import tempfile
+from data_store import convert
+from risk_engine import SCORE_COLUMNS, VIOLENT_CRIME_TYPES, RiskEngine
 
 # Initialize with Indian locale and seed for reproducibility
 fake = Faker('en_IN')
@@ -14,6 +22,10 @@ np.random.seed(42)
 # Constants with Tamil Nadu context
 NUM_RECORDS = 50
 DATASET_PATH = "backend/data/"
+# Outputs also stored as Parquet for the next stages (value: partition column)
+COLUMNAR_OUTPUTS = {"crime_records.csv": "CrimeDate", "risk_scores.csv": None}
+# RiskEngine state behind risk_scores.csv, for risk_engine.py to add new crimes to
+RISK_STATE_NAME = "risk_engine.npz"
 
 CITIES = {
     "Chennai": {"areas": ["T. Nagar", "Anna Nagar", "Adyar", "Velachery", "Nungambakkam", "Mylapore", "Kilpauk", "Tambaram", "Pallavaram", "Perambur"], 
@@ -77,6 +89,16 @@ WEAPONS = {
     "Temple Theft": ["Duplicate keys", "Lock picks", "Crowbars", "Gas cutters", "Religious disguises"]
 }
 
+# Relative frequency of each crime type, in CRIME_TYPES order
+CRIME_TYPE_WEIGHTS = [0.1, 0.15, 0.15, 0.1, 0.2, 0.1, 0.1, 0.05, 0.05]
+
+# Evidence found per crime type
+EVIDENCE_TYPES = {
+    "Murder": ["Blood-stained clothes", "Murder weapon", "Fingerprints", "DNA samples", "CCTV footage"],
+    "Robbery": ["CCTV footage", "Stolen items", "Vehicle used", "Gloves left behind"],
+    # ... [other crime types with their evidence]
+}
+
 # MO Pattern Manager Class with enhanced patterns
 class MOPatternManager:
     def __init__(self):
@@ -127,15 +149,19 @@ class IDGenerator:
         return id_value
 
 # Enhanced Risk Score Calculation with exponential decay
-def calculate_risk_score(crimes, age, is_one_time=False):
-    """Calculate risk score based on severity, recency, frequency, and age"""
+def calculate_risk_score(crimes, age, is_one_time=False, now=None):
+    """Calculate risk score based on severity, recency, frequency, and age
+
+    Reference form of the risk model; RiskEngine computes the same scores for many suspects at once.
+    """
+    now = now or datetime.now()
     base_score = 0
     crime_counts = defaultdict(int)
     violent_crime_count = 0
     
     for crime in crimes:
         crime_type = crime["type"]
-        days_ago = (datetime.now() - crime["date"]).days
+        days_ago = (now - crime["date"]).days
         
         # Exponential decay for recency
         recency_factor = math.exp(-days_ago / 365)
@@ -166,255 +192,720 @@ def calculate_risk_score(crimes, age, is_one_time=False):
     final_score = (base_score * repeat_offender_weight + frequency_component + violent_crime_bonus) * age_adjustment
     return min(10.0, round(final_score, 1))
 
+# Check RiskEngine against calculate_risk_score on random suspects
+def check_risk_engine(num_suspects=2000, seed=0):
+    """Score random suspects with both forms and require identical output.
+
+    The engine gets its crimes in two batches, saved and reloaded in between, as
+    risk_engine.py adds crimes to a saved engine.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    df_suspects = pd.DataFrame({
+        "SuspectID": [f"S{i:05d}" for i in range(num_suspects)],
+        "Age": [rng.randint(18, 80) for _ in range(num_suspects)],
+        "OffenseType": [rng.choice(["One-time", "Recurring"]) for _ in range(num_suspects)],
+    })
+    suspect_crimes = {
+        suspect_id: [{"type": rng.choice(list(CRIME_TYPES)), "date": random_date(2015, 2023)}
+                     for _ in range(rng.randint(0, 8))]
+        for suspect_id in df_suspects["SuspectID"]
+    }
+
+    engine = RiskEngine({t: c["severity"] for t, c in CRIME_TYPES.items()}, reference_time=now)
+    engine.add_suspects(df_suspects["SuspectID"], df_suspects["Age"], df_suspects["OffenseType"] == "One-time")
+    crime_log = [(suspect_id, c["type"], c["date"]) for suspect_id, crimes in suspect_crimes.items() for c in crimes]
+    half = len(crime_log) // 2
+    state_path = os.path.join(tempfile.mkdtemp(), RISK_STATE_NAME)
+    try:
+        engine.add_crimes(*zip(*crime_log[:half]))
+        engine.save(state_path)
+        engine = RiskEngine.load(state_path)
+        engine.add_crimes(*zip(*crime_log[half:]))
+    finally:
+        shutil.rmtree(os.path.dirname(state_path), ignore_errors=True)
+    scored = engine.scores().set_index("SuspectID")
+
+    mismatches = []
+    for suspect_id, crimes in suspect_crimes.items():
+        suspect = df_suspects[df_suspects["SuspectID"] == suspect_id].iloc[0]
+        expected = (
+            calculate_risk_score(crimes, suspect["Age"], suspect["OffenseType"] == "One-time", now=now),
+            round(sum(CRIME_TYPES[c["type"]]["severity"] for c in crimes), 1),
+            round(sum(math.exp(-(now - c["date"]).days / 365) for c in crimes), 1),
+            len(crimes),
+            sum(1 for c in crimes if c["type"] in VIOLENT_CRIME_TYPES),
+        )
+        if expected != tuple(scored.loc[suspect_id, SCORE_COLUMNS[1:]].tolist()):
+            mismatches.append(suspect_id)
+    print(f"Risk engine: {num_suspects - len(mismatches)}/{num_suspects} suspects identical to calculate_risk_score")
+    return mismatches
+
 # Generate Random Date within a range
 def random_date(start_year=2020, end_year=2023):
     start = datetime(start_year, 1, 1)
     end = datetime(end_year, 12, 31)
     return start + timedelta(days=random.randint(0, (end - start).days))
 
-# Generate Locations with hotspot markers
-locations = []
-location_id_gen = IDGenerator("L")
-for i in range(1, NUM_RECORDS//2 + 1):
-    city = random.choice(list(CITIES.keys()))
-    area = random.choice(CITIES[city]["areas"])
-    lat = round(random.uniform(*CITIES[city]["lat_range"]), 6)
-    lon = round(random.uniform(*CITIES[city]["lon_range"]), 6)
-    locations.append({
-        "LocationID": location_id_gen.generate_id(),
-        "City": city,
-        "Area": area,
-        "Latitude": lat,
-        "Longitude": lon,
-        "IsHotspot": area in CITIES[city].get("crime_hotspots", [])
-    })
-df_locations = pd.DataFrame(locations)
-
-# Generate Suspects with enhanced attributes
-suspect_id_gen = IDGenerator("S")
-suspects = []
-suspect_crimes = defaultdict(list)
-
-for i in range(1, NUM_RECORDS//2 + 1):
-    gender = random.choice(["Male", "Female"])
-    first_name = fake.first_name_male() if gender == "Male" else fake.first_name_female()
-    last_name = random.choice(indian_castes)
-    age = random.choices([18, 25, 35, 45, 55, 65], weights=[0.1, 0.2, 0.3, 0.2, 0.15, 0.05])[0]
+# === Generate the dataset record by record ===
+def save_columnar(dataset_path):
+    """Parquet copies of the CSVs in COLUMNAR_OUTPUTS, with the dtypes pandas reads back."""
+    for name, partition_by in COLUMNAR_OUTPUTS.items():
+        convert(f"{dataset_path}{name}", partition_by=partition_by)
+
+
+def generate_dataset(num_records=NUM_RECORDS, dataset_path=DATASET_PATH):
+    # Generate Locations with hotspot markers
+    locations = []
+    location_id_gen = IDGenerator("L")
+    for i in range(1, num_records//2 + 1):
+        city = random.choice(list(CITIES.keys()))
+        area = random.choice(CITIES[city]["areas"])
+        lat = round(random.uniform(*CITIES[city]["lat_range"]), 6)
+        lon = round(random.uniform(*CITIES[city]["lon_range"]), 6)
+        locations.append({
+            "LocationID": location_id_gen.generate_id(),
+            "City": city,
+            "Area": area,
+            "Latitude": lat,
+            "Longitude": lon,
+            "IsHotspot": area in CITIES[city].get("crime_hotspots", [])
+        })
+    df_locations = pd.DataFrame(locations)
+
+    # Generate Suspects with enhanced attributes
+    suspect_id_gen = IDGenerator("S")
+    suspects = []
+    suspect_crimes = defaultdict(list)
+
+    for i in range(1, num_records//2 + 1):
+        gender = random.choice(["Male", "Female"])
+        first_name = fake.first_name_male() if gender == "Male" else fake.first_name_female()
+        last_name = random.choice(indian_castes)
+        age = random.choices([18, 25, 35, 45, 55, 65], weights=[0.1, 0.2, 0.3, 0.2, 0.15, 0.05])[0]
     
-    # More accurate age calculation
-    birth_year = datetime.now().year - age
-    dob = datetime(birth_year, random.randint(1, 12), random.randint(1, 28))
+        # More accurate age calculation
+        birth_year = datetime.now().year - age
+        dob = datetime(birth_year, random.randint(1, 12), random.randint(1, 28))
     
-    suspect_id = suspect_id_gen.generate_id()
-    is_one_time = random.random() < 0.3
+        suspect_id = suspect_id_gen.generate_id()
+        is_one_time = random.random() < 0.3
     
-    # Gang affiliation (20% chance)
-    gang = None
-    if random.random() < 0.2:
-        city = random.choice(list(GANGS.keys()))
-        gang = random.choice(GANGS[city])
+        # Gang affiliation (20% chance)
+        gang = None
+        if random.random() < 0.2:
+            city = random.choice(list(GANGS.keys()))
+            gang = random.choice(GANGS[city])
     
-    suspects.append({
-        "SuspectID": suspect_id,
-        "Name": f"{first_name} {last_name}",
-        "Age": age,
-        "DOB": dob.strftime("%Y-%m-%d"),
-        "Gender": gender,
-        "RiskScore": 0,  # Will be calculated
-        "OffenseType": "One-time" if is_one_time else "Recurring",
-        "Caste": last_name,
-        "CommunityInfluenceLevel": random.choice(["Low", "Medium", "High"]),
-        "GangAffiliation": gang
-    })
-df_suspects = pd.DataFrame(suspects)
-
-# Generate Crime Records with all attributes
-crime_id_gen = IDGenerator("C")
-mo_id_gen = IDGenerator("MO")
-evidence_id_gen = IDGenerator("E")
-mo_manager = MOPatternManager()
-
-crime_records = []
-mo_details = []
-crime_frequencies = defaultdict(lambda: defaultdict(int))
-victims = []
-evidence = []
-crime_patterns = []
-
-for i in range(1, NUM_RECORDS + 1):
-    crime_type = random.choices(
-        list(CRIME_TYPES.keys()),
-        weights=[0.1, 0.15, 0.15, 0.1, 0.2, 0.1, 0.1, 0.05, 0.05]
-    )[0]
+        suspects.append({
+            "SuspectID": suspect_id,
+            "Name": f"{first_name} {last_name}",
+            "Age": age,
+            "DOB": dob.strftime("%Y-%m-%d"),
+            "Gender": gender,
+            "RiskScore": 0,  # Will be calculated
+            "OffenseType": "One-time" if is_one_time else "Recurring",
+            "Caste": last_name,
+            "CommunityInfluenceLevel": random.choice(["Low", "Medium", "High"]),
+            "GangAffiliation": gang
+        })
+    df_suspects = pd.DataFrame(suspects)
+
+    # Generate Crime Records with all attributes
+    crime_id_gen = IDGenerator("C")
+    mo_id_gen = IDGenerator("MO")
+    evidence_id_gen = IDGenerator("E")
+    mo_manager = MOPatternManager()
+
+    crime_records = []
+    mo_details = []
+    crime_frequencies = defaultdict(lambda: defaultdict(int))
+    victims = []
+    evidence = []
+    crime_patterns = []
+
+    for i in range(1, num_records + 1):
+        crime_type = random.choices(
+            list(CRIME_TYPES.keys()),
+            weights=CRIME_TYPE_WEIGHTS
+        )[0]
+    
+        suspect = df_suspects.sample(1).iloc[0]
+        suspect_id = suspect["SuspectID"]
+        location = df_locations.sample(1).iloc[0]
+        location_id = location["LocationID"]
+        crime_date = random_date()
+    
+        # Generate crime description
+        crime_desc = random.choice(CRIME_TYPES[crime_type]["desc"])
+        crime_desc = f"{crime_desc} in {location['Area']}, {location['City']}"
+
+        # Generate MO Description
+        mo_desc = mo_manager.get_pattern(crime_type)
+
+        # Generate weapon used
+        weapon = random.choice(WEAPONS[crime_type])
+
+        # Create crime record
+        crime_id = crime_id_gen.generate_id()
+        crime_records.append({
+            "CrimeID": crime_id,
+            "CrimeType": crime_type,
+            "CrimeDate": crime_date.strftime("%Y-%m-%d"),
+            "CrimeDescription": crime_desc,
+            "SuspectID": suspect_id,
+            "LocationID": location_id,
+            "MODescription": mo_desc,
+            "WeaponUsed": weapon,
+            "SeverityScore": CRIME_TYPES[crime_type]["severity"],
+            "RecencyWeight": CRIME_TYPES[crime_type]["recency"],
+            "IsHotspot": location["IsHotspot"]
+        })
+
+        # Track crimes for risk calculation
+        suspect_crimes[suspect_id].append({
+            "type": crime_type,
+            "date": crime_date
+        })
+
+        # MO Details
+        mo_id = mo_id_gen.generate_id()
+        mo_details.append({
+            "MOID": mo_id,
+            "CrimeID": crime_id,
+            "MODescription": mo_desc,
+            "MOCategory": crime_type,
+            "WeaponUsed": weapon,
+            "SeverityImpact": CRIME_TYPES[crime_type]["severity"],
+            "IsGangRelated": suspect["GangAffiliation"] is not None
+        })
+
+        # Crime Frequency
+        crime_frequencies[suspect_id][crime_type] += 1
+
+        # Generate Victim
+        victims.append({
+            "VictimID": f"V{i:04d}",
+            "CrimeID": crime_id,
+            "Name": fake.name(),
+            "Age": random.randint(18, 70),
+            "Gender": random.choice(["Male", "Female"]),
+            "InjurySeverity": random.choices(
+                ["Fatal", "Major", "Minor", "No Injury"],
+                weights=[0.1 if crime_type == "Murder" else 0.05, 0.3, 0.4, 0.25]
+            )[0],
+            "CrimeSeverity": CRIME_TYPES[crime_type]["severity"],
+            "IsForeigner": random.random() < 0.1  # 10% chance victim is foreigner
+        })
+
+        # Generate Evidence
+        evidence_id = evidence_id_gen.generate_id()
+        evidence.append({
+            "EvidenceID": evidence_id,
+            "CrimeID": crime_id,
+            "Type": random.choice(["Physical", "Digital", "Biological", "Documentary"]),
+            "Description": random.choice(EVIDENCE_TYPES.get(crime_type, ["General evidence"])),
+            "CrimeSeverity": CRIME_TYPES[crime_type]["severity"],
+            "ForensicValue": random.choices(["High", "Medium", "Low"], weights=[0.3, 0.5, 0.2])[0]
+        })
+
+        # Crime Pattern
+        crime_patterns.append({
+            "PatternID": f"P{i:04d}",
+            "SuspectID": suspect_id,
+            "CrimeID": crime_id,
+            "PatternDate": crime_date.strftime("%Y-%m-%d"),
+            "CrimeType": crime_type,
+            "SeverityScore": CRIME_TYPES[crime_type]["severity"],
+            "RecencyImpact": CRIME_TYPES[crime_type]["recency"],
+            "LocationPattern": location["Area"],
+            "WeaponPattern": weapon,
+            "CityPattern": location["City"],
+            "IsHotspot": location["IsHotspot"]
+        })
+
+    # Calculate Risk Scores with new formula, all against one reference time
+    now = datetime.now()
+    engine = RiskEngine({t: c["severity"] for t, c in CRIME_TYPES.items()}, reference_time=now)
+    engine.add_suspects(df_suspects["SuspectID"], df_suspects["Age"], df_suspects["OffenseType"] == "One-time")
+    crime_log = [(suspect_id, c["type"], c["date"]) for suspect_id, crimes in suspect_crimes.items() for c in crimes]
+    if crime_log:
+        engine.add_crimes(*zip(*crime_log))
+    scored = engine.scores(list(suspect_crimes)).set_index("SuspectID")
+    suspect_rows = {suspect_id: idx for idx, suspect_id in zip(df_suspects.index, df_suspects["SuspectID"])}
+
+    risk_scores = []
+    for suspect_id, crimes in suspect_crimes.items():
+        idx = suspect_rows[suspect_id]
+        suspect = df_suspects.loc[idx]
+        score = scored.at[suspect_id, "RiskScore"]
     
-    suspect = df_suspects.sample(1).iloc[0]
-    suspect_id = suspect["SuspectID"]
-    location = df_locations.sample(1).iloc[0]
-    location_id = location["LocationID"]
-    crime_date = random_date()
+        risk_scores.append({
+            "SuspectID": suspect_id,
+            "RiskScore": score,
+            "CalculationDate": now.strftime("%Y-%m-%d"),
+            "SeverityComponent": scored.at[suspect_id, "SeverityComponent"],
+            "RecencyComponent": scored.at[suspect_id, "RecencyComponent"],
+            "CrimeCount": len(crimes),
+            "ViolentCrimeCount": scored.at[suspect_id, "ViolentCrimeCount"],
+            "GangAffiliated": suspect["GangAffiliation"] is not None,
+            "CommunityInfluence": suspect["CommunityInfluenceLevel"]
+        })
     
-    # Generate crime description
-    crime_desc = random.choice(CRIME_TYPES[crime_type]["desc"])
-    crime_desc = f"{crime_desc} in {location['Area']}, {location['City']}"
+        # Update suspect data
+        df_suspects.at[idx, "RiskScore"] = score
+        df_suspects.at[idx, "CriminalHistory"] = ", ".join(
+            f"{c['type']} ({CRIME_TYPES[c['type']]['severity']}S, {(now - c['date']).days}d ago)"
+            for c in crimes
+        )
+        df_suspects.at[idx, "TotalCrimes"] = len(crimes)
+
+    # Generate all DataFrames
+    df_risk_scores = pd.DataFrame(risk_scores)
+    df_crime_records = pd.DataFrame(crime_records)
+    df_mo_details = pd.DataFrame(mo_details)
+    df_victims = pd.DataFrame(victims)
+    df_evidence = pd.DataFrame(evidence)
+    df_crime_patterns = pd.DataFrame(crime_patterns)
+
+    # Crime Frequency with severity scores
+    df_crime_freq = pd.DataFrame([
+        {"SuspectID": sid, "CrimeType": ct, "CrimeCount": cc, 
+         "SeverityScore": CRIME_TYPES[ct]["severity"], "RecencyWeight": CRIME_TYPES[ct]["recency"]}
+        for sid, crimes in crime_frequencies.items()
+        for ct, cc in crimes.items()
+    ])
+
+    # Risk Factors
+    df_risk_factors = pd.DataFrame([
+        {
+            "FactorID": f"F{i:04d}",
+            "CrimeType": crime_type,
+            "SeverityWeight": factors["severity"],
+            "RecencyWeight": factors["recency"],
+            "Description": random.choice(factors["desc"]),
+            "CommonWeapons": ", ".join(WEAPONS.get(crime_type, ["Unknown"])[:50]),  # Truncate if long
+            "CommonLocations": random.choice(list(CITIES.keys()))  # Example common location
+        }
+        for i, (crime_type, factors) in enumerate(CRIME_TYPES.items(), 1)
+    ])
+
+    # Save all files to specified backend/data path
+    df_locations.to_csv(f"{dataset_path}locations.csv", index=False)
+    df_suspects.to_csv(f"{dataset_path}suspects.csv", index=False)
+    df_crime_records.to_csv(f"{dataset_path}crime_records.csv", index=False)
+    df_mo_details.to_csv(f"{dataset_path}mo_details.csv", index=False)
+    df_victims.to_csv(f"{dataset_path}victims.csv", index=False)
+    df_evidence.to_csv(f"{dataset_path}evidence.csv", index=False)
+    df_crime_patterns.to_csv(f"{dataset_path}crime_pattern_history.csv", index=False)
+    df_crime_freq.to_csv(f"{dataset_path}crime_frequency.csv", index=False)
+    df_risk_scores.to_csv(f"{dataset_path}risk_scores.csv", index=False)
+    engine.save(f"{dataset_path}{RISK_STATE_NAME}")
+    df_risk_factors.to_csv(f"{dataset_path}risk_factors.csv", index=False)
+    save_columnar(dataset_path)
+
+    print(f"✅ All data files generated successfully in {dataset_path} with enhanced Tamil Nadu crime dataset!")
+
+
+# === Scale mode: vectorized, chunked and parallel ===
+SCALE_CHUNK_SIZE = 100000  # rows per chunk; the dataset depends on it, not on the worker count
+SCALE_SEED = 42
+SCALE_TABLES = ["locations", "suspects", "crimes", "risk_factors"]
+
+CRIME_TYPE_NAMES = np.array(list(CRIME_TYPES), dtype=object)
+CRIME_SEVERITY = np.array([c["severity"] for c in CRIME_TYPES.values()])
+CRIME_RECENCY = np.array([c["recency"] for c in CRIME_TYPES.values()])
+CRIME_TYPE_CUM_WEIGHTS = np.cumsum(CRIME_TYPE_WEIGHTS)
+# "Murder (3.0S, " -- prefix of one CriminalHistory entry
+HISTORY_PREFIX = np.array([f"{t} ({c['severity']}S, " for t, c in CRIME_TYPES.items()], dtype=object)
+
+CITY_NAMES = np.array(list(CITIES), dtype=object)
+CITY_LAT = np.array([CITIES[c]["lat_range"] for c in CITIES])
+CITY_LON = np.array([CITIES[c]["lon_range"] for c in CITIES])
+AREA_NAMES = np.array([a for c in CITIES for a in CITIES[c]["areas"]], dtype=object)
+AREA_CITY = np.array([i for i, c in enumerate(CITIES) for _ in CITIES[c]["areas"]])
+AREA_HOTSPOT = np.array([a in CITIES[c].get("crime_hotspots", []) for c in CITIES for a in CITIES[c]["areas"]])
+AREA_COUNTS = np.array([len(CITIES[c]["areas"]) for c in CITIES])
+AREA_OFFSETS = np.concatenate([[0], np.cumsum(AREA_COUNTS)[:-1]])
+
+AGE_CHOICES = np.array([18, 25, 35, 45, 55, 65])
+AGE_CUM_WEIGHTS = np.cumsum([0.1, 0.2, 0.3, 0.2, 0.15, 0.05])
+CASTE_NAMES = np.array(indian_castes, dtype=object)
+MALE_FIRST_NAMES = np.array(list(PersonProvider.first_names_male), dtype=object)
+FEMALE_FIRST_NAMES = np.array(list(PersonProvider.first_names_female), dtype=object)
+FIRST_NAMES = np.concatenate([MALE_FIRST_NAMES, FEMALE_FIRST_NAMES])
+LAST_NAMES = np.array(list(PersonProvider.last_names), dtype=object)
+INFLUENCE_LEVELS = np.array(["Low", "Medium", "High"], dtype=object)
+GENDERS = np.array(["Male", "Female"], dtype=object)
+INJURY_SEVERITIES = np.array(["Fatal", "Major", "Minor", "No Injury"], dtype=object)
+EVIDENCE_KINDS = np.array(["Physical", "Digital", "Biological", "Documentary"], dtype=object)
+FORENSIC_VALUES = np.array(["High", "Medium", "Low"], dtype=object)
+FORENSIC_CUM_WEIGHTS = np.cumsum([0.3, 0.5, 0.2])
+CRIME_DATE_START = np.datetime64("2020-01-01")
+CRIME_DATE_SPAN = int((np.datetime64("2023-12-31") - CRIME_DATE_START).astype(int))
+
+# Output files of scale mode and their columns, in the order the record-by-record generator writes them
+SCALE_OUTPUTS = {
+    "locations": ["LocationID", "City", "Area", "Latitude", "Longitude", "IsHotspot"],
+    "suspects": ["SuspectID", "Name", "Age", "DOB", "Gender", "RiskScore", "OffenseType", "Caste",
+                 "CommunityInfluenceLevel", "GangAffiliation", "CriminalHistory", "TotalCrimes"],
+    "crime_records": ["CrimeID", "CrimeType", "CrimeDate", "CrimeDescription", "SuspectID", "LocationID",
+                      "MODescription", "WeaponUsed", "SeverityScore", "RecencyWeight", "IsHotspot"],
+    "mo_details": ["MOID", "CrimeID", "MODescription", "MOCategory", "WeaponUsed", "SeverityImpact", "IsGangRelated"],
+    "victims": ["VictimID", "CrimeID", "Name", "Age", "Gender", "InjurySeverity", "CrimeSeverity", "IsForeigner"],
+    "evidence": ["EvidenceID", "CrimeID", "Type", "Description", "CrimeSeverity", "ForensicValue"],
+    "crime_pattern_history": ["PatternID", "SuspectID", "CrimeID", "PatternDate", "CrimeType", "SeverityScore",
+                              "RecencyImpact", "LocationPattern", "WeaponPattern", "CityPattern", "IsHotspot"],
+    "crime_frequency": ["SuspectID", "CrimeType", "CrimeCount", "SeverityScore", "RecencyWeight"],
+    "risk_scores": ["SuspectID", "RiskScore", "CalculationDate", "SeverityComponent", "RecencyComponent",
+                    "CrimeCount", "ViolentCrimeCount", "GangAffiliated", "CommunityInfluence"],
+}
 
-    # Generate MO Description
-    mo_desc = mo_manager.get_pattern(crime_type)
 
-    # Generate weapon used
-    weapon = random.choice(WEAPONS[crime_type])
+def _choice_pool(lists):
+    """Flatten a list of choice lists into (values, offsets, counts) for vectorized picks."""
+    values = np.array([v for choices in lists for v in choices], dtype=object)
+    counts = np.array([len(choices) for choices in lists])
+    return values, np.concatenate([[0], np.cumsum(counts)[:-1]]), counts
 
-    # Create crime record
-    crime_id = crime_id_gen.generate_id()
-    crime_records.append({
-        "CrimeID": crime_id,
-        "CrimeType": crime_type,
-        "CrimeDate": crime_date.strftime("%Y-%m-%d"),
-        "CrimeDescription": crime_desc,
-        "SuspectID": suspect_id,
-        "LocationID": location_id,
-        "MODescription": mo_desc,
-        "WeaponUsed": weapon,
-        "SeverityScore": CRIME_TYPES[crime_type]["severity"],
-        "RecencyWeight": CRIME_TYPES[crime_type]["recency"],
-        "IsHotspot": location["IsHotspot"]
-    })
+# Choices per crime type code (and gangs per city code)
+CRIME_DESC_POOL = _choice_pool([c["desc"] for c in CRIME_TYPES.values()])
+WEAPON_POOL = _choice_pool([WEAPONS.get(t, ["Unknown"]) for t in CRIME_TYPES])
+MO_POOL = _choice_pool([MOPatternManager().patterns.get(t, ["Standard operation"]) for t in CRIME_TYPES])
+EVIDENCE_POOL = _choice_pool([EVIDENCE_TYPES.get(t, ["General evidence"]) for t in CRIME_TYPES])
+GANG_POOL = _choice_pool(list(GANGS.values()))
 
-    # Track crimes for risk calculation
-    suspect_crimes[suspect_id].append({
-        "type": crime_type,
-        "date": crime_date
-    })
 
-    # MO Details
-    mo_id = mo_id_gen.generate_id()
-    mo_details.append({
-        "MOID": mo_id,
-        "CrimeID": crime_id,
-        "MODescription": mo_desc,
-        "MOCategory": crime_type,
-        "WeaponUsed": weapon,
-        "SeverityImpact": CRIME_TYPES[crime_type]["severity"],
-        "IsGangRelated": suspect["GangAffiliation"] is not None
-    })
+def _pick(rng, pool, groups):
+    """One uniform pick per row from the pool list of that row's group."""
+    values, offsets, counts = pool
+    return values[offsets[groups] + (rng.random(len(groups)) * counts[groups]).astype(np.int64)]
 
-    # Crime Frequency
-    crime_frequencies[suspect_id][crime_type] += 1
 
-    # Generate Victim
-    victims.append({
-        "VictimID": f"V{i:04d}",
-        "CrimeID": crime_id,
-        "Name": fake.name(),
-        "Age": random.randint(18, 70),
-        "Gender": random.choice(["Male", "Female"]),
-        "InjurySeverity": random.choices(
-            ["Fatal", "Major", "Minor", "No Injury"],
-            weights=[0.1 if crime_type == "Murder" else 0.05, 0.3, 0.4, 0.25]
-        )[0],
-        "CrimeSeverity": CRIME_TYPES[crime_type]["severity"],
-        "IsForeigner": random.random() < 0.1  # 10% chance victim is foreigner
-    })
+def _weighted(rng, cum_weights, n):
+    return np.searchsorted(cum_weights, rng.random(n) * cum_weights[-1], side="right")
 
-    # Generate Evidence
-    evidence_types = {
-        "Murder": ["Blood-stained clothes", "Murder weapon", "Fingerprints", "DNA samples", "CCTV footage"],
-        "Robbery": ["CCTV footage", "Stolen items", "Vehicle used", "Gloves left behind"],
-        # ... [other crime types with their evidence]
-    }
-    evidence_id = evidence_id_gen.generate_id()
-    evidence.append({
-        "EvidenceID": evidence_id,
-        "CrimeID": crime_id,
-        "Type": random.choice(["Physical", "Digital", "Biological", "Documentary"]),
-        "Description": random.choice(evidence_types.get(crime_type, ["General evidence"])),
-        "CrimeSeverity": CRIME_TYPES[crime_type]["severity"],
-        "ForensicValue": random.choices(["High", "Medium", "Low"], weights=[0.3, 0.5, 0.2])[0]
+
+def _index_ids(prefix, index):
+    """IDs of 0-based row indexes as IDGenerator numbers them: prefix + 1-based, zero-padded to 4 digits."""
+    return pd.Series(index + 1, dtype=np.int64).astype(str).str.zfill(4).radd(prefix).to_numpy()
+
+
+def _ids(prefix, start, count):
+    return _index_ids(prefix, np.arange(start, start + count))
+
+
+def _dates(days):
+    return np.datetime_as_string(days, unit="D").astype(object)
+
+
+def _chunk_rng(seed, table, chunk):
+    """Random generator of one chunk of one table; depends only on the seed, never on the worker."""
+    return np.random.default_rng([seed, SCALE_TABLES.index(table), chunk])
+
+
+def _chunks(total, chunk_size):
+    return [(i, start, min(chunk_size, total - start)) for i, start in enumerate(range(0, total, chunk_size))]
+
+
+def _write_part(parts_dir, name, chunk, df):
+    df[SCALE_OUTPUTS[name]].to_csv(os.path.join(parts_dir, f"{name}.{chunk:06d}.csv"), index=False, header=False)
+
+
+def _location_chunk(task):
+    """Write one chunk of locations; returns their area codes for the crime chunks."""
+    seed, chunk, start, count, parts_dir = task
+    rng = _chunk_rng(seed, "locations", chunk)
+    city = rng.integers(0, len(CITY_NAMES), count)
+    area = AREA_OFFSETS[city] + (rng.random(count) * AREA_COUNTS[city]).astype(np.int64)
+    lat = CITY_LAT[city, 0] + rng.random(count) * (CITY_LAT[city, 1] - CITY_LAT[city, 0])
+    lon = CITY_LON[city, 0] + rng.random(count) * (CITY_LON[city, 1] - CITY_LON[city, 0])
+    _write_part(parts_dir, "locations", chunk, pd.DataFrame({
+        "LocationID": _ids("L", start, count),
+        "City": CITY_NAMES[city],
+        "Area": AREA_NAMES[area],
+        "Latitude": np.round(lat, 6),
+        "Longitude": np.round(lon, 6),
+        "IsHotspot": AREA_HOTSPOT[area],
+    }))
+    return area.astype(np.int16)
+
+
+def _suspect_chunk(seed, chunk, start, count, today):
+    """Suspect rows of one chunk (risk columns unset); regenerated identically from the seed."""
+    rng = _chunk_rng(seed, "suspects", chunk)
+    male = rng.random(count) < 0.5
+    first = np.where(male, MALE_FIRST_NAMES[rng.integers(0, len(MALE_FIRST_NAMES), count)],
+                     FEMALE_FIRST_NAMES[rng.integers(0, len(FEMALE_FIRST_NAMES), count)])
+    caste = CASTE_NAMES[rng.integers(0, len(CASTE_NAMES), count)]
+    age = AGE_CHOICES[_weighted(rng, AGE_CUM_WEIGHTS, count)]
+    birth_year = today.astype("datetime64[Y]").astype(int) + 1970 - age
+    dob = ((birth_year - 1970).astype("datetime64[Y]") + rng.integers(0, 12, count).astype("timedelta64[M]")
+           ).astype("datetime64[D]") + rng.integers(0, 28, count)
+    one_time = rng.random(count) < 0.3
+    in_gang = rng.random(count) < 0.2
+    gang = _pick(rng, GANG_POOL, rng.integers(0, len(GANGS), count))
+    return pd.DataFrame({
+        "SuspectID": _ids("S", start, count),
+        "Name": first + " " + caste,
+        "Age": age,
+        "DOB": _dates(dob),
+        "Gender": np.where(male, "Male", "Female"),
+        "RiskScore": 0.0,
+        "OffenseType": np.where(one_time, "One-time", "Recurring"),
+        "Caste": caste,
+        "CommunityInfluenceLevel": INFLUENCE_LEVELS[rng.integers(0, 3, count)],
+        "GangAffiliation": np.where(in_gang, gang, None),
+        "CriminalHistory": None,
+        "TotalCrimes": np.nan,
     })
 
-    # Crime Pattern
-    crime_patterns.append({
-        "PatternID": f"P{i:04d}",
+
+def _suspect_gangs(task):
+    seed, chunk, start, count, today = task
+    return _suspect_chunk(seed, chunk, start, count, today)["GangAffiliation"].notna().to_numpy()
+
+
+_crime_lookups = {}
+
+def _init_crime_worker(location_area, suspect_in_gang):
+    _crime_lookups["location_area"] = location_area
+    _crime_lookups["suspect_in_gang"] = suspect_in_gang
+
+
+def _crime_chunk(task):
+    """Write one chunk of crimes with their MO, victim, evidence and pattern rows.
+
+    Returns (suspect index, crime type code, crime date) of every crime for the risk pass.
+    """
+    seed, chunk, start, count, parts_dir = task
+    rng = _chunk_rng(seed, "crimes", chunk)
+    location_area = _crime_lookups["location_area"]
+    suspect_in_gang = _crime_lookups["suspect_in_gang"]
+
+    ctype = _weighted(rng, CRIME_TYPE_CUM_WEIGHTS, count)
+    suspect = rng.integers(0, len(suspect_in_gang), count)
+    location = rng.integers(0, len(location_area), count)
+    days = CRIME_DATE_START + rng.integers(0, CRIME_DATE_SPAN + 1, count)
+    area = location_area[location]
+    city = CITY_NAMES[AREA_CITY[area]]
+    hotspot = AREA_HOTSPOT[area]
+    type_name = CRIME_TYPE_NAMES[ctype]
+    severity = CRIME_SEVERITY[ctype]
+    recency = CRIME_RECENCY[ctype]
+    crime_date = _dates(days)
+    mo = _pick(rng, MO_POOL, ctype)
+    weapon = _pick(rng, WEAPON_POOL, ctype)
+    crime_id = _ids("C", start, count)
+    suspect_id = _index_ids("S", suspect)
+
+    _write_part(parts_dir, "crime_records", chunk, pd.DataFrame({
+        "CrimeID": crime_id,
+        "CrimeType": type_name,
+        "CrimeDate": crime_date,
+        "CrimeDescription": _pick(rng, CRIME_DESC_POOL, ctype) + " in " + AREA_NAMES[area] + ", " + city,
         "SuspectID": suspect_id,
+        "LocationID": _index_ids("L", location),
+        "MODescription": mo,
+        "WeaponUsed": weapon,
+        "SeverityScore": severity,
+        "RecencyWeight": recency,
+        "IsHotspot": hotspot,
+    }))
+    _write_part(parts_dir, "mo_details", chunk, pd.DataFrame({
+        "MOID": _ids("MO", start, count),
         "CrimeID": crime_id,
-        "PatternDate": crime_date.strftime("%Y-%m-%d"),
-        "CrimeType": crime_type,
-        "SeverityScore": CRIME_TYPES[crime_type]["severity"],
-        "RecencyImpact": CRIME_TYPES[crime_type]["recency"],
-        "LocationPattern": location["Area"],
-        "WeaponPattern": weapon,
-        "CityPattern": location["City"],
-        "IsHotspot": location["IsHotspot"]
-    })
-
-# Calculate Risk Scores with new formula
-risk_scores = []
-for suspect_id, crimes in suspect_crimes.items():
-    suspect = df_suspects[df_suspects["SuspectID"] == suspect_id].iloc[0]
-    age = suspect["Age"]
-    is_one_time = suspect["OffenseType"] == "One-time"
-    score = calculate_risk_score(crimes, age, is_one_time)
-    
-    risk_scores.append({
+        "MODescription": mo,
+        "MOCategory": type_name,
+        "WeaponUsed": weapon,
+        "SeverityImpact": severity,
+        "IsGangRelated": suspect_in_gang[suspect],
+    }))
+
+    # Same weights as random.choices in the record-by-record generator, fatal injuries likelier for murder
+    fatal = np.where(type_name == "Murder", 0.1, 0.05)
+    u = rng.random(count) * (fatal + 0.95)
+    injury = (u >= fatal).astype(np.int64) + (u >= fatal + 0.3) + (u >= fatal + 0.7)
+    _write_part(parts_dir, "victims", chunk, pd.DataFrame({
+        "VictimID": _ids("V", start, count),
+        "CrimeID": crime_id,
+        "Name": FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), count)] + " "
+                + LAST_NAMES[rng.integers(0, len(LAST_NAMES), count)],
+        "Age": rng.integers(18, 71, count),
+        "Gender": GENDERS[rng.integers(0, 2, count)],
+        "InjurySeverity": INJURY_SEVERITIES[injury],
+        "CrimeSeverity": severity,
+        "IsForeigner": rng.random(count) < 0.1,
+    }))
+    _write_part(parts_dir, "evidence", chunk, pd.DataFrame({
+        "EvidenceID": _ids("E", start, count),
+        "CrimeID": crime_id,
+        "Type": EVIDENCE_KINDS[rng.integers(0, len(EVIDENCE_KINDS), count)],
+        "Description": _pick(rng, EVIDENCE_POOL, ctype),
+        "CrimeSeverity": severity,
+        "ForensicValue": FORENSIC_VALUES[_weighted(rng, FORENSIC_CUM_WEIGHTS, count)],
+    }))
+    _write_part(parts_dir, "crime_pattern_history", chunk, pd.DataFrame({
+        "PatternID": _ids("P", start, count),
         "SuspectID": suspect_id,
-        "RiskScore": score,
-        "CalculationDate": datetime.now().strftime("%Y-%m-%d"),
-        "SeverityComponent": round(sum(CRIME_TYPES[c["type"]]["severity"] for c in crimes), 1),
-        "RecencyComponent": round(sum(math.exp(-(datetime.now() - c["date"]).days / 365) for c in crimes), 1),
-        "CrimeCount": len(crimes),
-        "ViolentCrimeCount": sum(1 for c in crimes if c["type"] in ["Murder", "Robbery", "Assault"]),
-        "GangAffiliated": suspect["GangAffiliation"] is not None,
-        "CommunityInfluence": suspect["CommunityInfluenceLevel"]
-    })
-    
-    # Update suspect data
-    idx = df_suspects[df_suspects["SuspectID"] == suspect_id].index[0]
-    df_suspects.at[idx, "RiskScore"] = score
-    df_suspects.at[idx, "CriminalHistory"] = ", ".join(
-        f"{c['type']} ({CRIME_TYPES[c['type']]['severity']}S, {(datetime.now() - c['date']).days}d ago)"
-        for c in crimes
-    )
-    df_suspects.at[idx, "TotalCrimes"] = len(crimes)
-
-# Generate all DataFrames
-df_risk_scores = pd.DataFrame(risk_scores)
-df_crime_records = pd.DataFrame(crime_records)
-df_mo_details = pd.DataFrame(mo_details)
-df_victims = pd.DataFrame(victims)
-df_evidence = pd.DataFrame(evidence)
-df_crime_patterns = pd.DataFrame(crime_patterns)
-
-# Crime Frequency with severity scores
-df_crime_freq = pd.DataFrame([
-    {"SuspectID": sid, "CrimeType": ct, "CrimeCount": cc, 
-     "SeverityScore": CRIME_TYPES[ct]["severity"], "RecencyWeight": CRIME_TYPES[ct]["recency"]}
-    for sid, crimes in crime_frequencies.items()
-    for ct, cc in crimes.items()
-])
-
-# Risk Factors
-df_risk_factors = pd.DataFrame([
-    {
-        "FactorID": f"F{i:04d}",
-        "CrimeType": crime_type,
-        "SeverityWeight": factors["severity"],
-        "RecencyWeight": factors["recency"],
-        "Description": random.choice(factors["desc"]),
-        "CommonWeapons": ", ".join(WEAPONS.get(crime_type, ["Unknown"])[:50]),  # Truncate if long
-        "CommonLocations": random.choice(list(CITIES.keys()))  # Example common location
-    }
-    for i, (crime_type, factors) in enumerate(CRIME_TYPES.items(), 1)
-])
-
-# Save all files to specified backend/data path
-df_locations.to_csv(f"{DATASET_PATH}locations.csv", index=False)
-df_suspects.to_csv(f"{DATASET_PATH}suspects.csv", index=False)
-df_crime_records.to_csv(f"{DATASET_PATH}crime_records.csv", index=False)
-df_mo_details.to_csv(f"{DATASET_PATH}mo_details.csv", index=False)
-df_victims.to_csv(f"{DATASET_PATH}victims.csv", index=False)
-df_evidence.to_csv(f"{DATASET_PATH}evidence.csv", index=False)
-df_crime_patterns.to_csv(f"{DATASET_PATH}crime_pattern_history.csv", index=False)
-df_crime_freq.to_csv(f"{DATASET_PATH}crime_frequency.csv", index=False)
-df_risk_scores.to_csv(f"{DATASET_PATH}risk_scores.csv", index=False)
-df_risk_factors.to_csv(f"{DATASET_PATH}risk_factors.csv", index=False)
-
-print(f"✅ All data files generated successfully in {DATASET_PATH} with enhanced Tamil Nadu crime dataset!")
\ No newline at end of file
+        "CrimeID": crime_id,
+        "PatternDate": crime_date,
+        "CrimeType": type_name,
+        "SeverityScore": severity,
+        "RecencyImpact": recency,
+        "LocationPattern": AREA_NAMES[area],
+        "WeaponPattern": weapon,
+        "CityPattern": city,
+        "IsHotspot": hotspot,
+    }))
+    return suspect, ctype.astype(np.int8), days
+
+
+def _risk_chunk(task):
+    """Write one chunk of suspects with their risk scores, criminal history and crime frequencies.
+
+    Gets the crimes of its suspects sorted by suspect (in generation order within a
+    suspect) and scores them all at once with RiskEngine.
+    """
+    seed, chunk, start, count, parts_dir, now, suspect, ctype, dates = task
+    df = _suspect_chunk(seed, chunk, start, count, np.datetime64(now.date(), "D"))
+    engine = RiskEngine({t: c["severity"] for t, c in CRIME_TYPES.items()}, reference_time=now)
+    engine.add_suspects(df["SuspectID"], df["Age"], df["OffenseType"] == "One-time")
+    if len(suspect):
+        engine.add_crimes(df["SuspectID"].to_numpy()[suspect - start], CRIME_TYPE_NAMES[ctype], dates)
+
+    scored = engine.scores()
+    has_crimes = scored["CrimeCount"].to_numpy() > 0
+    if has_crimes.any():
+        totals = scored["CrimeCount"].to_numpy()[has_crimes]
+        ends = np.cumsum(totals)
+        entries = (HISTORY_PREFIX[ctype] + engine.days_ago(dates).astype(str).astype(object) + "d ago)").tolist()
+        df.loc[has_crimes, "RiskScore"] = scored["RiskScore"][has_crimes].to_numpy()
+        df.loc[has_crimes, "CriminalHistory"] = [", ".join(entries[b - n:b]) for b, n in zip(ends.tolist(), totals.tolist())]
+        df.loc[has_crimes, "TotalCrimes"] = totals
+
+        suspects = df[has_crimes]
+        risk = scored[has_crimes].reset_index(drop=True)
+        risk["CalculationDate"] = now.strftime("%Y-%m-%d")
+        risk["GangAffiliated"] = suspects["GangAffiliation"].notna().to_numpy()
+        risk["CommunityInfluence"] = suspects["CommunityInfluenceLevel"].to_numpy()
+        _write_part(parts_dir, "risk_scores", chunk, risk)
+
+        pairs, counts = np.unique((suspect - start) * len(CRIME_TYPES) + ctype, return_counts=True)
+        pair_type = pairs % len(CRIME_TYPES)
+        _write_part(parts_dir, "crime_frequency", chunk, pd.DataFrame({
+            "SuspectID": df["SuspectID"].to_numpy()[pairs // len(CRIME_TYPES)],
+            "CrimeType": CRIME_TYPE_NAMES[pair_type],
+            "CrimeCount": counts,
+            "SeverityScore": CRIME_SEVERITY[pair_type],
+            "RecencyWeight": CRIME_RECENCY[pair_type],
+        }))
+    _write_part(parts_dir, "suspects", chunk, df)
+    engine.save(os.path.join(parts_dir, f"risk_engine.{chunk:06d}.npz"))
+
+
+def _run_chunks(fn, tasks, workers, initializer=None, initargs=()):
+    """fn over tasks, in task order, in a process pool when workers > 1."""
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return [fn(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        return list(pool.map(fn, tasks))
+
+
+def _merge_parts(parts_dir, dataset_path, name, n_chunks):
+    """Concatenate the chunk files of one output, in chunk order, under a single header."""
+    with open(f"{dataset_path}{name}.csv", "w", newline="") as out:
+        out.write(",".join(SCALE_OUTPUTS[name]) + "\n")
+        for chunk in range(n_chunks):
+            part = os.path.join(parts_dir, f"{name}.{chunk:06d}.csv")
+            if os.path.exists(part):
+                with open(part, newline="") as f:
+                    shutil.copyfileobj(f, out)
+                os.remove(part)
+
+
+def generate_scaled_dataset(num_records, dataset_path=DATASET_PATH, workers=1, chunk_size=SCALE_CHUNK_SIZE, seed=SCALE_SEED):
+    """Generate a dataset of num_records crimes with vectorized NumPy sampling.
+
+    Every table is produced in chunks of chunk_size rows, each from its own generator
+    seeded by (seed, table, chunk), so the same seed and chunk size give the same files
+    whatever the number of worker processes.
+    """
+    now = datetime.now()
+    today = np.datetime64(now.date(), "D")
+    n_entities = max(1, num_records // 2)
+    parts_dir = os.path.join(dataset_path, ".parts")
+    os.makedirs(parts_dir, exist_ok=True)
+    entity_chunks = _chunks(n_entities, chunk_size)
+    crime_chunks = _chunks(num_records, chunk_size)
+
+    print(f"📍 Generating {n_entities} locations and suspects...")
+    location_area = np.concatenate(_run_chunks(
+        _location_chunk, [(seed, i, start, count, parts_dir) for i, start, count in entity_chunks], workers))
+    suspect_in_gang = np.concatenate(_run_chunks(
+        _suspect_gangs, [(seed, i, start, count, today) for i, start, count in entity_chunks], workers))
+
+    print(f"🔪 Generating {num_records} crimes...")
+    results = _run_chunks(_crime_chunk, [(seed, i, start, count, parts_dir) for i, start, count in crime_chunks],
+                          workers, initializer=_init_crime_worker, initargs=(location_area, suspect_in_gang))
+    suspect = np.concatenate([r[0] for r in results]) if results else np.zeros(0, dtype=np.int64)
+    ctype = np.concatenate([r[1] for r in results]) if results else np.zeros(0, dtype=np.int8)
+    dates = np.concatenate([r[2] for r in results]) if results else np.zeros(0, dtype="datetime64[D]")
+    del results
+
+    print("📊 Scoring suspects...")
+    order = np.argsort(suspect, kind="stable")
+    suspect, ctype, dates = suspect[order], ctype[order], dates[order]
+    bounds = np.searchsorted(suspect, [start for _, start, _ in entity_chunks] + [n_entities])
+    _run_chunks(_risk_chunk, [
+        (seed, i, start, count, parts_dir, now,
+         suspect[bounds[i]:bounds[i + 1]], ctype[bounds[i]:bounds[i + 1]], dates[bounds[i]:bounds[i + 1]])
+        for i, start, count in entity_chunks], workers)
+
+    for name in SCALE_OUTPUTS:
+        _merge_parts(parts_dir, dataset_path, name, max(len(entity_chunks), len(crime_chunks)))
+    RiskEngine.concat([RiskEngine.load(os.path.join(parts_dir, f"risk_engine.{i:06d}.npz"))
+                       for i, _, _ in entity_chunks]).save(f"{dataset_path}{RISK_STATE_NAME}")
+    shutil.rmtree(parts_dir, ignore_errors=True)
+
+    rng = _chunk_rng(seed, "risk_factors", 0)
+    pd.DataFrame([
+        {
+            "FactorID": f"F{i:04d}",
+            "CrimeType": crime_type,
+            "SeverityWeight": factors["severity"],
+            "RecencyWeight": factors["recency"],
+            "Description": factors["desc"][rng.integers(len(factors["desc"]))],
+            "CommonWeapons": ", ".join(WEAPONS.get(crime_type, ["Unknown"])[:50]),
+            "CommonLocations": CITY_NAMES[rng.integers(len(CITY_NAMES))],
+        }
+        for i, (crime_type, factors) in enumerate(CRIME_TYPES.items(), 1)
+    ]).to_csv(f"{dataset_path}risk_factors.csv", index=False)
+    save_columnar(dataset_path)
+
+    print(f"✅ Generated {num_records} crime records in {dataset_path} (seed {seed}, chunk size {chunk_size})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the synthetic Tamil Nadu crime dataset")
+    parser.add_argument("--records", type=int, default=NUM_RECORDS, help="number of crime records")
+    parser.add_argument("--out", default=DATASET_PATH, help="output directory (with trailing slash)")
+    parser.add_argument("--scale", action="store_true",
+                        help="vectorized, chunked generator for large datasets")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes used by --scale")
+    parser.add_argument("--chunk-size", type=int, default=SCALE_CHUNK_SIZE, help="rows per chunk for --scale")
+    parser.add_argument("--seed", type=int, default=SCALE_SEED, help="seed for --scale")
+    parser.add_argument("--check-risk", action="store_true",
+                        help="check RiskEngine against calculate_risk_score on random suspects, then exit")
+    args = parser.parse_args()
+
+    if args.check_risk:
+        if check_risk_engine():
+            raise SystemExit("❌ RiskEngine disagrees with calculate_risk_score")
+        print("✅ RiskEngine matches calculate_risk_score.")
+    elif args.scale:
+        generate_scaled_dataset(args.records, args.out, args.workers, args.chunk_size, args.seed)
+    else:
+        generate_dataset(args.records, args.out)
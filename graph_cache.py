@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+# === Ingest generation counter ===
+def read_generation(path):
+    """Current graph generation; 0 if no ingest has recorded one yet."""
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def bump_generation(path):
+    """Advance the graph generation so every cache keyed on it goes stale."""
+    generation = read_generation(path) + 1
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(generation))
+    os.replace(tmp_path, path)
+    return generation
+
+
+# === Serialized payload cache ===
+class GraphCache:
+    """TTL cache for a serialized graph payload, invalidated by the ingest generation.
+
+    Entries live in process memory and, when db_path is given, in a SQLite file shared by
+    every worker on the host. Concurrent misses in one process coalesce onto a single
+    call to loader instead of each hitting Neo4j.
+    """
+
+    def __init__(self, loader, generation_path, ttl=300, db_path=None):
+        self.loader = loader
+        self.generation_path = generation_path
+        self.ttl = ttl
+        self.db_path = db_path
+        self._entry = None  # (generation, expires_at, payload)
+        self._lock = threading.Lock()
+        self._inflight = None
+        if db_path:
+            with sqlite3.connect(db_path) as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS graph_cache "
+                    "(key TEXT PRIMARY KEY, generation INTEGER, expires_at REAL, payload TEXT)"
+                )
+
+    def get(self):
+        """Return the cached payload, refreshing it at most once per miss."""
+        generation = read_generation(self.generation_path)
+        entry = self._entry
+        if entry and entry[0] == generation and entry[1] > time.time():
+            return entry[2]
+
+        with self._lock:
+            entry = self._entry
+            if entry and entry[0] == generation and entry[1] > time.time():
+                return entry[2]
+            flight = self._inflight
+            leader = flight is None
+            if leader:
+                flight = self._inflight = {"done": threading.Event(), "payload": None, "error": None}
+
+        if not leader:
+            flight["done"].wait()
+            if flight["error"] is not None:
+                raise flight["error"]
+            return flight["payload"]
+
+        try:
+            shared = self._load_shared(generation)
+            if shared is None:
+                payload = self.loader()
+                self._store_shared(generation, payload)
+                expires_at = time.time() + self.ttl
+            else:
+                # The local copy must not outlive the shared row it came from
+                payload, shared_expires_at = shared
+                expires_at = min(time.time() + self.ttl, shared_expires_at)
+            self._entry = (generation, expires_at, payload)
+            flight["payload"] = payload
+            return payload
+        except Exception as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight = None
+            flight["done"].set()
+
+    def invalidate(self):
+        self._entry = None
+        if self.db_path:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("DELETE FROM graph_cache")
+
+    def _load_shared(self, generation):
+        """(payload, expires_at) of the live shared entry for generation, or None."""
+        if not self.db_path:
+            return None
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT payload, expires_at FROM graph_cache WHERE key = 'graph' AND generation = ? AND expires_at > ?",
+                (generation, time.time()),
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def _store_shared(self, generation, payload):
+        if not self.db_path:
+            return
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO graph_cache (key, generation, expires_at, payload) VALUES ('graph', ?, ?, ?)",
+                (generation, time.time() + self.ttl, payload),
+            )
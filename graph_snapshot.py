@@ -0,0 +1,318 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import numpy as np
+
+try:
+    from .neo4j_ingest import Neo4jGraphManager
+except ImportError:
+    # Run from utils/ (graph_analytics.py, neo4j_ingest.py)
+    from neo4j_ingest import Neo4jGraphManager
+
+# Relationship type -> kind of node it points at (mirrors neo4j_ingest.py)
+RELATION_TARGETS = {
+    "LIKELY_TO_COMMIT": "crime",
+    "LIKELY_TO_USE": "weapon",
+    "MATCHED_WITH_PATTERN": "mo",
+    "ACTIVE_IN": "location",
+}
+NODE_KINDS = ["suspect", "crime", "weapon", "mo", "location", "other"]
+
+# === Binary graph file ===
+# Layout: MAGIC, little-endian uint32 header length, JSON header, then the arrays listed in
+# the header ({"dtype", "offset", "count"}), each starting on an 8-byte boundary. Node
+# and relation names are string tables: offsets into a UTF-8 blob, name i being
+# data[offsets[i]:offsets[i + 1]].
+GRAPH_MAGIC = b"CTXGRAPH"
+GRAPH_FORMAT_VERSION = 1
+GRAPH_BINARY_MIMETYPE = "application/vnd.crimetryx.graph"
+GRAPH_ARRAYS = {
+    "node_kind": "u1",
+    "name_offsets": "<i8",
+    "name_data": "u1",
+    "relation_offsets": "<i8",
+    "relation_data": "u1",
+    "out_offsets": "<i8",
+    "out_targets": "<i4",
+    "out_rel": "u1",
+}
+
+
+def _string_table(strings):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _strings(offsets, data):
+    blob = bytes(data)
+    return [blob[start:end].decode("utf-8") for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def read_graph_arrays(path):
+    """Map a graph file and return (header, {name: array}) without copying or parsing the arrays."""
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(GRAPH_MAGIC)] != GRAPH_MAGIC:
+        raise ValueError(f"{path} is not a graph file")
+    (header_size,) = struct.unpack_from("<I", buffer, len(GRAPH_MAGIC))
+    start = len(GRAPH_MAGIC) + 4
+    header = json.loads(bytes(buffer[start:start + header_size]))
+    if header["version"] != GRAPH_FORMAT_VERSION:
+        raise ValueError(f"Unsupported graph file version {header['version']}")
+    arrays = {name: np.frombuffer(buffer, dtype=spec["dtype"], count=spec["count"], offset=spec["offset"])
+              for name, spec in header["arrays"].items()}
+    return header, arrays
+
+
+class GraphSnapshot:
+    """Immutable in-memory copy of the suspect graph.
+
+    Nodes are integers with a kind code and a display string; edges are stored as CSR
+    adjacency arrays in both directions. It answers the same queries as
+    Neo4jGraphManager (get_graph_data, iter_graph_links, iter_neighbourhood,
+    iter_suspect_links) without a database round-trip.
+    """
+
+    def __init__(self, node_kind, node_name, relations, out_offsets, out_targets, out_rel):
+        self.node_kind = np.asarray(node_kind, dtype=np.uint8)
+        self.node_name = list(node_name)
+        self.relations = list(relations)
+        self.node_ids = {(NODE_KINDS[k], name): i for i, (k, name) in enumerate(zip(self.node_kind.tolist(), self.node_name))}
+        n_nodes = len(self.node_name)
+
+        # Outgoing edges, grouped by source
+        self.out_offsets = np.asarray(out_offsets, dtype=np.int64)
+        self.out_targets = np.asarray(out_targets, dtype=np.int64)
+        self.out_rel = np.asarray(out_rel, dtype=np.int64)
+        # Incoming edges, for undirected neighbourhood expansion
+        sources = np.repeat(np.arange(n_nodes), np.diff(self.out_offsets))
+        order = np.argsort(self.out_targets, kind="stable")
+        self.in_offsets = np.concatenate([[0], np.cumsum(np.bincount(self.out_targets, minlength=n_nodes))])
+        self.in_sources = sources[order]
+
+        # Suspects sorted by id for keyset pagination
+        has_links = np.diff(self.out_offsets) > 0
+        suspects = np.flatnonzero((self.node_kind == NODE_KINDS.index("suspect")) & has_links).tolist()
+        suspects.sort(key=lambda i: self.node_name[i])
+        self.suspect_order = np.array(suspects, dtype=np.int64)
+        self.suspect_names = [self.node_name[i] for i in suspects]
+        self._payload = None
+        self._binary = None
+        self._lock = threading.Lock()
+
+    # === Builders ===
+    @classmethod
+    def from_links(cls, links):
+        """Build from link dicts, e.g. Neo4jGraphManager.iter_graph_links()."""
+        relations = list(RELATION_TARGETS)
+        ids = {}
+        kinds, names, sources, targets, rel_codes = [], [], [], [], []
+
+        def node(kind, name):
+            key = (kind, name)
+            if key not in ids:
+                ids[key] = len(names)
+                kinds.append(NODE_KINDS.index(kind))
+                names.append(name)
+            return ids[key]
+
+        edges = set()
+        for link in links:
+            label = link["label"]
+            if label not in relations:
+                relations.append(label)
+            edge = (node("suspect", link["source"]), node(RELATION_TARGETS.get(label, "other"), link["target"]),
+                    relations.index(label))
+            # Same MERGE semantics as the ingest: one edge per (source, target, type)
+            if edge in edges:
+                continue
+            edges.add(edge)
+            sources.append(edge[0])
+            targets.append(edge[1])
+            rel_codes.append(edge[2])
+
+        # CSR: edges grouped by source, in insertion order within a source
+        sources = np.array(sources, dtype=np.int64)
+        order = np.argsort(sources, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=len(names)))])
+        return cls(kinds, names, relations, offsets,
+                   np.array(targets, dtype=np.int64)[order], np.array(rel_codes, dtype=np.int64)[order])
+
+    @classmethod
+    def from_predictions(cls, df):
+        """Build straight from rule_based_predictions.csv rows, the way neo4j_ingest.py ingests them."""
+        df = df.fillna("Unknown").replace(r'^\s*$', 'Unknown', regex=True)
+        df = df.assign(LocationID=df["SuspectID"].astype(str).str[-2:].radd("L"))
+
+        def links():
+            for row in df[["SuspectID", "PredictedCrimeType", "LikelyWeapon", "MatchedMOExamples", "LocationID"]].itertuples(index=False):
+                sid, ctype, weapon, mo, loc = row
+                yield {"source": sid, "target": ctype, "label": "LIKELY_TO_COMMIT"}
+                yield {"source": sid, "target": weapon, "label": "LIKELY_TO_USE"}
+                yield {"source": sid, "target": mo, "label": "MATCHED_WITH_PATTERN"}
+                yield {"source": sid, "target": loc, "label": "ACTIVE_IN"}
+        return cls.from_links(links())
+
+    @classmethod
+    def load(cls, path):
+        """Load a file written by save()."""
+        header, arrays = read_graph_arrays(path)
+        return cls(
+            arrays["node_kind"],
+            _strings(arrays["name_offsets"], arrays["name_data"]),
+            _strings(arrays["relation_offsets"], arrays["relation_data"]),
+            arrays["out_offsets"], arrays["out_targets"], arrays["out_rel"],
+        )
+
+    # === Binary export ===
+    def to_bytes(self):
+        """The graph in the binary file format (see GRAPH_MAGIC), memoized per snapshot."""
+        with self._lock:
+            if self._binary is None:
+                self._binary = self._encode()
+            return self._binary
+
+    def _encode(self):
+        name_offsets, name_data = _string_table(self.node_name)
+        relation_offsets, relation_data = _string_table(self.relations)
+        arrays = {
+            "node_kind": self.node_kind,
+            "name_offsets": name_offsets,
+            "name_data": name_data,
+            "relation_offsets": relation_offsets,
+            "relation_data": relation_data,
+            "out_offsets": self.out_offsets,
+            "out_targets": self.out_targets,
+            "out_rel": self.out_rel,
+        }
+        arrays = {name: np.ascontiguousarray(arrays[name], dtype=dtype) for name, dtype in GRAPH_ARRAYS.items()}
+
+        def layout(data_start):
+            specs, offset = {}, data_start
+            for name, array in arrays.items():
+                specs[name] = {"dtype": array.dtype.str, "offset": offset, "count": len(array)}
+                offset += -(-array.nbytes // 8) * 8
+            return specs
+
+        header = {"version": GRAPH_FORMAT_VERSION, "kinds": NODE_KINDS,
+                  "nodes": len(self.node_name), "edges": len(self.out_targets), "arrays": layout(0)}
+        # Offsets depend on the header size, which depends on the offsets: settle on one that fits
+        while True:
+            encoded = json.dumps(header).encode("utf-8")
+            data_start = -(-(len(GRAPH_MAGIC) + 4 + len(encoded)) // 8) * 8
+            specs = layout(data_start)
+            if specs == header["arrays"]:
+                break
+            header["arrays"] = specs
+
+        parts = [GRAPH_MAGIC, struct.pack("<I", len(encoded)), encoded]
+        parts.append(b"\0" * (data_start - sum(len(p) for p in parts)))
+        for array in arrays.values():
+            parts.append(array.tobytes())
+            parts.append(b"\0" * (-array.nbytes % 8))
+        return b"".join(parts)
+
+    def save(self, path):
+        """Write the binary form atomically, for read_graph_arrays() / load()."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    # === Queries ===
+    def _links_of(self, node):
+        start, end = self.out_offsets[node], self.out_offsets[node + 1]
+        source = self.node_name[node]
+        for target, rel in zip(self.out_targets[start:end].tolist(), self.out_rel[start:end].tolist()):
+            yield {"source": source, "target": self.node_name[target], "label": self.relations[rel]}
+
+    def iter_graph_links(self):
+        for node in self.suspect_order.tolist():
+            yield from self._links_of(node)
+
+    def get_graph_data(self):
+        links = list(self.iter_graph_links())
+        nodes = {link["source"] for link in links} | {link["target"] for link in links}
+        return {"nodes": [{"id": n} for n in nodes], "links": links}
+
+    def payload(self):
+        """Serialized get_graph_data(), computed once per snapshot."""
+        with self._lock:
+            if self._payload is None:
+                self._payload = json.dumps(self.get_graph_data())
+            return self._payload
+
+    def iter_neighbourhood(self, kind, value, hops=1, limit=None):
+        start = self.node_ids.get((kind, value))
+        if start is None:
+            return
+        hops = max(1, min(int(hops), Neo4jGraphManager.MAX_HOPS))
+        members = np.zeros(len(self.node_name), dtype=bool)
+        members[start] = True
+        frontier = np.array([start], dtype=np.int64)
+        for _ in range(hops):
+            nxt = np.concatenate(
+                [self.out_targets[self.out_offsets[n]:self.out_offsets[n + 1]] for n in frontier] +
+                [self.in_sources[self.in_offsets[n]:self.in_offsets[n + 1]] for n in frontier])
+            nxt = np.unique(nxt[~members[nxt]]) if len(nxt) else nxt
+            if not len(nxt):
+                break
+            members[nxt] = True
+            frontier = nxt
+
+        emitted = 0
+        for node in self.suspect_order.tolist():
+            if not members[node]:
+                continue
+            for link in self._links_of(node):
+                if members[self.node_ids[(RELATION_TARGETS.get(link["label"], "other"), link["target"])]]:
+                    yield link
+                    emitted += 1
+                    if limit and emitted >= limit:
+                        return
+
+    def iter_suspect_links(self, crime=None, suspect_ids=None, after=None, limit=None):
+        first = bisect.bisect_right(self.suspect_names, after) if after is not None else 0
+        wanted = set(suspect_ids) if suspect_ids is not None else None
+        crime_node = self.node_ids.get(("crime", crime)) if crime is not None else None
+        if crime is not None and crime_node is None:
+            return
+        crime_rel = self.relations.index("LIKELY_TO_COMMIT")
+
+        taken = 0
+        for node, name in zip(self.suspect_order[first:].tolist(), self.suspect_names[first:]):
+            if wanted is not None and name not in wanted:
+                continue
+            if crime_node is not None:
+                start, end = self.out_offsets[node], self.out_offsets[node + 1]
+                hits = (self.out_targets[start:end] == crime_node) & (self.out_rel[start:end] == crime_rel)
+                if not hits.any():
+                    continue
+            yield from self._links_of(node)
+            taken += 1
+            if limit and taken >= limit:
+                return
+
+
+class SnapshotReplica:
+    """Holds a GraphSnapshot built by `loader`, rebuilding it whenever `generation()` changes."""
+
+    def __init__(self, loader, generation):
+        self.loader = loader
+        self.generation = generation
+        self._state = (None, None)  # (generation, snapshot)
+        self._lock = threading.Lock()
+
+    def get(self):
+        generation = self.generation()
+        if self._state[0] == generation:
+            return self._state[1]
+        with self._lock:
+            if self._state[0] != generation:
+                self._state = (generation, self.loader())
+            return self._state[1]
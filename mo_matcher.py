@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from difflib import SequenceMatcher
+from concurrent.futures import ProcessPoolExecutor
+
+# === Fuzzy match score (exact scorer) ===
+def fuzzy_match(a, b):
+    return SequenceMatcher(None, a, b).ratio()
+
+
+# === Character index over the distinct MO descriptions ===
+class MOPatternIndex:
+    """Candidate-blocking index for matching suspect MO descriptions against mo_patterns.
+
+    Every distinct MO text is stored once as a character-count vector. The number of
+    characters two strings share bounds how many SequenceMatcher can align, so the
+    index gives an upper bound on fuzzy_match for every pattern in one vectorized
+    pass. Patterns are then scored exactly in best-bound-first order and the scan
+    stops as soon as no remaining bound can beat the current best, which keeps the
+    result identical to scoring every (pattern, description) pair.
+    """
+
+    def __init__(self, mo_patterns):
+        mo_patterns = mo_patterns.reset_index(drop=True)
+        self.texts, text_codes = np.unique(mo_patterns['MODescription_x'].astype(str).to_numpy(), return_inverse=True)
+        self.text_codes = text_codes.ravel()
+        self.text_lengths = np.array([len(t) for t in self.texts])
+
+        alphabet = sorted(set("".join(self.texts)))
+        self.char_pos = {ch: i for i, ch in enumerate(alphabet)}
+        self.char_counts = np.zeros((len(self.texts), len(alphabet)), dtype=np.int32)
+        for row, text in enumerate(self.texts):
+            for ch in text:
+                self.char_counts[row, self.char_pos[ch]] += 1
+
+        # Per-row pattern attributes, kept in the original iteration order
+        self.mo_texts = mo_patterns['MODescription_x'].tolist()
+        self.crime_types = mo_patterns['CrimeType'].tolist()
+        self.weapons = mo_patterns['WeaponUsed_x'].tolist()
+        self.locations = mo_patterns['LocationID']
+        self.severity_factors = np.array([(1 + (severity or 1) / 10) for severity in mo_patterns['SeverityScore']])
+
+    def _char_vector(self, text):
+        vec = np.zeros(self.char_counts.shape[1], dtype=np.int32)
+        for ch in text:
+            pos = self.char_pos.get(ch)
+            if pos is not None:
+                vec[pos] += 1
+        return vec
+
+    def ratio_bounds(self, descriptions):
+        """Upper bound of max fuzzy_match(desc, text) over descriptions, per distinct text."""
+        bounds = np.zeros(len(self.texts))
+        for desc in set(descriptions):
+            shared = np.minimum(self.char_counts, self._char_vector(desc)).sum(axis=1)
+            total = self.text_lengths + len(desc)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                bound = np.where(total > 0, 2.0 * shared / total, 1.0)
+            np.maximum(bounds, bound, out=bounds)
+        return bounds
+
+    def match(self, descriptions, locations, risk):
+        """Return (best_score, mo_text, crime_type, weapon) for one suspect, or None if nothing scores above 0."""
+        if not descriptions or not len(self.mo_texts):
+            return None
+
+        loc_boost = np.where(self.locations.isin(locations).to_numpy(), 0.1, 0.0)
+        risk_factor = (1 + (risk or 1) / 10)
+        upper = (self.ratio_bounds(descriptions)[self.text_codes] + loc_boost) * self.severity_factors * risk_factor
+
+        exact = {}
+        best_score = 0
+        best_row = None
+        for row in np.argsort(-upper, kind='stable'):
+            if upper[row] < best_score:
+                break
+            code = self.text_codes[row]
+            if code not in exact:
+                mo_text = self.mo_texts[row]
+                exact[code] = max(fuzzy_match(desc, mo_text) for desc in descriptions)
+            score = exact[code]
+            # Boost score for same location
+            if loc_boost[row]:
+                score += 0.1
+            # Score weighting by severity
+            score *= self.severity_factors[row]
+            score *= risk_factor
+            if score > best_score or (score == best_score and best_row is not None and row < best_row):
+                best_score = score
+                best_row = row
+
+        if best_row is None:
+            return None
+        return best_score, self.mo_texts[best_row], self.crime_types[best_row], self.weapons[best_row]
+
+
+# === Process pool sharding ===
+_worker_index = None
+
+def _init_worker(index):
+    global _worker_index
+    _worker_index = index
+
+def _match_shard(shard):
+    return [(suspect, _worker_index.match(descriptions, locations, risk))
+            for suspect, descriptions, locations, risk in shard]
+
+def match_suspects(index, suspect_inputs, workers=1, shard_size=500):
+    """Match (suspect, descriptions, locations, risk) tuples; returns [(suspect, match)] in input order."""
+    if workers <= 1:
+        _init_worker(index)
+        return _match_shard(suspect_inputs)
+
+    shards = [suspect_inputs[i:i + shard_size] for i in range(0, len(suspect_inputs), shard_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index,)) as pool:
+        for shard_result in pool.map(_match_shard, shards):
+            results.extend(shard_result)
+    return results
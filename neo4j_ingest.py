@@ -1,5 +1,11 @@
 from neo4j import GraphDatabase
+from neo4j.exceptions import ClientError, TransientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+import os
 import pandas as pd
+import hashlib
+import time
 from tqdm import tqdm
 
 # === Neo4j Credentials ===
@@ -7,8 +13,65 @@ NEO4J_URI = "bolt://localhost:7687"
 NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "neo4j123"
 
+# === Ingest tuning ===
+INGEST_BATCH_SIZE = 1000   # rows per UNWIND transaction
+INGEST_WORKERS = 4         # concurrent sessions writing disjoint suspect chunks
+INGEST_MAX_RETRIES = 5     # extra attempts for a chunk that keeps deadlocking
+
+# Bumped after every ingest so API graph caches are invalidated
+GRAPH_GENERATION_PATH = "../data/graph_generation.txt"
+
+# Copy of the last ingested prediction rows, diffed against by --sync
+PREDICTIONS_PATH = "../data/rule_based_predictions.csv"
+SNAPSHOT_PATH = "../data/rule_based_predictions.ingested.csv"
+INGEST_COLUMNS = ["SuspectID", "PredictedCrimeType", "LikelyWeapon", "MatchedMOExamples", "LocationID"]
+
+# Memory-mappable CSR copy of the graph for analytics jobs and the API (see graph_snapshot.py)
+GRAPH_EXPORT_PATH = "../data/graph.ctxg"
+
+# Centrality/community table computed after each ingest (see graph_analytics.py)
+GRAPH_ANALYTICS_PATH = "../data/graph_analytics.csv"
+
+# === Graph schema: uniqueness constraint per MERGE key ===
+SCHEMA_CONSTRAINTS = {
+    "suspect_id": ("Suspect", "id"),
+    "crime_type_name": ("CrimeType", "name"),
+    "weapon_name": ("Weapon", "name"),
+    "mo_key": ("MO", "key"),
+    "location_id": ("Location", "id"),
+}
+SCHEMA_TIMEOUT_SECONDS = 300
+
+def mo_key(description):
+    """Compact hashed key for an MO description, used instead of the long text for lookups."""
+    return hashlib.sha1(str(description).encode("utf-8")).hexdigest()
+
 # === Class to Manage Neo4j Graph ===
 class Neo4jGraphManager:
+    # Display id of a link target, whatever its label
+    TARGET_EXPR = """
+               CASE 
+                   WHEN exists(n.id) THEN n.id
+                   WHEN exists(n.name) THEN n.name
+                   WHEN exists(n.description) THEN n.description
+                   ELSE "Unknown"
+               END"""
+
+    GRAPH_QUERY = f"""
+        MATCH (s:Suspect)-[r]->(n)
+        RETURN s.id AS source, type(r) AS relation, {TARGET_EXPR} AS target
+        """
+
+    # Start nodes accepted by iter_neighbourhood: kind -> (label, key property)
+    NODE_KINDS = {
+        "suspect": ("Suspect", "id"),
+        "location": ("Location", "id"),
+        "mo": ("MO", "key"),
+        "crime": ("CrimeType", "name"),
+        "weapon": ("Weapon", "name"),
+    }
+    MAX_HOPS = 3
+
     def __init__(self, uri, user, password):
         self._driver = GraphDatabase.driver(uri, auth=(user, password))
 
@@ -16,17 +79,131 @@ class Neo4jGraphManager:
         """Close the Neo4j driver connection."""
         self._driver.close()
 
-    def create_nodes(self, nodes):
-        """Create nodes and relationships in the Neo4j database."""
+    def ensure_schema(self, timeout=SCHEMA_TIMEOUT_SECONDS):
+        """Idempotently create uniqueness constraints, wait for their indexes, and report any missing."""
+        with self._driver.session() as session:
+            # MO nodes created before MO.key existed need one before the constraint can hold
+            session.execute_write(self._backfill_mo_keys)
+            for name, (label, prop) in SCHEMA_CONSTRAINTS.items():
+                try:
+                    session.run(f"CREATE CONSTRAINT {name} IF NOT EXISTS "
+                                f"FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE").consume()
+                except ClientError as e:
+                    # Typically duplicate nodes left by earlier unconstrained ingests
+                    print(f"Could not create constraint {name}: {e.message}")
+            session.run("CALL db.awaitIndexes($timeout)", timeout=timeout).consume()
+
+            existing = {r["name"] for r in session.run("SHOW CONSTRAINTS YIELD name")}
+            not_online = [r["name"] for r in session.run("SHOW INDEXES YIELD name, state")
+                          if r["state"] != "ONLINE"]
+
+        missing = [name for name in SCHEMA_CONSTRAINTS if name not in existing]
+        for name in missing:
+            label, prop = SCHEMA_CONSTRAINTS[name]
+            print(f"⚠️ Missing constraint {name} on :{label}({prop}); MERGEs on it will scan the label")
+        for name in not_online:
+            print(f"⚠️ Index {name} is not online yet")
+        if not missing and not not_online:
+            print(f"✅ Schema ready: {len(SCHEMA_CONSTRAINTS)} uniqueness constraints online")
+        return missing + not_online
+
+    def create_nodes(self, nodes, batch_size=INGEST_BATCH_SIZE, workers=INGEST_WORKERS,
+                     max_retries=INGEST_MAX_RETRIES, replace=False):
+        """Create nodes and relationships in the Neo4j database, one UNWIND query per chunk.
+
+        With replace=True each suspect's existing relationships are retracted in the same
+        transaction before the new ones are merged.
+        """
+        rows = []
+        for n in nodes:
+            # Validate input data
+            if not n.get("SuspectID") or not n.get("PredictedCrimeType"):
+                print(f"Skipping invalid record: {n}")
+                continue
+            rows.append({"sid": n["SuspectID"], "ctype": n["PredictedCrimeType"], "weapon": n["LikelyWeapon"],
+                         "mo": n["MatchedMOExamples"], "mo_key": mo_key(n["MatchedMOExamples"]),
+                         "loc": n["LocationID"]})
+        if not rows:
+            return {"rows": 0, "chunks": 0, "seconds": 0.0}
+
+        started = time.perf_counter()
+
+        # Shared nodes first, serially, so concurrent chunks only ever match them
+        with self._driver.session() as session:
+            session.execute_write(self._create_shared_nodes, {
+                "ctypes": sorted({r["ctype"] for r in rows}),
+                "weapons": sorted({r["weapon"] for r in rows}),
+                "mos": sorted({(r["mo_key"], r["mo"]) for r in rows}),
+                "locs": sorted({r["loc"] for r in rows}),
+            })
+
+        # Rows of one suspect always land in the same chunk, so chunks touch disjoint suspects
+        rows.sort(key=lambda r: r["sid"])
+        chunks = [[]]
+        for row in rows:
+            if len(chunks[-1]) >= batch_size and chunks[-1][-1]["sid"] != row["sid"]:
+                chunks.append([])
+            chunks[-1].append(row)
+
+        with tqdm(total=len(rows), desc="Creating nodes", unit="rows") as progress:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                write = self._replace_node_batch if replace else self._create_node_batch
+                futures = [pool.submit(self._write_chunk, write, chunk, max_retries) for chunk in chunks]
+                for future in as_completed(futures):
+                    progress.update(future.result())
+
+        seconds = time.perf_counter() - started
+        print(f"Ingested {len(rows)} rows in {len(chunks)} chunks: {seconds:.1f}s ({len(rows) / seconds:,.0f} rows/s)")
+        return {"rows": len(rows), "chunks": len(chunks), "seconds": seconds}
+
+    def sync_nodes(self, nodes, previous_nodes, **kwargs):
+        """Bring the graph from previous_nodes to nodes, touching only suspects that changed."""
+        upserts, removed_ids, stale = diff_predictions(pd.DataFrame(nodes, columns=INGEST_COLUMNS),
+                                                       pd.DataFrame(previous_nodes, columns=INGEST_COLUMNS))
+        print(f"Sync: {len(upserts)} new or changed suspects, {len(removed_ids)} removed")
+        stats = self.create_nodes(upserts.to_dict(orient="records"), replace=True, **kwargs)
         with self._driver.session() as session:
-            for n in tqdm(nodes, desc="Creating nodes"):
-                # Validate input data
-                if not n.get("SuspectID") or not n.get("PredictedCrimeType"):
-                    print(f"Skipping invalid record: {n}")
-                    continue
+            if removed_ids:
+                session.execute_write(self._delete_suspects, removed_ids)
+            # Shared nodes the old rows pointed at may now be unreferenced
+            session.execute_write(self._delete_orphans, {
+                "ctypes": sorted(set(stale["PredictedCrimeType"])),
+                "weapons": sorted(set(stale["LikelyWeapon"])),
+                "mo_keys": sorted({mo_key(d) for d in stale["MatchedMOExamples"]}),
+                "locs": sorted(set(stale["LocationID"])),
+            })
+        stats.update(upserted=len(upserts), removed=len(removed_ids),
+                     changed_ids=upserts["SuspectID"].tolist() + removed_ids)
+        return stats
+
+    def set_graph_metrics(self, rows, batch_size=INGEST_BATCH_SIZE):
+        """Store graph analytics rows (see graph_analytics.py) as properties of their nodes."""
+        by_kind = {}
+        for row in rows:
+            kind = row["Kind"]
+            by_kind.setdefault(kind, []).append({
+                "key": mo_key(row["Node"]) if kind == "mo" else row["Node"],
+                "component": row["Component"], "community": row["Community"],
+                "degree": int(row["Degree"]), "co_offenders": int(row["CoOffenders"]),
+                "betweenness": float(row["Betweenness"]), "pagerank": float(row["PageRank"]),
+            })
+        for kind, kind_rows in by_kind.items():
+            label, prop = self.NODE_KINDS[kind]
+            for start in range(0, len(kind_rows), batch_size):
+                chunk = kind_rows[start:start + batch_size]
+                self._write_chunk(lambda tx, c: self._set_node_metrics(tx, label, prop, c), chunk, INGEST_MAX_RETRIES)
 
-                # Create nodes and relationships
-                session.execute_write(self._create_node, n)
+    def _write_chunk(self, write, chunk, max_retries):
+        """Write one chunk in its own session, retrying transient failures such as deadlocks."""
+        for attempt in range(max_retries + 1):
+            try:
+                with self._driver.session() as session:
+                    session.execute_write(write, chunk)
+                return len(chunk)
+            except TransientError:
+                if attempt == max_retries:
+                    raise
+                time.sleep(min(0.1 * 2 ** attempt, 5.0))
 
     def del_nodes(self, label, mode):
         """Delete nodes based on label and mode."""
@@ -46,54 +223,168 @@ class Neo4jGraphManager:
 
     def get_graph_data(self):
         """Fetch graph data from Neo4j and return nodes and links."""
-        query = """
-        MATCH (s:Suspect)-[r]->(n)
-        RETURN s.id AS source, type(r) AS relation, 
-               CASE 
-                   WHEN exists(n.id) THEN n.id
-                   WHEN exists(n.name) THEN n.name
-                   WHEN exists(n.description) THEN n.description
-                   ELSE "Unknown"
-               END AS target
-        """
+        query = self.GRAPH_QUERY
         links = []
         nodes = set()
 
-        with self._driver.session() as session:
-            results = session.execute_read(lambda tx: tx.run(query).data())
-
-        for record in results:
-            src = record['source']
-            tgt = record['target']
-            rel = record['relation']
-            links.append({"source": src, "target": tgt, "label": rel})
-            nodes.add(src)
-            nodes.add(tgt)
+        for link in self._iter_links(query):
+            links.append(link)
+            nodes.add(link["source"])
+            nodes.add(link["target"])
 
         return {
             "nodes": [{"id": n} for n in nodes],
             "links": links
         }
 
+    def iter_graph_links(self):
+        """Yield graph links one by one straight from the driver cursor."""
+        return self._iter_links(self.GRAPH_QUERY)
+
+    def iter_neighbourhood(self, kind, value, hops=1, limit=None):
+        """Yield the Suspect links among all nodes within `hops` of one start node.
+
+        The neighbourhood is expanded one hop at a time from the nodes first reached in
+        the previous hop, so a hub is expanded once rather than once per path through
+        it; the links are then matched between the collected node ids.
+        """
+        label, prop = self.NODE_KINDS[kind]
+        if kind == "mo":
+            value = mo_key(value)
+        hops = max(1, min(int(hops), self.MAX_HOPS))
+        with self._driver.session() as session:
+            frontier = [record["id"] for record in session.run(
+                f"MATCH (start:{label} {{{prop}: $value}}) RETURN id(start) AS id", value=value)]
+            members = set(frontier)
+            for _ in range(hops):
+                if not frontier:
+                    break
+                reached = session.run("""
+                    MATCH (f) WHERE id(f) IN $frontier
+                    MATCH (f)--(m)
+                    RETURN DISTINCT id(m) AS id
+                    """, frontier=frontier)
+                frontier = [record["id"] for record in reached if record["id"] not in members]
+                members.update(frontier)
+
+        query = f"""
+            MATCH (s:Suspect) WHERE id(s) IN $members
+            MATCH (s)-[r]->(n) WHERE id(n) IN $members
+            RETURN s.id AS source, type(r) AS relation, {self.TARGET_EXPR} AS target
+            ORDER BY source
+            """
+        if limit:
+            query += " LIMIT $limit"
+        yield from self._iter_links(query, members=list(members), limit=limit)
+
+    def iter_suspect_links(self, crime=None, suspect_ids=None, after=None, limit=None):
+        """Yield every link of the selected suspects, ordered by suspect id.
+
+        Suspects can be filtered by predicted crime type and/or an explicit id list.
+        `after`/`limit` give keyset pagination over suspects: pass the last suspect id
+        of one page as `after` to get the next.
+        """
+        conditions = []
+        if after is not None:
+            conditions.append("s.id > $after")
+        if suspect_ids is not None:
+            conditions.append("s.id IN $suspect_ids")
+        if crime is not None:
+            conditions.append("(s)-[:LIKELY_TO_COMMIT]->(:CrimeType {name: $crime})")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        page = "LIMIT $limit" if limit else ""
+        query = f"""
+            MATCH (s:Suspect)
+            {where}
+            WITH s ORDER BY s.id {page}
+            MATCH (s)-[r]->(n)
+            RETURN s.id AS source, type(r) AS relation, {self.TARGET_EXPR} AS target
+            ORDER BY source
+            """
+        return self._iter_links(query, after=after, suspect_ids=suspect_ids, crime=crime, limit=limit)
+
+    def _iter_links(self, query, **params):
+        """Run a link query and yield its rows as they arrive from the driver cursor."""
+        with self._driver.session() as session:
+            for record in session.run(query, **params):
+                yield {"source": record["source"], "target": record["target"], "label": record["relation"]}
+
+    @staticmethod
+    def _create_shared_nodes(tx, shared):
+        """Create the crime type, weapon, MO and location nodes referenced by a batch."""
+        tx.run("UNWIND $names AS name MERGE (:CrimeType {name: name})", names=shared["ctypes"])
+        tx.run("UNWIND $names AS name MERGE (:Weapon {name: name})", names=shared["weapons"])
+        tx.run("UNWIND $mos AS mo MERGE (m:MO {key: mo.key}) ON CREATE SET m.description = mo.description",
+               mos=[{"key": key, "description": description} for key, description in shared["mos"]])
+        tx.run("UNWIND $ids AS id MERGE (:Location {id: id})", ids=shared["locs"])
+
     @staticmethod
-    def _create_node(tx, node):
-        """Create a node and its relationships in Neo4j."""
+    def _create_node_batch(tx, rows):
+        """Create suspect nodes and their relationships for a chunk of rows."""
         tx.run("""
-            MERGE (s:Suspect {id: $sid})
-            MERGE (c:CrimeType {name: $ctype})
-            MERGE (w:Weapon {name: $weapon})
-            MERGE (m:MO {description: $mo})
-            MERGE (l:Location {id: $loc})
+            UNWIND $rows AS row
+            MERGE (s:Suspect {id: row.sid})
+            MERGE (c:CrimeType {name: row.ctype})
+            MERGE (w:Weapon {name: row.weapon})
+            MERGE (m:MO {key: row.mo_key}) ON CREATE SET m.description = row.mo
+            MERGE (l:Location {id: row.loc})
 
             MERGE (s)-[:LIKELY_TO_COMMIT]->(c)
             MERGE (s)-[:LIKELY_TO_USE]->(w)
             MERGE (s)-[:MATCHED_WITH_PATTERN]->(m)
             MERGE (s)-[:ACTIVE_IN]->(l)
-        """, sid=node['SuspectID'],
-             ctype=node['PredictedCrimeType'],
-             weapon=node['LikelyWeapon'],
-             mo=node['MatchedMOExamples'],
-             loc=node['LocationID'])
+        """, rows=rows)
+
+    @staticmethod
+    def _replace_node_batch(tx, rows):
+        """Retract each suspect's current relationships and merge the new ones, in one transaction."""
+        tx.run("""
+            UNWIND $rows AS row
+            MERGE (s:Suspect {id: row.sid})
+            WITH s, row
+            OPTIONAL MATCH (s)-[old:LIKELY_TO_COMMIT|LIKELY_TO_USE|MATCHED_WITH_PATTERN|ACTIVE_IN]->()
+            DELETE old
+            WITH DISTINCT s, row
+            MERGE (c:CrimeType {name: row.ctype})
+            MERGE (w:Weapon {name: row.weapon})
+            MERGE (m:MO {key: row.mo_key}) ON CREATE SET m.description = row.mo
+            MERGE (l:Location {id: row.loc})
+
+            MERGE (s)-[:LIKELY_TO_COMMIT]->(c)
+            MERGE (s)-[:LIKELY_TO_USE]->(w)
+            MERGE (s)-[:MATCHED_WITH_PATTERN]->(m)
+            MERGE (s)-[:ACTIVE_IN]->(l)
+        """, rows=rows)
+
+    @staticmethod
+    def _set_node_metrics(tx, label, prop, rows):
+        tx.run(f"""
+            UNWIND $rows AS row
+            MATCH (n:{label} {{{prop}: row.key}})
+            SET n.component = row.component, n.community = row.community, n.degree = row.degree,
+                n.co_offenders = row.co_offenders, n.betweenness = row.betweenness, n.pagerank = row.pagerank
+        """, rows=rows)
+
+    @staticmethod
+    def _delete_suspects(tx, suspect_ids):
+        tx.run("UNWIND $ids AS id MATCH (s:Suspect {id: id}) DETACH DELETE s", ids=suspect_ids)
+
+    @staticmethod
+    def _delete_orphans(tx, shared):
+        """Delete the given shared nodes if nothing references them any more."""
+        for label, prop, key in [("CrimeType", "name", "ctypes"), ("Weapon", "name", "weapons"),
+                                 ("MO", "key", "mo_keys"), ("Location", "id", "locs")]:
+            tx.run(f"UNWIND $values AS value MATCH (n:{label} {{{prop}: value}}) WHERE NOT (n)--() DELETE n",
+                   values=shared[key])
+
+    @staticmethod
+    def _backfill_mo_keys(tx):
+        """Set the hashed key on MO nodes that do not have one yet."""
+        descriptions = [r["description"] for r in tx.run(
+            "MATCH (m:MO) WHERE m.key IS NULL RETURN DISTINCT m.description AS description")]
+        if descriptions:
+            tx.run("UNWIND $mos AS mo MATCH (m:MO {description: mo.description}) WHERE m.key IS NULL SET m.key = mo.key",
+                   mos=[{"key": mo_key(d), "description": d} for d in descriptions])
 
     @staticmethod
     def _delete_nodes(tx, label):
@@ -121,10 +412,92 @@ class Neo4jGraphManager:
         print(f"Transport part 2 using delta2 {delta2} (placeholder)")
 
 
+# === Snapshot diff for delta ingest ===
+def diff_predictions(new_df, old_df):
+    """Compare two prediction snapshots.
+
+    Returns (upserts, removed_ids, stale): rows that are new or changed, SuspectIDs that
+    disappeared, and the previous rows of every changed or removed suspect.
+    """
+    new = new_df.astype(str).drop_duplicates("SuspectID", keep="last").set_index("SuspectID")
+    old = old_df.astype(str).drop_duplicates("SuspectID", keep="last").set_index("SuspectID")
+    common = new.index.intersection(old.index)
+    changed = common[(new.loc[common] != old.loc[common]).any(axis=1)]
+    added = new.index.difference(old.index)
+    removed = old.index.difference(new.index)
+
+    upserts = new.loc[changed.append(added)].reset_index()
+    stale = old.loc[changed.append(removed)].reset_index()
+    return upserts, removed.tolist(), stale
+
+
+# === Graph data for the API ===
+def fetch_graph_data():
+    """Fetch the full graph payload using a short-lived connection."""
+    manager = Neo4jGraphManager(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    try:
+        return manager.get_graph_data()
+    finally:
+        manager.close()
+
+
+def fetch_graph_links():
+    """Fetch every link of the graph (e.g. to build a GraphSnapshot) using a short-lived connection."""
+    manager = Neo4jGraphManager(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    try:
+        return list(manager.iter_graph_links())
+    finally:
+        manager.close()
+
+
+def iter_graph_items(graph, node=None, kind="suspect", hops=1, crime=None, suspect_ids=None, after=None, limit=None):
+    """Stream (part of) a graph as ("node", {...}) / ("link", {...}) items.
+
+    `graph` is a Neo4jGraphManager or anything with the same query methods (e.g. a
+    GraphSnapshot). With `node` the k-hop neighbourhood of that node is returned; with
+    crime, suspect_ids, after or limit a filtered/paginated suspect subgraph; otherwise
+    the whole graph. Nodes are emitted on first sight, so the set of node ids seen so
+    far is held for the whole stream: memory grows with the number of nodes, not links.
+    """
+    if node is not None:
+        links = graph.iter_neighbourhood(kind, node, hops=hops, limit=limit)
+    elif crime is not None or suspect_ids is not None or after is not None or limit:
+        links = graph.iter_suspect_links(crime=crime, suspect_ids=suspect_ids, after=after, limit=limit)
+    else:
+        links = graph.iter_graph_links()
+
+    seen = set()
+    for link in links:
+        for node_id in (link["source"], link["target"]):
+            if node_id not in seen:
+                seen.add(node_id)
+                yield "node", {"id": node_id}
+        yield "link", link
+
+
+def iter_graph_data(**query):
+    """iter_graph_items() against Neo4j, using a short-lived connection."""
+    manager = Neo4jGraphManager(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    try:
+        yield from iter_graph_items(manager, **query)
+    finally:
+        manager.close()
+
+
 # === Ingesting Data ===
 if __name__ == "__main__":
+    from graph_analytics import compute_analytics, load_analytics
+    from data_store import read_dataset
+    from graph_cache import bump_generation
+    from graph_snapshot import GraphSnapshot
+
+    parser = argparse.ArgumentParser(description="Ingest rule-based predictions into Neo4j")
+    parser.add_argument("--sync", action="store_true",
+                        help="only apply the difference to the last ingested snapshot")
+    args = parser.parse_args()
+
     # Load prediction CSV
-    df = pd.read_csv("../data/rule_based_predictions.csv").fillna("Unknown")
+    df = read_dataset(PREDICTIONS_PATH, categorical=False).fillna("Unknown")
     df.replace(r'^\s*$', 'Unknown', regex=True, inplace=True)
 
     # Add dummy location from suspect ID
@@ -137,8 +510,32 @@ if __name__ == "__main__":
     print("🔗 Connecting to Neo4j...")
     manager = Neo4jGraphManager(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
 
-    print("🚀 Creating graph from rule-based predictions...")
-    manager.create_nodes(nodes)
+    print("🧱 Ensuring graph schema...")
+    manager.ensure_schema()
+
+    changed_ids = None
+    if args.sync and os.path.exists(SNAPSHOT_PATH):
+        print("🔁 Syncing graph against the last ingested snapshot...")
+        previous = pd.read_csv(SNAPSHOT_PATH, dtype=str, keep_default_na=False)
+        changed_ids = manager.sync_nodes(nodes, previous.to_dict(orient="records"))["changed_ids"]
+    else:
+        print("🚀 Creating graph from rule-based predictions...")
+        manager.create_nodes(nodes)
+    df[INGEST_COLUMNS].to_csv(SNAPSHOT_PATH, index=False)
+
+    # Recompute only the components touched by a sync
+    print("📈 Computing graph analytics...")
+    previous_analytics = None
+    if changed_ids is not None and os.path.exists(GRAPH_ANALYTICS_PATH):
+        previous_analytics = load_analytics(GRAPH_ANALYTICS_PATH)
+    links = list(manager.iter_graph_links())
+    analytics = compute_analytics(links, previous_analytics, changed_ids)
+    analytics.to_csv(GRAPH_ANALYTICS_PATH, index=False)
+    manager.set_graph_metrics(analytics.to_dict(orient="records"))
+
+    print("💾 Exporting binary graph...")
+    GraphSnapshot.from_links(links).save(GRAPH_EXPORT_PATH)
+    bump_generation(GRAPH_GENERATION_PATH)
 
     # Fetch graph data after ingestion
     print("🔍 Fetching graph data from Neo4j...")
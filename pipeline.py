@@ -0,0 +1,297 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from utils.data_store import dataset_file
+
+# Every path below is relative to the backend directory, whatever the caller's cwd is
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BACKEND_DIR)
+UTILS_DIR = os.path.join(BACKEND_DIR, "utils")
+
+STATE_PATH = "data/pipeline_state.json"
+RUN_LOG_PATH = "data/pipeline_runs.jsonl"
+STAGE_LOG_DIR = "logs/pipeline"
+
+
+class Stage:
+    """One script of the pipeline, with the files it reads and writes.
+
+    cwd and command are what the script expects (the scripts use paths relative to
+    different directories); code, inputs and outputs are backend-relative. Dataset
+    inputs and outputs are named by their CSV/pickle path and resolve to the Parquet
+    copy when there is one, as data_store.read_dataset() does. Every code file and
+    input must exist, except the inputs listed as optional.
+    """
+
+    def __init__(self, name, cwd, command, code, inputs, outputs, optional=()):
+        self.name = name
+        self.cwd = cwd
+        self.command = list(command)
+        self.code = list(code)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.optional = list(optional)
+
+
+PROCESSED_DATA = "data/processed_data.pkl"
+PREDICTIONS = "data/rule_based_predictions.csv"
+SUSPECT_FEATURES = "data/suspect_features.csv"
+
+STAGES = [
+    Stage("preprocess", PROJECT_DIR, ["backend/utils/preprocessor.py"],
+          code=["utils/preprocessor.py", "utils/data_store.py"],
+          inputs=["data/crime_records.csv", "data/mo_details.csv", "data/crime_pattern_history.csv",
+                  "data/crime_frequency.csv"],
+          outputs=[PROCESSED_DATA]),
+    Stage("features", UTILS_DIR, ["feature_store.py"],
+          code=["utils/feature_store.py", "utils/data_store.py"],
+          inputs=[PROCESSED_DATA, "data/risk_scores.csv"],
+          outputs=[SUSPECT_FEATURES, "data/crime_features.csv"],
+          optional=["data/risk_scores.csv"]),
+    Stage("train", BACKEND_DIR, ["train_model.py"],
+          code=["train_model.py", "utils/compiled_model.py", "utils/data_store.py", "utils/feature_store.py"],
+          inputs=[PROCESSED_DATA],
+          outputs=["models/trained_model.pkl", "models/vectorizer.pkl", "models/trained_model.npz"]),
+    Stage("predict", UTILS_DIR, ["predict_mo.py"],
+          code=["utils/predict_mo.py", "utils/data_store.py", "utils/feature_store.py"],
+          inputs=["models/trained_model.pkl", PROCESSED_DATA],
+          outputs=["data/mo_predictions.csv"]),
+    Stage("rules", UTILS_DIR, ["rule_base_predictor.py", "--incremental"],
+          code=["utils/rule_base_predictor.py", "utils/mo_matcher.py", "utils/data_store.py", "utils/feature_store.py"],
+          inputs=[PROCESSED_DATA, SUSPECT_FEATURES],
+          outputs=[PREDICTIONS]),
+    Stage("ingest", UTILS_DIR, ["neo4j_ingest.py", "--sync"],
+          code=["utils/neo4j_ingest.py", "utils/graph_analytics.py", "utils/graph_cache.py",
+                "utils/graph_snapshot.py", "utils/data_store.py"],
+          inputs=[PREDICTIONS],
+          outputs=["data/graph_analytics.csv", "data/graph.ctxg"]),
+]
+
+
+# === Fingerprints ===
+class FileHashes:
+    """Content hashes of files and directories, cached by size and modification time."""
+
+    def __init__(self, cache=None):
+        self.cache = dict(cache or {})
+        self._lock = threading.Lock()
+
+    def file_digest(self, path):
+        stat = os.stat(path)
+        key = os.path.relpath(path, BACKEND_DIR)
+        with self._lock:
+            cached = self.cache.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        with self._lock:
+            self.cache[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def digest(self, path):
+        """Hash of a file, of every file under a directory, or a marker if it is missing (optional inputs)."""
+        if os.path.isdir(path):
+            digest = hashlib.sha256()
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    file = os.path.join(root, name)
+                    digest.update(f"{os.path.relpath(file, path)}:{self.file_digest(file)};".encode("utf-8"))
+            return digest.hexdigest()
+        if os.path.exists(path):
+            return self.file_digest(path)
+        return "missing"
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.cache)
+
+
+def resolve(path):
+    """Absolute location of a backend-relative path, as the stage scripts read it."""
+    return dataset_file(os.path.join(BACKEND_DIR, path))
+
+
+def missing_paths(stage):
+    """Code files and required inputs of a stage that do not exist."""
+    return [path for path in stage.code + stage.inputs
+            if path not in stage.optional and not os.path.exists(resolve(path))]
+
+
+def stage_fingerprint(stage, hashes):
+    """Hash of a stage's command, code and inputs: unchanged means its outputs are current."""
+    digest = hashlib.sha256(json.dumps(stage.command).encode("utf-8"))
+    for path in stage.code + stage.inputs:
+        digest.update(f"{path}:{hashes.digest(resolve(path))};".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# === Running stages ===
+def run_stage(stage, log_path):
+    """Run a stage's script; returns (exit code, wall seconds, CPU seconds, peak RSS in MB)."""
+    started = time.perf_counter()
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen([sys.executable] + stage.command, cwd=stage.cwd, stdout=log,
+                                stderr=subprocess.STDOUT)
+        if hasattr(os, "wait4"):
+            # Resource usage of this child alone, even with other stages running
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            cpu = usage.ru_utime + usage.ru_stime
+            peak_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        else:
+            proc.wait()
+            cpu = peak_mb = None
+    return proc.returncode, time.perf_counter() - started, cpu, peak_mb
+
+
+class PipelineRunner:
+    """Runs the stages in dependency order, skipping the ones whose fingerprint is unchanged.
+
+    A stage depends on the stages that write its inputs. Stages whose dependencies are
+    done run in parallel, up to `workers` at a time. A stage that reruns but writes
+    byte-identical outputs leaves the stages below it skipped.
+    """
+
+    def __init__(self, stages, workers=2, force=False, dry_run=False):
+        self.stages = {stage.name: stage for stage in stages}
+        self.workers = workers
+        self.force = force
+        self.dry_run = dry_run
+        self.state = self.load_state()
+        self.hashes = FileHashes(self.state.get("files"))
+        self.run_id = uuid.uuid4().hex[:12]
+        self.results = {}
+        self._lock = threading.Lock()
+
+        producers = {output: stage.name for stage in stages for output in stage.outputs}
+        self.depends_on = {
+            stage.name: {producers[path] for path in stage.inputs if producers.get(path) not in (None, stage.name)}
+            for stage in stages
+        }
+
+    @staticmethod
+    def load_state():
+        path = os.path.join(BACKEND_DIR, STATE_PATH)
+        if not os.path.exists(path):
+            return {"stages": {}, "files": {}}
+        with open(path) as f:
+            return json.load(f)
+
+    def save_state(self):
+        with self._lock:
+            self.state["files"] = self.hashes.snapshot()
+            path = os.path.join(BACKEND_DIR, STATE_PATH)
+            with open(path + ".tmp", "w") as f:
+                json.dump(self.state, f, indent=1)
+            os.replace(path + ".tmp", path)
+
+    def log_run(self, record):
+        with self._lock:
+            with open(os.path.join(BACKEND_DIR, RUN_LOG_PATH), "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def execute(self, name):
+        """Run one stage if it is stale; returns its status."""
+        stage = self.stages[name]
+        missing = missing_paths(stage)
+        if missing:
+            # A renamed script or mistyped path would otherwise hash as "missing" forever
+            print(f"❌ {name}: missing {', '.join(missing)}")
+            self.results[name] = {"run": self.run_id, "stage": name, "status": "failed", "missing": missing}
+            if not self.dry_run:
+                self.log_run(self.results[name])
+            return "failed"
+        fingerprint = stage_fingerprint(stage, self.hashes)
+        outputs_exist = all(os.path.exists(resolve(path)) for path in stage.outputs)
+        if not self.force and outputs_exist and self.state["stages"].get(name) == fingerprint:
+            status, wall, cpu, peak_mb = "skipped", 0.0, 0.0, None
+        elif self.dry_run:
+            status, wall, cpu, peak_mb = "stale", 0.0, 0.0, None
+        else:
+            print(f"▶️ {name}: {' '.join(stage.command)}")
+            log_path = os.path.join(BACKEND_DIR, STAGE_LOG_DIR, f"{name}.log")
+            code, wall, cpu, peak_mb = run_stage(stage, log_path)
+            status = "ok" if code == 0 else "failed"
+            if code == 0:
+                with self._lock:
+                    self.state["stages"][name] = fingerprint
+                self.save_state()
+
+        record = {"run": self.run_id, "stage": name, "status": status, "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                  "wall_s": round(wall, 3), "cpu_s": None if cpu is None else round(cpu, 3),
+                  "peak_mb": None if peak_mb is None else round(peak_mb, 1), "fingerprint": fingerprint[:16]}
+        if not self.dry_run:
+            self.log_run(record)
+        self.results[name] = record
+        icon = {"ok": "✅", "skipped": "⏭️", "stale": "🔸", "failed": "❌"}[status]
+        detail = f" in {wall:.1f}s (cpu {cpu or 0:.1f}s, peak {peak_mb or 0:.0f} MB)" if status in ("ok", "failed") else ""
+        print(f"{icon} {name}: {status}{detail}")
+        return status
+
+    def run(self, only=None):
+        """Run the selected stages (all by default); stages left out count as done."""
+        selected = [name for name in self.stages if only is None or name in only]
+        os.makedirs(os.path.join(BACKEND_DIR, STAGE_LOG_DIR), exist_ok=True)
+        status = {}
+        pending = list(selected)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running = {}
+            while pending or running:
+                for name in list(pending):
+                    deps = [dep for dep in self.depends_on[name] if dep in selected]
+                    if any(status.get(dep) in ("failed", "blocked") for dep in deps):
+                        pending.remove(name)
+                        status[name] = "blocked"
+                        print(f"⛔ {name}: blocked by a failed stage")
+                    elif self.dry_run and any(status.get(dep) == "stale" for dep in deps):
+                        # Would rerun once its upstream stage has
+                        pending.remove(name)
+                        status[name] = "stale"
+                        print(f"🔸 {name}: stale (upstream)")
+                    elif all(dep in status for dep in deps):
+                        pending.remove(name)
+                        running[pool.submit(self.execute, name)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    status[running.pop(future)] = future.result()
+        if not self.dry_run:
+            self.save_state()
+        return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the preprocess -> features -> train -> predict -> rules -> ingest pipeline")
+    parser.add_argument("stages", nargs="*", help=f"stages to run (default: all of {', '.join(s.name for s in STAGES)})")
+    parser.add_argument("--skip", nargs="+", default=[], choices=[stage.name for stage in STAGES],
+                        help="stages to leave out, e.g. ingest without a Neo4j server")
+    parser.add_argument("--workers", type=int, default=2, help="stages run in parallel")
+    parser.add_argument("--force", action="store_true", help="run stages even if their inputs are unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="only report which stages are out of date")
+    parser.add_argument("--stream", action="store_true", help="run the preprocessor in streaming mode")
+    args = parser.parse_args()
+
+    unknown = set(args.stages) - {stage.name for stage in STAGES}
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    if args.stream:
+        STAGES[0].command.append("--stream")
+    only = set(args.stages or [stage.name for stage in STAGES]) - set(args.skip)
+    runner = PipelineRunner(STAGES, workers=args.workers, force=args.force, dry_run=args.dry_run)
+    status = runner.run(only)
+    if "failed" in status.values() or "blocked" in status.values():
+        raise SystemExit(f"❌ Pipeline failed; stage logs are in {os.path.join(BACKEND_DIR, STAGE_LOG_DIR)}")
+    if not args.dry_run:
+        print(f"🏁 Pipeline run {runner.run_id} finished; timings appended to {os.path.join(BACKEND_DIR, RUN_LOG_PATH)}")
@@ -1,26 +1,224 @@
+import argparse
+import json
+import os
+import time
 import pandas as pd
 import joblib
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from data_store import (EXPORT_LEGACY, dataset_file, dataset_files, parquet_path, read_dataset, read_row_group,
+                        remove_path, row_groups, to_table, write_dataset)
+from feature_store import SUSPECT_FEATURES_PATH, SUSPECT_MODEL_FEATURES, join_suspect_features
 
-# === Load model and vectorizer ===
-model = joblib.load("../models/trained_model.pkl")
-
-# === Load processed data ===
-df = pd.read_pickle("../data/processed_data.pkl")
+MODEL_PATH = "../models/trained_model.pkl"
+DATA_PATH = "../data/processed_data.pkl"
+OUTPUT_PATH = "../data/mo_predictions.csv"
 
 # === Select the same features used in training ===
 features = ["CrimeType", "WeaponUsed_x", "SeverityScore", "IsGangRelated"]
+# What --ids-only keeps next to the prediction
+ID_COLUMNS = ["CrimeID", "SuspectID"]
+
+# Rows per batch when the input has no Parquet copy to take row groups from
+BATCH_SIZE = 100_000
+MANIFEST_NAME = "_manifest.json"
+# Rows read from each part at a time while merging the parts into the CSV export
+EXPORT_BATCH_SIZE = 10_000
+
+
+def stored_features(model):
+    """Inputs of a model trained with --suspect-features that come from the feature store."""
+    return [f for f in getattr(model, "feature_names_in_", []) if f in SUSPECT_MODEL_FEATURES]
+
+
+def model_input(df, stored, suspects):
+    """The feature columns of df, plus the stored suspect features the model was trained on."""
+    X = df[features]
+    if stored:
+        X = join_suspect_features(X.assign(SuspectID=df["SuspectID"]), suspects, stored)[features + stored]
+    return X
+
+
+def load_suspect_features(stored):
+    return read_dataset(SUSPECT_FEATURES_PATH, columns=["SuspectID"] + stored) if stored else None
+
+
+# === Whole-frame scoring ===
+def predict_all():
+    # === Load model and vectorizer ===
+    model = joblib.load(MODEL_PATH)
+
+    # === Load processed data ===
+    df = read_dataset(DATA_PATH)
+
+    # Remove rows with missing feature values
+    df = df.dropna(subset=features)
+
+    # === Predict Modus Operandi Category ===
+    stored = stored_features(model)
+    predictions = model.predict(model_input(df, stored, load_suspect_features(stored)))
+
+    # === Save results (Parquet by crime year, plus the CSV export) ===
+    df["PredictedMOCategory"] = predictions
+    write_dataset(df, OUTPUT_PATH, partition_by="CrimeDate")
+    print(f"✅ Predictions completed! Results saved to: {OUTPUT_PATH}")
+
+
+# === Partitioned batch scoring ===
+_model = None
+_stored = []
+_suspects = None
+
+
+def _load_model(path):
+    global _model, _stored, _suspects
+    _model = joblib.load(path)
+    _stored = stored_features(_model)
+    _suspects = load_suspect_features(_stored)
+
+
+def score_partition(part_path, columns, source):
+    """Score one partition in a worker and write it as its own part file.
+
+    source is (file, row group, first row) of the Parquet input, or the rows
+    themselves. Rows keep their input row number, so the parts read back in input
+    order. The part appears under its final name only once complete.
+    """
+    if isinstance(source, pd.DataFrame):
+        df = source
+    else:
+        df = read_row_group(*source[:2], columns=columns, first_row=source[2])
+    df = df.dropna(subset=features)
+    df["PredictedMOCategory"] = _model.predict(model_input(df, _stored, _suspects)) if len(df) else []
+    if columns is not None:
+        df = df[[c for c in ID_COLUMNS if c in df] + ["PredictedMOCategory"]]
+
+    tmp = os.path.join(os.path.dirname(part_path), "." + os.path.basename(part_path))
+    pq.write_table(to_table(df, keep_order=True, first_row=None), tmp)
+    os.replace(tmp, part_path)
+    return len(df)
+
+
+def plan_partitions(ids_only):
+    """(part name, source) per partition of the input, and a description for the manifest."""
+    columns = ID_COLUMNS + features if ids_only else None
+    groups = list(row_groups(DATA_PATH))
+    if groups:
+        inputs = [[os.path.basename(f), os.path.getsize(f), os.stat(f).st_mtime_ns] for f in dataset_files(DATA_PATH)]
+        files = {f: i for i, f in enumerate(dict.fromkeys(file for file, *_ in groups))}
+        parts = [(f"{files[file]:05d}-{group:05d}.parquet", (file, group, first_row))
+                 for file, group, first_row, _ in groups]
+    else:
+        # No Parquet copy: load the pickle/CSV once and hand out slices
+        df = read_dataset(DATA_PATH, columns=columns)
+        inputs = [[os.path.basename(DATA_PATH), os.path.getsize(DATA_PATH), os.stat(DATA_PATH).st_mtime_ns]]
+        parts = [(f"00000-{start // BATCH_SIZE:05d}.parquet", df.iloc[start:start + BATCH_SIZE])
+                 for start in range(0, len(df), BATCH_SIZE)]
+    stored = stored_features(joblib.load(MODEL_PATH))
+    if stored:
+        # Predictions also depend on the stored suspect features
+        store = dataset_file(SUSPECT_FEATURES_PATH)
+        inputs.append([os.path.basename(store), os.path.getsize(store), os.stat(store).st_mtime_ns])
+    model_stat = os.stat(MODEL_PATH)
+    manifest = {"inputs": inputs, "model": [model_stat.st_size, model_stat.st_mtime_ns], "ids_only": ids_only,
+                "parts": len(parts)}
+    return parts, columns, manifest
+
+
+def predict_batches(workers=None, ids_only=False, restart=False):
+    """Score the input partition by partition on a process pool, resuming an interrupted run.
+
+    Each worker loads the model once. Every finished partition is written straight
+    away as one part file of the output dataset, so with a Parquet input memory holds a
+    few partitions, and a rerun with the same model and input skips the parts already
+    written. The CSV export is merged from the parts, in input row order, at the end.
+    """
+    workers = workers or os.cpu_count() or 1
+    out_dir = parquet_path(OUTPUT_PATH)
+    parts, columns, manifest = plan_partitions(ids_only)
+
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    previous = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    if restart or previous != manifest:
+        # Different model, input or output columns (or not a batch run): start over
+        remove_path(out_dir)
+        os.makedirs(out_dir)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+    todo = [(name, source) for name, source in parts if not os.path.exists(os.path.join(out_dir, name))]
+    if len(todo) < len(parts):
+        print(f"Resuming: {len(parts) - len(todo)} of {len(parts)} partitions already scored")
+
+    started = time.perf_counter()
+    rows = done_parts = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_load_model, initargs=(MODEL_PATH,)) as pool:
+        pending = list(todo)
+        running = set()
+        while pending or running:
+            # Only a few partitions in flight, so sliced inputs are not all queued at once
+            while pending and len(running) < 2 * workers:
+                name, source = pending.pop(0)
+                running.add(pool.submit(score_partition, os.path.join(out_dir, name), columns, source))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                rows += future.result()
+                done_parts += 1
+                elapsed = time.perf_counter() - started
+                print(f"[{done_parts}/{len(todo)}] {rows} rows scored ({rows / elapsed:,.0f} rows/s)")
+
+    if EXPORT_LEGACY:
+        export_csv(out_dir, [name for name, _ in parts])
+    print(f"✅ Predictions completed! Results saved to: {out_dir}")
+
 
-# Remove rows with missing feature values
-df = df.dropna(subset=features)
+def export_csv(out_dir, names):
+    """Write the parts to the CSV export in input row order.
 
-# === Prepare input data ===
-X = df[features]
+    Each part is in row-number order, but the parts of different year partitions
+    interleave, so they are merged by row number, a batch of each part at a time.
+    """
+    readers = [pq.ParquetFile(os.path.join(out_dir, name)).iter_batches(batch_size=EXPORT_BATCH_SIZE)
+               for name in names]
+    heads = [None] * len(readers)
+    tmp = OUTPUT_PATH + ".tmp"
+    remove_path(tmp)
+    header = True
+    while True:
+        for i, reader in enumerate(readers):
+            while reader is not None and (heads[i] is None or not len(heads[i])):
+                batch = next(reader, None)
+                if batch is None:
+                    readers[i] = reader = heads[i] = None
+                else:
+                    heads[i] = pa.Table.from_batches([batch]).to_pandas()
+        loaded = [head for head in heads if head is not None]
+        if not loaded:
+            break
+        # Every row up to the smallest last row number of the loaded batches can be written
+        bound = min(head.index[-1] for head in loaded)
+        rows = pd.concat([head[head.index <= bound] for head in loaded]).sort_index()
+        rows.to_csv(tmp, mode="a", header=header, index=False)
+        header = False
+        heads = [None if head is None else head[head.index > bound] for head in heads]
+    os.replace(tmp, OUTPUT_PATH)
 
-# === Predict Modus Operandi Category ===
-predictions = model.predict(X)
 
-# === Save results to CSV ===
-df["PredictedMOCategory"] = predictions
-df.to_csv("../data/mo_predictions.csv", index=False)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predict the MO category of every processed crime record")
+    parser.add_argument("--batch", action="store_true",
+                        help="score partitions in parallel, writing each as it finishes (resumable)")
+    parser.add_argument("--workers", type=int, default=None, help="scoring processes (default: all cores)")
+    parser.add_argument("--ids-only", action="store_true",
+                        help="output only CrimeID, SuspectID and the prediction")
+    parser.add_argument("--restart", action="store_true", help="discard partitions scored by an earlier run")
+    args = parser.parse_args()
 
-print("✅ Predictions completed! Results saved to: ../data/mo_predictions.csv")
+    if args.batch:
+        predict_batches(args.workers, args.ids_only, args.restart)
+    else:
+        predict_all()
@@ -0,0 +1,116 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Risk band thresholds used by the /api/predictions filter
+RISK_BANDS = {
+    "High": lambda s: s >= 8,
+    "Medium": lambda s: (s >= 4) & (s < 8),
+    "Low": lambda s: s < 4,
+}
+
+# Longest n-gram kept in the SuspectID substring index
+NGRAM = 3
+
+
+class PredictionIndex:
+    """Read-only, pre-indexed view of the merged predictions/risk table.
+
+    Filters resolve to sorted arrays of row positions that are intersected, so a
+    query never copies the full frame; only the requested page and columns are
+    materialized for serialization.
+    """
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.columns = list(self.df.columns)
+        self.size = len(self.df)
+
+        # Categorical codes for PredictedCrimeType -> row positions
+        crime = pd.Categorical(self.df["PredictedCrimeType"])
+        self.crime_rows = {cat: np.flatnonzero(crime.codes == code) for code, cat in enumerate(crime.categories)}
+
+        # Precomputed risk-band buckets
+        risk = self.df["RiskScore"] if "RiskScore" in self.df else pd.Series(np.nan, index=self.df.index)
+        self.risk_rows = {band: np.flatnonzero(test(risk).to_numpy()) for band, test in RISK_BANDS.items()}
+
+        # Case-insensitive n-gram postings over SuspectID for substring search
+        self.suspect_ids = self.df["SuspectID"].astype(str).str.lower().tolist()
+        postings = {}
+        for row, sid in enumerate(self.suspect_ids):
+            for n in range(1, NGRAM + 1):
+                for i in range(len(sid) - n + 1):
+                    postings.setdefault(sid[i:i + n], set()).add(row)
+        self.id_postings = {gram: np.fromiter(sorted(rows), dtype=np.int64) for gram, rows in postings.items()}
+
+        # Exact SuspectID -> first row position, plus a content hash per row for ETags
+        self.id_rows = {}
+        for row, sid in enumerate(self.df["SuspectID"].tolist()):
+            self.id_rows.setdefault(sid, row)
+        row_hashes = pd.util.hash_pandas_object(self.df, index=False).to_numpy()
+        self.etags = [f"{h:016x}" for h in row_hashes]
+
+    def band_suspects(self, risk):
+        """SuspectIDs in a risk band (anything other than High/Medium means Low)."""
+        band = risk if risk in ("High", "Medium") else "Low"
+        return self.df["SuspectID"].iloc[self.risk_rows[band]].tolist()
+
+    def lookup(self, sid):
+        """Return (record, etag) for a SuspectID, or (None, None) if unknown."""
+        row = self.id_rows.get(sid)
+        if row is None:
+            return None, None
+        return self.df.iloc[row], self.etags[row]
+
+    def search_rows(self, search):
+        """Rows whose SuspectID contains search (case-insensitive)."""
+        if re.escape(search) != search:
+            # Regex metacharacters: keep the str.contains semantics of the original endpoint
+            mask = self.df["SuspectID"].str.contains(search, case=False)
+            return np.flatnonzero(mask.to_numpy(dtype=bool))
+
+        needle = search.lower()
+        n = min(len(needle), NGRAM)
+        rows = None
+        for i in range(len(needle) - n + 1):
+            posting = self.id_postings.get(needle[i:i + n])
+            if posting is None:
+                return np.empty(0, dtype=np.int64)
+            rows = posting if rows is None else np.intersect1d(rows, posting, assume_unique=True)
+        if len(needle) <= NGRAM:
+            return rows
+        # Longer needles: the n-grams only shortlist, confirm the full substring
+        return np.array([r for r in rows if needle in self.suspect_ids[r]], dtype=np.int64)
+
+    def query(self, search="", crime="", risk=""):
+        """Sorted row positions matching all given filters."""
+        rows = None
+        if search:
+            rows = self.search_rows(search)
+        if crime:
+            rows = self._intersect(rows, self.crime_rows.get(crime, np.empty(0, dtype=np.int64)))
+        if risk:
+            band = risk if risk in ("High", "Medium") else "Low"
+            rows = self._intersect(rows, self.risk_rows[band])
+        return np.arange(self.size) if rows is None else rows
+
+    def records(self, rows, offset=0, limit=None, fields=None):
+        """Serialize one page of rows, optionally projected onto fields."""
+        page = rows[offset:] if limit is None else rows[offset:offset + limit]
+        frame = self.df.iloc[page]
+        if fields:
+            frame = frame[fields]
+        return frame.to_dict(orient="records")
+
+    def iter_records(self, rows, offset=0, limit=None, fields=None, chunk_size=500):
+        """Like records(), but yields lists of at most chunk_size records."""
+        page = rows[offset:] if limit is None else rows[offset:offset + limit]
+        for start in range(0, len(page), chunk_size):
+            frame = self.df.iloc[page[start:start + chunk_size]]
+            if fields:
+                frame = frame[fields]
+            yield frame.to_dict(orient="records")
+
+    @staticmethod
+    def _intersect(rows, other):
+        return other if rows is None else np.intersect1d(rows, other, assume_unique=True)
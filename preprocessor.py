@@ -1,5 +1,7 @@
+import argparse
 import pandas as pd
 import os
+from data_store import DatasetWriter, read_dataset, write_dataset
 
 # Define file paths
 data_folder = "backend/data"
@@ -9,30 +11,163 @@ crime_pattern_file = os.path.join(data_folder, "crime_pattern_history.csv")
 crime_frequency_file = os.path.join(data_folder, "crime_frequency.csv")
 processed_data_file = os.path.join(data_folder, "processed_data.pkl")
 
-# Load datasets
-crime_df = pd.read_csv(crime_file)
-mo_df = pd.read_csv(mo_file)
-crime_patterns = pd.read_csv(crime_pattern_file)
-crime_frequency = pd.read_csv(crime_frequency_file)
-
-# Handle missing values
-crime_df.fillna("Unknown", inplace=True)
-mo_df.fillna("Unknown", inplace=True)
-crime_patterns.fillna("Unknown", inplace=True)
-crime_frequency.fillna(0, inplace=True)
+# Crime records per chunk in streaming mode
+STREAM_CHUNK_SIZE = 100_000
 
 # Normalize text data
-def clean_text(text):
-    return text.lower().strip().replace("\n", " ") if isinstance(text, str) else "Unknown"
+def clean_text(values):
+    """Lowercase, strip and flatten newlines in a text column, vectorized.
+
+    Missing values are filled with "Unknown" first (so become "unknown"); values that
+    are not text become "Unknown".
+    """
+    cleaned = values.astype(object).fillna("Unknown").str.lower().str.strip().str.replace("\n", " ", regex=False)
+    return cleaned.fillna("Unknown")
+
+
+# === In-memory preprocessing ===
+def preprocess():
+    # Load datasets (Parquet copies when present)
+    crime_df = read_dataset(crime_file, categorical=False)
+    mo_df = read_dataset(mo_file, categorical=False)
+    crime_patterns = read_dataset(crime_pattern_file, categorical=False)
+    crime_frequency = read_dataset(crime_frequency_file, categorical=False)
+
+    # Handle missing values
+    crime_df.fillna("Unknown", inplace=True)
+    mo_df.fillna("Unknown", inplace=True)
+    crime_patterns.fillna("Unknown", inplace=True)
+    crime_frequency.fillna(0, inplace=True)
+
+    crime_df["CrimeType"] = clean_text(crime_df["CrimeType"])
+    mo_df["MODescription"] = clean_text(mo_df["MODescription"])
+
+    # Merge datasets
+    merged_df = pd.merge(crime_df, mo_df, on="CrimeID", how="left")
+    merged_df = pd.merge(merged_df, crime_frequency, on="SuspectID", how="left")
+    merged_df.fillna("Unknown", inplace=True)
+
+    # Save preprocessed data: Parquet partitioned by crime year, plus the pickle export
+    write_dataset(merged_df, processed_data_file, partition_by="CrimeDate")
+    print("Data preprocessing completed and saved!")
+
+
+# === Streaming preprocessing ===
+def fill_text(df):
+    """fillna("Unknown") on text columns only; numeric and boolean columns keep their dtype."""
+    df = df.copy()
+    for column in df.select_dtypes(include="object").columns:
+        if pd.api.types.infer_dtype(df[column], skipna=True) == "boolean":
+            # A flag with gaps from the left join stays a (nullable) flag
+            df[column] = df[column].astype("boolean")
+        else:
+            df[column] = df[column].fillna("Unknown")
+    return df
+
+
+def suspect_frequency(path, chunk_size):
+    """crime_frequency.csv (one row per suspect and crime type) reduced to one row per suspect.
+
+    CrimeType is the suspect's most frequent crime type (first listed on ties), CrimeCount
+    the total, SeverityScore the count-weighted mean and RecencyWeight the highest one.
+    Built chunk by chunk from partial sums, so only the per-suspect table is held.
+    """
+    partials = []
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        chunk = chunk.fillna(0)
+        chunk["WeightedSeverity"] = chunk["SeverityScore"] * chunk["CrimeCount"]
+        top = chunk.sort_values("CrimeCount", ascending=False, kind="stable").drop_duplicates("SuspectID")
+        sums = chunk.groupby("SuspectID", sort=False).agg(
+            CrimeCount=("CrimeCount", "sum"),
+            WeightedSeverity=("WeightedSeverity", "sum"),
+            RecencyWeight=("RecencyWeight", "max"),
+        )
+        partials.append((top.set_index("SuspectID")[["CrimeType", "CrimeCount"]], sums))
+
+    tops = pd.concat([top for top, _ in partials])
+    tops = tops.reset_index().sort_values("CrimeCount", ascending=False, kind="stable").drop_duplicates("SuspectID")
+    sums = pd.concat([s for _, s in partials]).groupby(level=0, sort=False).agg(
+        {"CrimeCount": "sum", "WeightedSeverity": "sum", "RecencyWeight": "max"})
+    table = pd.DataFrame({
+        "CrimeType": tops.set_index("SuspectID")["CrimeType"].reindex(sums.index),
+        "CrimeCount": sums["CrimeCount"],
+        "SeverityScore": sums["WeightedSeverity"] / sums["CrimeCount"].where(sums["CrimeCount"] != 0),
+        "RecencyWeight": sums["RecencyWeight"],
+    })
+    table.index.name = "SuspectID"
+    return table
+
+
+class MODetails:
+    """Rows of mo_details.csv for consecutive chunks of crime_records.csv.
+
+    generate_data.py writes one MO row per crime, in crime order, so the file is read
+    alongside the crime records and each chunk's MO rows are the next rows of the file.
+    If the CrimeIDs ever disagree, the file is indexed by CrimeID once and looked up.
+    """
+
+    def __init__(self, path, chunk_size):
+        self.path = path
+        self.reader = pd.read_csv(path, chunksize=chunk_size)
+        self.buffer = None
+        self.index = None
+
+    def rows_for(self, crime_ids):
+        if self.index is None:
+            while self.buffer is None or len(self.buffer) < len(crime_ids):
+                chunk = next(self.reader, None)
+                if chunk is None:
+                    break
+                self.buffer = chunk if self.buffer is None else pd.concat([self.buffer, chunk], ignore_index=True)
+            head = self.buffer.iloc[:len(crime_ids)] if self.buffer is not None else None
+            if head is not None and len(head) == len(crime_ids) and (head["CrimeID"].to_numpy() == crime_ids).all():
+                self.buffer = self.buffer.iloc[len(crime_ids):].reset_index(drop=True)
+                return self.clean(head)
+            print(f"⚠️ {self.path} is not in crime record order; indexing it by CrimeID")
+            self.reader.close()
+            self.buffer = None
+            self.index = pd.read_csv(self.path).drop_duplicates("CrimeID").set_index("CrimeID")
+        rows = self.index.reindex(pd.Index(crime_ids, name="CrimeID"))
+        return self.clean(rows.dropna(how="all").reset_index())
+
+    @staticmethod
+    def clean(mo):
+        mo = fill_text(mo)
+        mo["MODescription"] = clean_text(mo["MODescription"])
+        return mo
+
+
+def preprocess_stream(chunk_size=STREAM_CHUNK_SIZE):
+    """Out-of-core preprocessing, one chunk of crime records at a time.
+
+    Each chunk is joined one-to-one to its MO details and to the per-suspect frequency
+    table, so the output has one row per crime (the in-memory merge repeats a crime once
+    per crime type of its suspect), and is appended to the processed dataset straight
+    away. Text columns are filled with "Unknown"; numeric columns stay numeric. Peak
+    memory is a few chunks plus one row per suspect.
+    """
+    frequency = suspect_frequency(crime_frequency_file, chunk_size)
+    mo_details = MODetails(mo_file, chunk_size)
+
+    with DatasetWriter(processed_data_file, partition_by="CrimeDate") as writer:
+        for chunk in pd.read_csv(crime_file, chunksize=chunk_size):
+            chunk = fill_text(chunk)
+            chunk["CrimeType"] = clean_text(chunk["CrimeType"])
+            merged = pd.merge(chunk, mo_details.rows_for(chunk["CrimeID"].to_numpy()), on="CrimeID", how="left")
+            merged = pd.merge(merged, frequency, left_on="SuspectID", right_index=True, how="left")
+            writer.write(fill_text(merged))
+            print(f"Processed {writer.rows} crime records", end="\r")
+    print(f"\nData preprocessing completed: {writer.rows} rows saved to {writer.target}")
 
-crime_df["CrimeType"] = crime_df["CrimeType"].apply(clean_text)
-mo_df["MODescription"] = mo_df["MODescription"].apply(clean_text)
 
-# Merge datasets
-merged_df = pd.merge(crime_df, mo_df, on="CrimeID", how="left")
-merged_df = pd.merge(merged_df, crime_frequency, on="SuspectID", how="left")
-merged_df.fillna("Unknown", inplace=True)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean and merge the generated crime datasets")
+    parser.add_argument("--stream", action="store_true",
+                        help="process crime records in chunks, with memory bounded by the chunk size")
+    parser.add_argument("--chunk-size", type=int, default=STREAM_CHUNK_SIZE)
+    args = parser.parse_args()
 
-# Save preprocessed data
-merged_df.to_pickle(processed_data_file)
-print("Data preprocessing completed and saved!")
+    if args.stream:
+        preprocess_stream(args.chunk_size)
+    else:
+        preprocess()
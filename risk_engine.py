@@ -0,0 +1,230 @@
+import argparse
+import math
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from data_store import read_dataset, write_dataset
+
+STATE_PATH = "../data/risk_engine.npz"
+RISK_SCORES_PATH = "../data/risk_scores.csv"
+SUSPECTS_PATH = "../data/suspects.csv"
+
+# Crime types that count towards the violent-crime bonus
+VIOLENT_CRIME_TYPES = ["Murder", "Robbery", "Assault"]
+
+SCORE_COLUMNS = ["SuspectID", "RiskScore", "SeverityComponent", "RecencyComponent", "CrimeCount", "ViolentCrimeCount"]
+# Per-suspect arrays of the engine, as saved with save()
+STATE_ARRAYS = ["age", "one_time", "base_score", "severity_sum", "recency_sum", "crime_count", "violent_count"]
+
+
+def _sequential_sums(totals, positions, values):
+    """Add values into totals[positions], in input order per position.
+
+    Adding one crime at a time per suspect (vectorized across suspects) keeps every
+    suspect's sum bit-identical to a Python loop over their crimes, however the crimes
+    are split across calls.
+    """
+    order = np.argsort(positions, kind="stable")
+    positions, values = positions[order], values[order]
+    starts = np.flatnonzero(np.r_[True, positions[1:] != positions[:-1]])
+    lengths = np.diff(np.r_[starts, len(positions)])
+    # Longest groups first, so the groups still active at step k are a prefix
+    by_length = np.argsort(-lengths, kind="stable")
+    starts, lengths = starts[by_length], lengths[by_length]
+    for k in range(lengths[0] if len(lengths) else 0):
+        active = np.searchsorted(-lengths, -k, side="left")
+        totals[positions[starts[:active]]] += values[starts[:active] + k]
+
+
+class RiskEngine:
+    """Bulk, incremental version of generate_data.calculate_risk_score.
+
+    Per-suspect running sums (severity x recency, severity, recency, crime and violent
+    crime counts) are kept against one fixed reference time, so appending crimes only
+    touches those suspects, and scores() applies the repeat-offender weight, frequency,
+    violent-crime bonus and age adjustment to all suspects at once. Results are
+    identical to calculate_risk_score(crimes, age, is_one_time, now=reference_time) with
+    the age read from a DataFrame, as generate_data.py calls it (generate_data.py
+    --check-risk compares the two). The state is saved next to the dataset, so
+    update_risk_scores() can add crimes recorded later.
+    """
+
+    def __init__(self, severity, violent_types=VIOLENT_CRIME_TYPES, reference_time=None):
+        self.crime_types = list(severity)
+        self.severity = np.array([severity[t] for t in self.crime_types], dtype=np.float64)
+        self.violent = np.isin(self.crime_types, violent_types)
+        self.reference_time = np.datetime64(reference_time or datetime.now(), "us")
+        self.ids = pd.Index([], dtype=object)
+        self.age = np.zeros(0)
+        self.one_time = np.zeros(0, dtype=bool)
+        self.base_score = np.zeros(0)
+        self.severity_sum = np.zeros(0)
+        self.recency_sum = np.zeros(0)
+        self.crime_count = np.zeros(0, dtype=np.int64)
+        self.violent_count = np.zeros(0, dtype=np.int64)
+        self._recency_cache = {}
+
+    # === Suspects ===
+    def add_suspects(self, suspect_ids, ages, one_time):
+        """Register suspects (with no crimes yet)."""
+        n = len(suspect_ids)
+        self.ids = self.ids.append(pd.Index(list(suspect_ids), dtype=object))
+        if not self.ids.is_unique:
+            raise ValueError("Suspect IDs must be unique.")
+        self.age = np.concatenate([self.age, np.asarray(ages, dtype=np.float64)])
+        self.one_time = np.concatenate([self.one_time, np.asarray(one_time, dtype=bool)])
+        self.base_score = np.concatenate([self.base_score, np.zeros(n)])
+        self.severity_sum = np.concatenate([self.severity_sum, np.zeros(n)])
+        self.recency_sum = np.concatenate([self.recency_sum, np.zeros(n)])
+        self.crime_count = np.concatenate([self.crime_count, np.zeros(n, dtype=np.int64)])
+        self.violent_count = np.concatenate([self.violent_count, np.zeros(n, dtype=np.int64)])
+
+    def positions(self, suspect_ids):
+        positions = self.ids.get_indexer(pd.Index(list(suspect_ids), dtype=object))
+        if (positions < 0).any():
+            raise KeyError(f"Unknown suspects: {list(pd.Index(suspect_ids)[positions < 0][:5])}")
+        return positions
+
+    # === Crimes ===
+    def days_ago(self, dates):
+        """Whole days between each date and the reference time, like timedelta.days."""
+        dates = np.asarray(pd.to_datetime(dates), dtype="datetime64[us]")
+        return ((self.reference_time - dates) // np.timedelta64(1, "D")).astype(np.int64)
+
+    def recency(self, days_ago):
+        """exp(-days_ago / 365), with math.exp so values match the scalar formula bit for bit."""
+        unique, inverse = np.unique(days_ago, return_inverse=True)
+        factors = np.array([self._recency_factor(d) for d in unique.tolist()])
+        return factors[inverse.reshape(-1)]
+
+    def _recency_factor(self, days):
+        factor = self._recency_cache.get(days)
+        if factor is None:
+            factor = self._recency_cache[days] = math.exp(-days / 365)
+        return factor
+
+    def add_crimes(self, suspect_ids, crime_types, dates):
+        """Append crimes (in chronological order of recording) and update their suspects' sums."""
+        positions = self.positions(suspect_ids)
+        codes = pd.Index(self.crime_types).get_indexer(pd.Index(list(crime_types)))
+        if (codes < 0).any():
+            raise KeyError("Unknown crime type.")
+        severity = self.severity[codes]
+        recency = self.recency(self.days_ago(dates))
+
+        _sequential_sums(self.base_score, positions, severity * recency)
+        _sequential_sums(self.severity_sum, positions, severity)
+        _sequential_sums(self.recency_sum, positions, recency)
+        np.add.at(self.crime_count, positions, 1)
+        np.add.at(self.violent_count, positions, self.violent[codes].astype(np.int64))
+        return np.unique(positions)
+
+    # === Persistence ===
+    def save(self, path):
+        """Write the engine (crime types, reference time and per-suspect sums) to one .npz file."""
+        np.savez(
+            path,
+            crime_types=np.array(self.crime_types, dtype=object),
+            severity=self.severity, violent=self.violent, reference_time=self.reference_time,
+            ids=np.array(self.ids, dtype=object),
+            **{name: getattr(self, name) for name in STATE_ARRAYS},
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=True) as data:
+            crime_types = data["crime_types"].tolist()
+            engine = cls(dict(zip(crime_types, data["severity"].tolist())),
+                         violent_types=[t for t, v in zip(crime_types, data["violent"]) if v])
+            engine.reference_time = data["reference_time"][()]
+            engine.ids = pd.Index(data["ids"].tolist(), dtype=object)
+            for name in STATE_ARRAYS:
+                setattr(engine, name, data[name])
+        return engine
+
+    @classmethod
+    def concat(cls, engines):
+        """One engine holding the suspects of engines scored against the same reference time."""
+        first = engines[0]
+        if any(e.crime_types != first.crime_types or e.reference_time != first.reference_time for e in engines):
+            raise ValueError("Engines differ in crime types or reference time.")
+        engine = cls(dict(zip(first.crime_types, first.severity.tolist())),
+                     violent_types=[t for t, v in zip(first.crime_types, first.violent) if v],
+                     reference_time=first.reference_time)
+        engine.ids = pd.Index([], dtype=object).append([e.ids for e in engines])
+        for name in STATE_ARRAYS:
+            setattr(engine, name, np.concatenate([getattr(e, name) for e in engines]))
+        return engine
+
+    # === Scores ===
+    def scores(self, suspect_ids=None):
+        """Risk score and components per suspect (all suspects, or the given ones)."""
+        rows = np.arange(len(self.ids)) if suspect_ids is None else self.positions(suspect_ids)
+        total = self.crime_count[rows]
+        violent = self.violent_count[rows]
+
+        # Repeat offender weight; one-time offenders get zero score
+        repeat_offender_weight = np.where((total == 0) | self.one_time[rows], 0.0, 1 + 0.2 * (total - 1))
+        frequency_component = np.minimum(2.0, total * 0.3)
+        violent_crime_bonus = np.minimum(1.5, violent * 0.5)
+        age_adjustment = np.maximum(0.5, 1.0 - (self.age[rows] / 100))
+        final = (self.base_score[rows] * repeat_offender_weight + frequency_component + violent_crime_bonus) * age_adjustment
+
+        # calculate_risk_score gets its age from the suspects frame, so the final score is a
+        # NumPy float (rounded the NumPy way) unless max() picked the Python 0.5 floor
+        numpy_rounded = (1.0 - (self.age[rows] / 100)) > 0.5
+        rounded = np.where(numpy_rounded, np.round(final, 1), [round(x, 1) for x in final.tolist()])
+
+        return pd.DataFrame({
+            "SuspectID": self.ids[rows],
+            "RiskScore": np.minimum(10.0, rounded),
+            "SeverityComponent": [round(x, 1) for x in self.severity_sum[rows].tolist()],
+            "RecencyComponent": [round(x, 1) for x in self.recency_sum[rows].tolist()],
+            "CrimeCount": total,
+            "ViolentCrimeCount": violent,
+        }, columns=SCORE_COLUMNS)
+
+
+# === Live updates ===
+def update_risk_scores(crimes, state_path=STATE_PATH, scores_path=RISK_SCORES_PATH, suspects_path=SUSPECTS_PATH):
+    """Add newly recorded crimes to the saved engine and rewrite their suspects' rows of risk_scores.csv.
+
+    crimes has the crime_records.csv columns SuspectID, CrimeType and CrimeDate, in
+    recording order; suspects the engine has not seen are registered from suspects.csv.
+    The sums are not keyed by CrimeID, so every crime must be added exactly once.
+    Returns the IDs of the rescored suspects.
+    """
+    engine = RiskEngine.load(state_path)
+    suspects = read_dataset(suspects_path, categorical=False,
+                            columns=["SuspectID", "Age", "OffenseType", "GangAffiliation", "CommunityInfluenceLevel"])
+    suspects = suspects.set_index("SuspectID")
+    new = pd.Index(crimes["SuspectID"].unique(), dtype=object).difference(engine.ids)
+    if len(new):
+        unknown = new.difference(suspects.index)
+        if len(unknown):
+            raise KeyError(f"Unknown suspects: {list(unknown[:5])}")
+        engine.add_suspects(new, suspects.loc[new, "Age"], suspects.loc[new, "OffenseType"] == "One-time")
+    changed = engine.ids[engine.add_crimes(crimes["SuspectID"], crimes["CrimeType"], crimes["CrimeDate"])]
+
+    fresh = engine.scores(changed).set_index("SuspectID")
+    fresh["CalculationDate"] = pd.Timestamp(engine.reference_time).strftime("%Y-%m-%d")
+    fresh["GangAffiliated"] = suspects["GangAffiliation"].reindex(changed).notna().to_numpy()
+    fresh["CommunityInfluence"] = suspects["CommunityInfluenceLevel"].reindex(changed).to_numpy()
+    risk = read_dataset(scores_path, categorical=False).set_index("SuspectID")
+    fresh = fresh[risk.columns]
+    # Rescored suspects keep their row; suspects with their first crimes are appended
+    known = fresh.index.isin(risk.index)
+    risk.loc[fresh.index[known]] = fresh[known]
+    write_dataset(pd.concat([risk, fresh[~known]]).rename_axis("SuspectID").reset_index(), scores_path)
+    engine.save(state_path)
+    return changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add newly recorded crimes to the risk scores without rescanning history")
+    parser.add_argument("crimes", help="CSV of the new crimes (SuspectID, CrimeType, CrimeDate), in recording order")
+    parser.add_argument("--state", default=STATE_PATH, help="engine state written by generate_data.py")
+    args = parser.parse_args()
+
+    changed = update_risk_scores(pd.read_csv(args.crimes, usecols=["SuspectID", "CrimeType", "CrimeDate"]), args.state)
+    print(f"✅ Risk scores of {len(changed)} suspects updated in {RISK_SCORES_PATH}")
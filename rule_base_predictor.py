@@ -1,38 +1,40 @@
+import os
+import json
+import hashlib
+import argparse
 import pandas as pd
 import numpy as np
-from difflib import SequenceMatcher
 from collections import defaultdict
-from datetime import datetime
-
-# Load data
-df = pd.read_pickle("../data/processed_data.pkl")
-
-# Extract required columns
-mo_patterns = df[['MODescription_x', 'CrimeType', 'WeaponUsed_x', 'LocationID', 'SeverityScore']].dropna().drop_duplicates()
-
-# Load unique suspects
-suspects = df['SuspectID'].unique()
-
-# Function: fuzzy match score
-def fuzzy_match(a, b):
-    return SequenceMatcher(None, a, b).ratio()
-
-# Time of day binning
-def time_bin(crime_date):
-    try:
-        hour = pd.to_datetime(crime_date).hour
-        if 6 <= hour < 12:
-            return 'Morning'
-        elif 12 <= hour < 18:
-            return 'Afternoon'
-        elif 18 <= hour < 21:
-            return 'Evening'
-        else:
-            return 'Night'
-    except:
-        return 'Unknown'
+from data_store import read_dataset, write_dataset
+from feature_store import SOURCE_COLUMNS, FeatureStore, locations, refresh_store
+from mo_matcher import MOPatternIndex, match_suspects
+
+# Number of processes used to shard suspects during matching
+WORKERS = int(os.environ.get("RULE_PREDICTOR_WORKERS", os.cpu_count() or 1))
+
+PREDICTIONS_PATH = "../data/rule_based_predictions.csv"
+STATE_PATH = "../data/rule_based_predictions.state.json"
+
+# Input fingerprints for incremental runs
+def fingerprint_suspect(descriptions, locations, risk):
+    """Order-insensitive hash of everything a suspect's prediction depends on."""
+    payload = json.dumps([sorted(map(str, descriptions)), sorted(map(str, locations)), repr(risk)])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
-df['TimeOfDay'] = df['CrimeDate'].apply(time_bin)
+def fingerprint_patterns(mo_patterns):
+    """Hash of the MO pattern catalogue; row order matters because it breaks ties."""
+    row_hashes = pd.util.hash_pandas_object(mo_patterns.astype(str), index=False)
+    return hashlib.sha1(row_hashes.to_numpy().tobytes()).hexdigest()
+
+def load_state(path):
+    if not os.path.exists(path):
+        return {"patterns": None, "suspects": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(path, state):
+    with open(path, "w") as f:
+        json.dump(state, f)
 
 # Define dangerous MO examples
 high_risk_patterns = {
@@ -57,62 +59,87 @@ pattern_to_weapon = {
     'Cloned SIM cards': 'Cloned SIM cards',
 }
 
-# Group MO by Suspect
-suspect_crimes = df.groupby('SuspectID')
-
-results = []
-for suspect, group in suspect_crimes:
-    descriptions = group['MODescription_x'].dropna().tolist()
-    locations = group['LocationID'].dropna().tolist()
-    times = group['TimeOfDay'].dropna().tolist()
-    risk = group['SeverityScore'].mean() if not group['SeverityScore'].isna().all() else 1
-
-    best_match = None
-    best_score = 0
-    matched_crime = 'Unknown'
-    matched_weapon = 'Unknown'
-
-    for _, pattern in mo_patterns.iterrows():
-        mo_text = pattern['MODescription_x']
-        loc = pattern['LocationID']
-        type_ = pattern['CrimeType']
-        weapon = pattern['WeaponUsed_x']
-        severity = pattern['SeverityScore']
-
-        for desc in descriptions:
-            score = fuzzy_match(desc, mo_text)
-            # Boost score for same location
-            if loc in locations:
-                score += 0.1
-            # Boost for time of day matching (future use if MO has time info)
-            # Score weighting by severity
-            score *= (1 + (severity or 1) / 10)
-            score *= (1 + (risk or 1) / 10)
-
-            if score > best_score:
-                best_score = score
-                best_match = mo_text
-                matched_crime = type_
-                matched_weapon = weapon
-
-    # Fallback if no match or low score
-    if not best_match or best_score < 0.4:
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rule-based crime type prediction")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-score suspects whose records changed since the last run")
+    parser.add_argument("--refresh-features", action="store_true",
+                        help="update the feature store from the processed data first (else it is only read)")
+    args = parser.parse_args()
+
+    # Load data (only the columns the rules look at, plus the feature store's source columns)
+    columns = ['SuspectID', 'MODescription_x', 'CrimeType', 'WeaponUsed_x', 'LocationID', 'SeverityScore']
+    df = read_dataset("../data/processed_data.pkl", columns=list(dict.fromkeys(SOURCE_COLUMNS + columns)))
+
+    # Extract required columns
+    mo_patterns = df[['MODescription_x', 'CrimeType', 'WeaponUsed_x', 'LocationID', 'SeverityScore']].dropna().drop_duplicates()
+
+    # Per-suspect locations and mean severity come from the feature store (feature_store.py)
+    store = refresh_store(df) if args.refresh_features else FeatureStore.load()
+    if not store.matches(df):
+        # Stale locations and severity would also hide changed suspects from --incremental
+        raise SystemExit("❌ The feature store does not match the processed data: "
+                         "run feature_store.py or pass --refresh-features")
+    features = store.suspects.set_index('SuspectID')
+    suspect_locations = locations(features.reset_index())
+    suspect_severity = features['SeverityMean']
+
+    # Group MO by Suspect
+    suspect_descriptions = df.groupby('SuspectID', observed=True)['MODescription_x'].agg(lambda s: s.dropna().tolist())
+
+    state = load_state(STATE_PATH) if args.incremental else {"patterns": None, "suspects": {}}
+    pattern_fp = fingerprint_patterns(mo_patterns)
+    full_rebuild = state["patterns"] != pattern_fp or not os.path.exists(PREDICTIONS_PATH)
+    if args.incremental and full_rebuild:
+        print("MO pattern catalogue changed or no previous predictions; running a full rebuild.")
+
+    suspect_inputs = []
+    fingerprints = {}
+    for suspect, descriptions in suspect_descriptions.items():
+        suspect_locs = suspect_locations.get(suspect, [])
+        risk = suspect_severity.get(suspect, np.nan)
+        risk = 1 if pd.isna(risk) else float(risk)
+        fingerprints[suspect] = fingerprint_suspect(descriptions, suspect_locs, risk)
+        if full_rebuild or state["suspects"].get(suspect) != fingerprints[suspect]:
+            suspect_inputs.append((suspect, descriptions, suspect_locs, risk))
+
+    # Match every suspect against the indexed MO patterns
+    mo_index = MOPatternIndex(mo_patterns)
+    matches = match_suspects(mo_index, suspect_inputs, workers=WORKERS)
+
+    results = []
+    for suspect, match in matches:
+        best_match = None
+        best_score = 0
         matched_crime = 'Unknown'
-        matched_weapon = 'Unknown'
-        best_match = 'No matching pattern found'
-    elif best_match in pattern_to_weapon:
-        matched_weapon = pattern_to_weapon[best_match]
-    else:
-        matched_weapon = 'Unknown'
-
-    results.append({
-        'SuspectID': suspect,
-        'PredictedCrimeType': matched_crime,
-        'LikelyWeapon': matched_weapon,
-        'MatchedMOExamples': best_match
-    })
-
-# Save predictions
-pred_df = pd.DataFrame(results)
-pred_df.to_csv("../data/rule_based_predictions.csv", index=False)
-print("Rule-based predictions with location/risk/time logic saved.")
+        if match is not None:
+            best_score, best_match, matched_crime, _ = match
+
+        # Fallback if no match or low score
+        if not best_match or best_score < 0.4:
+            matched_crime = 'Unknown'
+            matched_weapon = 'Unknown'
+            best_match = 'No matching pattern found'
+        elif best_match in pattern_to_weapon:
+            matched_weapon = pattern_to_weapon[best_match]
+        else:
+            matched_weapon = 'Unknown'
+
+        results.append({
+            'SuspectID': suspect,
+            'PredictedCrimeType': matched_crime,
+            'LikelyWeapon': matched_weapon,
+            'MatchedMOExamples': best_match
+        })
+
+    # Save predictions
+    pred_df = pd.DataFrame(results, columns=['SuspectID', 'PredictedCrimeType', 'LikelyWeapon', 'MatchedMOExamples'])
+    if not full_rebuild:
+        # Keep unchanged suspects, drop rescored and vanished ones
+        previous = read_dataset(PREDICTIONS_PATH, categorical=False)
+        keep = previous['SuspectID'].isin(fingerprints.keys()) & ~previous['SuspectID'].isin(pred_df['SuspectID'])
+        pred_df = pd.concat([previous[keep], pred_df], ignore_index=True).sort_values('SuspectID', ignore_index=True)
+        print(f"Re-scored {len(results)} of {len(fingerprints)} suspects.")
+    write_dataset(pred_df, PREDICTIONS_PATH)
+    save_state(STATE_PATH, {"patterns": pattern_fp, "suspects": fingerprints})
+    print("Rule-based predictions with location/risk/time logic saved.")
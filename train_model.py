@@ -1,48 +1,305 @@
+import argparse
+import os
+import time
+import numpy as np
 import pandas as pd
 import joblib
-from sklearn.model_selection import train_test_split
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from sklearn.model_selection import ParameterGrid, train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
+from utils.compiled_model import CompiledForest, benchmark, check_equivalence
+from utils.data_store import read_dataset
+from utils.feature_store import SUSPECT_MODEL_FEATURES, join_suspect_features
 
-# === Load the processed dataset ===
 data_path = "data/processed_data.pkl"
-df = pd.read_pickle(data_path)
+MODEL_PATH = "models/trained_model.pkl"
+VECTORIZER_PATH = "models/vectorizer.pkl"
+COMPILED_PATH = "models/trained_model.npz"
+# Hashes of the rows the saved forest was trained on, to tell new records apart
+TRAINED_ROWS_PATH = "models/trained_rows.npy"
+# Hashes of the hold-out rows of the last full fit; incremental runs report against the same rows
+HOLDOUT_ROWS_PATH = "models/holdout_rows.npy"
+SEARCH_RESULTS_PATH = "models/search_results.csv"
+# Per-suspect features maintained by utils/feature_store.py
+SUSPECT_FEATURES_PATH = "data/suspect_features.csv"
 
 # === Define target and features ===
 target = "MOCategory"
 features = ["CrimeType", "WeaponUsed_x", "SeverityScore", "IsGangRelated"]
+categorical_features = ["CrimeType", "WeaponUsed_x", "IsGangRelated"]
+numerical_features = ["SeverityScore"]
 
-# Drop any rows with missing data in selected columns
-df = df.dropna(subset=[target] + features)
+# Trees added per incremental run; earlier rows replayed per new row, so the new
+# trees still see every MO category
+INCREMENTAL_TREES = 20
+REPLAY_RATIO = 1.0
 
-X = df[features]
-y = df[target]
+# Hyperparameter search: candidates are tried in a fixed shuffled order until the budget is spent
+SEARCH_SPACE = {
+    "n_estimators": [50, 100, 200, 400],
+    "max_depth": [None, 10, 20, 40],
+    "min_samples_leaf": [1, 2, 5],
+    "max_features": ["sqrt", "log2", None],
+}
+SEARCH_BUDGET_SECONDS = 300
 
-# === Define preprocessing ===
-categorical_features = ["CrimeType", "WeaponUsed_x", "IsGangRelated"]
-numerical_features = ["SeverityScore"]
 
-preprocessor = ColumnTransformer(
-    transformers=[
-        ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), categorical_features)
-    ],
-    remainder="passthrough"
-)
+# === Building and evaluating ===
+def build_pipeline(**params):
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), categorical_features)
+        ],
+        remainder="passthrough"
+    )
+    forest_params = {"n_estimators": 100, "random_state": 42, **params}
+    return Pipeline(steps=[
+        ("preprocessor", preprocessor),
+        ("classifier", RandomForestClassifier(**forest_params))
+    ])
+
+
+def load_data(features):
+    stored = [f for f in features if f in SUSPECT_MODEL_FEATURES]
+    df = read_dataset(data_path, columns=["CrimeID", target] + [f for f in features if f not in stored] +
+                      (["SuspectID"] if stored else []))
+    if stored:
+        # Suspect-level inputs are read from the feature store, not re-derived here
+        suspects = read_dataset(SUSPECT_FEATURES_PATH, columns=["SuspectID"] + stored)
+        df = join_suspect_features(df, suspects, stored)
+    # Drop any rows with missing data in selected columns
+    return df.dropna(subset=[target] + features)
+
+
+def split(df):
+    """The hold-out split every mode reports against."""
+    return train_test_split(df, test_size=0.2, random_state=42)
+
+
+def row_keys(df, features):
+    return pd.util.hash_pandas_object(df[["CrimeID", target] + features], index=False).to_numpy()
+
+
+def fit_timed(fit, rows):
+    """Time fit(); returns (seconds, rows/s)."""
+    started = time.perf_counter()
+    fit()
+    seconds = time.perf_counter() - started
+    return seconds, rows / seconds if seconds else float("inf")
+
+
+def holdout_accuracy(pipeline, test_df, features):
+    return float((pipeline.predict(test_df[features]) == test_df[target].to_numpy()).mean())
+
+
+def report(mode, pipeline, rows, seconds, throughput, accuracy):
+    trees = len(pipeline.named_steps["classifier"].estimators_)
+    print(f"{mode}: {rows} rows in {seconds:.2f}s ({throughput:,.0f} rows/s), "
+          f"{trees} trees, hold-out accuracy {accuracy:.4f}")
+
+
+def save_model(pipeline, trained_keys, holdout_keys):
+    # Serve single-threaded, as before; only training uses every core
+    pipeline.named_steps["classifier"].set_params(n_jobs=None, warm_start=False)
+    joblib.dump(pipeline, MODEL_PATH)
+    joblib.dump(pipeline.named_steps["preprocessor"].named_transformers_["cat"], VECTORIZER_PATH)
+    np.save(TRAINED_ROWS_PATH, np.unique(trained_keys))
+    np.save(HOLDOUT_ROWS_PATH, np.unique(holdout_keys))
+    # Export the array-backed form used for low-latency inference
+    CompiledForest.from_pipeline(pipeline).save(COMPILED_PATH)
+
+
+# === Compiled model check ===
+def synthetic_rows(rows, seed=0):
+    """Feature rows and MO categories that depend on them, for fitting a small model without data."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "CrimeType": rng.choice(["Theft", "Assault", "Fraud", "Burglary", "Murder"], rows),
+        "WeaponUsed_x": rng.choice(["Knife", "Gun", "None", "Blunt Object"], rows),
+        "SeverityScore": rng.integers(1, 11, rows).astype(float),
+        "IsGangRelated": rng.choice([True, False], rows),
+    })
+    labels = np.array(["Planned", "Opportunistic", "Violent", "Financial"])
+    score = df["CrimeType"].str.len() + 2 * df["SeverityScore"] + 5 * df["IsGangRelated"] + rng.integers(0, 4, rows)
+    return df, labels[score.to_numpy().astype(int) % len(labels)]
+
+
+def check_compiled(rows=2000, repeat=200):
+    """Fit a small model on synthetic rows and check the compiled forest predicts exactly as it does.
+
+    The check rows add categories the encoder never saw (handle_unknown="ignore") and
+    severities on, just below and just above every split threshold of the forest.
+    """
+    X, y = synthetic_rows(rows)
+    pipeline = build_pipeline(n_estimators=25).fit(X, y)
+    compiled = CompiledForest.from_pipeline(pipeline)
+
+    # SeverityScore is the only passthrough column
+    thresholds = np.unique(compiled.threshold[compiled.feature == compiled.passthrough_offset])
+    edges = np.unique(np.concatenate([thresholds, np.nextafter(thresholds, -np.inf), np.nextafter(thresholds, np.inf),
+                                      [0.0, -1.0, 1e9]]))
+    unseen = synthetic_rows(len(edges), seed=1)[0].assign(SeverityScore=edges)
+    unseen.loc[::3, "CrimeType"] = "Arson"
+    unseen.loc[1::3, "WeaponUsed_x"] = "Poison"
+    check_rows = pd.concat([synthetic_rows(rows, seed=2)[0], unseen], ignore_index=True)[features]
+
+    check_equivalence(pipeline, compiled, check_rows)
+    benchmark(pipeline, compiled, check_rows, repeat)
+
+
+# === Training modes ===
+def train_full(df, features, **params):
+    train_df, test_df = split(df)
+    pipeline = build_pipeline(n_jobs=-1, **params)
+    seconds, throughput = fit_timed(lambda: pipeline.fit(train_df[features], train_df[target]), len(train_df))
+    report("Full training", pipeline, len(train_df), seconds, throughput, holdout_accuracy(pipeline, test_df, features))
+    save_model(pipeline, row_keys(train_df, features), row_keys(test_df, features))
+    return pipeline
+
+
+def train_incremental(df, features, add_trees=INCREMENTAL_TREES, replace_oldest=False):
+    """Grow the saved forest with trees fitted on records it has not been trained on.
+
+    The hold-out rows are the ones of the last full fit, so new records only ever
+    count as training rows and rows already trained on never move into the hold-out.
+    The fitted OneHotEncoder is reused as it is. The new trees are fitted on the new
+    training rows plus a replayed sample of earlier ones (at least one per MO category,
+    so the forest keeps its class set); with replace_oldest as many of the oldest trees
+    are dropped, keeping the forest size fixed. Falls back to a full fit when there is
+    no saved model or a new MO category shows up.
+    """
+    if not all(os.path.exists(path) for path in (MODEL_PATH, TRAINED_ROWS_PATH, HOLDOUT_ROWS_PATH)):
+        print("No trained model to extend; running a full fit.")
+        return train_full(df, features)
+
+    pipeline = joblib.load(MODEL_PATH)
+    if list(getattr(pipeline, "feature_names_in_", features)) != features:
+        print("The saved model was trained on other features; running a full fit.")
+        return train_full(df, features)
+    forest = pipeline.named_steps["classifier"]
+    keys = row_keys(df, features)
+    holdout_keys = np.load(HOLDOUT_ROWS_PATH)
+    trained_keys = np.load(TRAINED_ROWS_PATH)
+    held_out = np.isin(keys, holdout_keys)
+    train_df, test_df = df[~held_out], df[held_out]
+    is_new = ~np.isin(keys[~held_out], trained_keys)
+    new, old = train_df[is_new], train_df[~is_new]
+    if not len(new):
+        print(f"No new records; hold-out accuracy {holdout_accuracy(pipeline, test_df, features):.4f}")
+        return pipeline
+    if not set(new[target]).issubset(forest.classes_):
+        print("New MO categories since the last fit; running a full fit.")
+        return train_full(df, features)
+
+    replay = old.sample(n=min(len(old), int(len(new) * REPLAY_RATIO)), random_state=42)
+    batch = pd.concat([new, replay, old.drop_duplicates(target)])
+    if len(set(batch[target])) != len(forest.classes_):
+        print("Earlier rows do not cover every MO category; running a full fit.")
+        return train_full(df, features)
+
+    X = pipeline.named_steps["preprocessor"].transform(batch[features])
+    y = batch[target].to_numpy(dtype=object)
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + add_trees, n_jobs=-1)
+    seconds, throughput = fit_timed(lambda: forest.fit(X, y), len(batch))
+    if replace_oldest:
+        forest.estimators_ = forest.estimators_[add_trees:]
+        forest.n_estimators = len(forest.estimators_)
+
+    mode = f"Incremental ({len(new)} new rows, {len(batch) - len(new)} replayed, +{add_trees} trees" + \
+        (f", {add_trees} oldest dropped)" if replace_oldest else ")")
+    report(mode, pipeline, len(batch), seconds, throughput, holdout_accuracy(pipeline, test_df, features))
+    save_model(pipeline, np.concatenate([trained_keys, keys[~held_out][is_new]]), holdout_keys)
+    return pipeline
+
+
+# === Parallel hyperparameter search ===
+_search_data = None
+
+
+def _init_search_worker(data):
+    global _search_data
+    _search_data = data
+
+
+def evaluate_candidate(params):
+    """Fit one candidate on the search-fit rows and score it on the validation rows."""
+    fit_df, val_df, features = _search_data
+    pipeline = build_pipeline(**params)
+    seconds, throughput = fit_timed(lambda: pipeline.fit(fit_df[features], fit_df[target]), len(fit_df))
+    return {"params": params, "val_accuracy": holdout_accuracy(pipeline, val_df, features), "fit_seconds": seconds,
+            "rows_per_s": throughput}
+
+
+def search(df, features, budget=SEARCH_BUDGET_SECONDS, workers=None):
+    """Try SEARCH_SPACE candidates on all cores until the time budget runs out, then fit the best.
+
+    Candidates are scored on a validation split of the training rows, so the hold-out
+    rows stay unseen until the winner is fitted. No candidate starts after the budget;
+    the ones already running finish.
+    """
+    workers = workers or os.cpu_count() or 1
+    train_df, _ = split(df)
+    fit_df, val_df = train_test_split(train_df, test_size=0.25, random_state=42)
+    candidates = list(ParameterGrid(SEARCH_SPACE))
+    np.random.default_rng(42).shuffle(candidates)
+
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_search_worker,
+                             initargs=((fit_df, val_df, features),)) as pool:
+        running = set()
+        while candidates or running:
+            while candidates and len(running) < workers and time.perf_counter() - started < budget:
+                running.add(pool.submit(evaluate_candidate, candidates.pop(0)))
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results.append(result)
+                print(f"  {len(results):>3}. val accuracy {result['val_accuracy']:.4f} "
+                      f"in {result['fit_seconds']:.1f}s with {result['params']}")
+
+    results.sort(key=lambda r: (-r["val_accuracy"], r["fit_seconds"]))
+    pd.DataFrame([{**r["params"], **{k: v for k, v in r.items() if k != "params"}} for r in results]).to_csv(
+        SEARCH_RESULTS_PATH, index=False)
+    best = results[0]["params"]
+    print(f"Searched {len(results)} candidates in {time.perf_counter() - started:.0f}s on {workers} workers; best {best}")
+    return train_full(df, features, **best)
+
 
-# === Build and Train the Pipeline ===
-pipeline = Pipeline(steps=[
-    ("preprocessor", preprocessor),
-    ("classifier", RandomForestClassifier(n_estimators=100, random_state=42))
-])
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the MO category model")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--incremental", action="store_true",
+                      help="add trees fitted on records the saved model has not seen")
+    mode.add_argument("--search", action="store_true", help="parallel hyperparameter search, then fit the best")
+    mode.add_argument("--check-compiled", action="store_true",
+                      help="check the compiled forest against pipeline.predict on a synthetic model, then exit")
+    parser.add_argument("--add-trees", type=int, default=INCREMENTAL_TREES)
+    parser.add_argument("--replace-oldest", action="store_true",
+                        help="drop as many of the oldest trees as are added")
+    parser.add_argument("--budget", type=float, default=SEARCH_BUDGET_SECONDS, help="search time budget in seconds")
+    parser.add_argument("--workers", type=int, default=None, help="search processes (default: all cores)")
+    parser.add_argument("--suspect-features", action="store_true",
+                        help=f"also train on the stored suspect features ({', '.join(SUSPECT_MODEL_FEATURES)})")
+    args = parser.parse_args()
 
-# Split and train
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-pipeline.fit(X_train, y_train)
+    if args.check_compiled:
+        check_compiled()
+        print("✅ Compiled forest matches pipeline.predict.")
+        raise SystemExit(0)
 
-# === Save the model and vectorizer ===
-joblib.dump(pipeline, "models/trained_model.pkl")
-joblib.dump(preprocessor.named_transformers_["cat"], "models/vectorizer.pkl")
+    model_features = features + (SUSPECT_MODEL_FEATURES if args.suspect_features else [])
 
-print("✅ Model trained and saved successfully.")
+    df = load_data(model_features)
+    if args.incremental:
+        train_incremental(df, model_features, args.add_trees, args.replace_oldest)
+    elif args.search:
+        search(df, model_features, args.budget, args.workers)
+    else:
+        train_full(df, model_features)
+    print("✅ Model trained and saved successfully.")